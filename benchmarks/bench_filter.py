@@ -0,0 +1,199 @@
+"""Benchmark the chat filter against synthetic message corpora.
+
+Measures check_message_for_filter, and the in-memory part of on_message around it
+(exemption check, verdict cache, matcher lookup, filter), for every filter level and for guild
+wordlists of several sizes. Results are printed as JSON so runs from different
+versions can be diffed or compared with --compare.
+
+Usage:
+    python benchmarks/bench_filter.py [--quick] [--output results.json] [--compare old.json]
+"""
+import random
+import argparse
+import tracemalloc
+from time import perf_counter_ns
+
+from common import summarize, write_results, compare_results
+
+import bot
+
+LEVELS = ("light", "moderate", "strict")
+WORDLIST_SIZES = (0, 100, 1000, 5000)
+
+CHAT_WORDS = (
+    "hey", "lol", "gg", "anyone", "playing", "tonight", "the", "server", "is", "so", "laggy",
+    "what", "did", "you", "think", "of", "new", "update", "nice", "thanks", "brb", "food",
+    "minecraft", "ranked", "queue", "help", "with", "homework", "pls", "that's", "funny",
+    "wait", "really", "no", "way", "same", "honestly", "who", "wants", "to", "join", "vc",
+)
+UNICODE_SAMPLES = (
+    "😂", "🔥", "❄️", "👀", "💀", "🎉", "こんにちは", "你好", "안녕하세요", "привет", "مرحبا",
+    "ｆｕｌｌｗｉｄｔｈ", "café", "naïve", "Ωmega", "𝓯𝓪𝓷𝓬𝔂", "ñandú", "zażółć",
+)
+
+def short_chat(rng):
+    return " ".join(rng.choice(CHAT_WORDS) for _ in range(rng.randint(1, 12)))
+
+def long_paste(rng):
+    lines = []
+    while sum(len(line) for line in lines) < rng.randint(1000, 4000):
+        if rng.random() < 0.3:
+            lines.append(f"    at frostmod.module{rng.randint(1, 99)}.call(line {rng.randint(1, 999)})")
+        else:
+            lines.append(short_chat(rng))
+    return "\n".join(lines)
+
+def unicode_heavy(rng):
+    parts = []
+    for _ in range(rng.randint(3, 20)):
+        parts.append(rng.choice(UNICODE_SAMPLES) if rng.random() < 0.6 else rng.choice(CHAT_WORDS))
+    return " ".join(parts)
+
+def evade(word, rng):
+    """Disguise a filtered word the way users try to sneak it past the filter."""
+    trick = rng.randrange(5)
+    if trick == 0:
+        leet = {"a": "4", "e": "3", "i": "1", "o": "0", "s": "$"}
+        return "".join(leet.get(ch, ch) for ch in word)
+    if trick == 1:
+        return " ".join(word)
+    if trick == 2:
+        return "\u200b".join(word)
+    if trick == 3:
+        index = rng.randrange(len(word))
+        return word[:index] + word[index] * rng.randint(2, 6) + word[index:]
+    return word.upper()
+
+def adversarial(rng, words):
+    """Mix of disguised filtered words, near misses and worst-case repeated input."""
+    kind = rng.randrange(4)
+    if kind == 0:
+        return f"{short_chat(rng)} {evade(rng.choice(words), rng)} {short_chat(rng)}"
+    if kind == 1:
+        # Near misses: a filtered word with its last letter changed
+        word = rng.choice(words)
+        return f"{short_chat(rng)} {word[:-1]}{'z' if word[-1] != 'z' else 'q'}"
+    if kind == 2:
+        return rng.choice("abcdefghijklmnopqrstuvwxyz") * rng.randint(500, 2000)
+    return " ".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(50, 500)))
+
+def spam_wave(rng, count):
+    """A raid: a handful of copypastas, each sent many times."""
+    pastes = [long_paste(rng) if rng.random() < 0.3 else short_chat(rng) for _ in range(20)]
+    return [rng.choice(pastes) for _ in range(count)]
+
+def build_corpora(rng, count):
+    words = sorted(w for w in bot.FILTER_LEVEL_WORDS["strict"] if " " not in w)
+    return {
+        "short_chat": [short_chat(rng) for _ in range(count)],
+        "long_paste": [long_paste(rng) for _ in range(max(1, count // 10))],
+        "unicode_heavy": [unicode_heavy(rng) for _ in range(count)],
+        "adversarial": [adversarial(rng, words) for _ in range(count)],
+        "spam_wave": spam_wave(rng, count),
+    }
+
+def synthetic_rules(rng, size):
+    """FilterRules for a guild with `size` extra blocked words."""
+    if not size:
+        return None
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    blocked = {"".join(rng.choice(alphabet) for _ in range(rng.randint(4, 10))) for _ in range(size)}
+    return bot.FilterRules(1, [("block", word) for word in blocked])
+
+class FakeChannel:
+    id = 2
+    category_id = 3
+
+class FakeAuthor:
+    id = 4
+    roles = ()
+
+class FakeMessage:
+    __slots__ = ("content", "channel", "author")
+
+    def __init__(self, content):
+        self.content = content
+        self.channel = FakeChannel()
+        self.author = FakeAuthor()
+
+def on_message_path(message, level, rules):
+    """The synchronous filter work on_message does once config is cached."""
+    if bot.is_filter_exempt(message, rules):
+        return False, None
+    return bot.filter_verdicts.check(message.content, level, rules)
+
+def time_calls(func, items):
+    latencies = []
+    for item in items:
+        start = perf_counter_ns()
+        func(item)
+        latencies.append(perf_counter_ns() - start)
+    return latencies
+
+def peak_allocation(func, items, sample=200):
+    """Largest transient allocation (bytes) seen while handling one message."""
+    tracemalloc.start()
+    peak = 0
+    try:
+        for item in items[:sample]:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            func(item)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def run(count, seed):
+    rng = random.Random(seed)
+    corpora = build_corpora(rng, count)
+    results = []
+    for size in WORDLIST_SIZES:
+        rules = synthetic_rules(rng, size)
+        for level in LEVELS:
+            # Compile the guild matcher up front so the timings measure matching only
+            bot.get_filter_matcher(level, rules)
+            for corpus, messages in corpora.items():
+                fake_messages = [FakeMessage(content) for content in messages]
+                stages = {
+                    "check_message_for_filter": (lambda content: bot.check_message_for_filter(content, level, rules), messages),
+                    "on_message_path": (lambda message: on_message_path(message, level, rules), fake_messages),
+                }
+                for stage, (func, items) in stages.items():
+                    # Warm up before timing
+                    for item in items[:50]:
+                        func(item)
+                    # Start timing from an empty verdict cache, so hits only come from repeats in the corpus
+                    bot.filter_verdicts.clear()
+                    result = {
+                        "stage": stage,
+                        "corpus": corpus,
+                        "level": level,
+                        "wordlist_size": size,
+                    }
+                    result.update(summarize(time_calls(func, items)))
+                    result["blocked"] = sum(1 for item in items if func(item)[0])
+                    result["peak_alloc_bytes"] = peak_allocation(func, items)
+                    results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="messages per corpus (long pastes use a tenth)")
+    parser.add_argument("--quick", action="store_true", help="small run for a fast sanity check")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = run(200 if args.quick else args.messages, args.seed)
+    write_results("filter", results, args.output)
+    if args.compare:
+        compare_results(
+            args.compare, results,
+            key_fields=("stage", "corpus", "level", "wordlist_size"),
+            metrics=("msgs_per_sec", "p50_us", "p99_us", "peak_alloc_bytes")
+        )
+
+if __name__ == "__main__":
+    main()
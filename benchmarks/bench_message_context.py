@@ -0,0 +1,213 @@
+"""Benchmark the database work on_message does before it can filter a message.
+
+Compares the old per-message lookups (counting channel, then filter level, then the
+logs channel for filtered messages) with get_message_context, both cold (nothing
+cached, one combined query) and warm (served from the caches). By default queries go
+to a simulated pool that waits a fixed round-trip time, so the numbers show what
+each approach costs per message at that latency; pass --dsn to run the same queries
+against a real PostgreSQL database with the FrostMod schema instead.
+
+Usage:
+    python benchmarks/bench_message_context.py [--rtt-ms 1.0] [--dsn postgres://...] [--quick]
+"""
+import asyncio
+import random
+import argparse
+from time import perf_counter_ns
+
+from common import summarize, write_results, compare_results
+
+import bot
+
+class SimulatedConnection:
+    """Answers every query with an empty row after a fixed round trip."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        # Statements prepared on the pool's connections, see bot.prepared_statement
+        self.prepared = pool.prepared
+
+    async def round_trip(self):
+        self.pool.round_trips += 1
+        await asyncio.sleep(self.pool.rtt)
+
+    async def prepare(self, query):
+        await self.round_trip()
+        return SimulatedStatement(self, query)
+
+    async def fetch(self, query, *args):
+        await self.round_trip()
+        return []
+
+    async def fetchrow(self, query, *args):
+        await self.round_trip()
+        if query is bot.WARM_CACHE_QUERY:
+            # The combined query always returns a row for the requested guild
+            row = dict.fromkeys(bot.GuildConfig.__slots__[1:])
+            row.update(guild_id=args[0][0], has_config=False, has_game=False, rule_types=None, rule_values=None)
+            return row
+        return None
+
+class SimulatedStatement:
+    def __init__(self, conn, query):
+        self.conn = conn
+        self.query = query
+
+    async def fetch(self, *args):
+        return await self.conn.fetch(self.query, *args)
+
+    async def fetchrow(self, *args):
+        return await self.conn.fetchrow(self.query, *args)
+
+class SimulatedPool:
+    def __init__(self, rtt_ms):
+        self.rtt = rtt_ms / 1000
+        self.round_trips = 0
+        self.prepared = {}
+
+    def acquire(self):
+        return self
+
+    async def __aenter__(self):
+        return SimulatedConnection(self)
+
+    async def __aexit__(self, *exc):
+        return False
+
+class CountingPool:
+    """Wraps a real asyncpg pool to count round trips."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.round_trips = 0
+
+    def acquire(self):
+        return CountingAcquire(self)
+
+class CountingAcquire:
+    def __init__(self, owner):
+        self.owner = owner
+        self.context = owner.pool.acquire()
+
+    async def __aenter__(self):
+        conn = await self.context.__aenter__()
+        return CountingConnection(self.owner, conn)
+
+    async def __aexit__(self, *exc):
+        return await self.context.__aexit__(*exc)
+
+class CountingConnection:
+    def __init__(self, owner, conn):
+        self.owner = owner
+        self.conn = conn
+        self.prepared = conn.prepared
+
+    async def prepare(self, query):
+        self.owner.round_trips += 1
+        return CountingStatement(self.owner, await self.conn.prepare(query))
+
+    async def fetch(self, query, *args):
+        self.owner.round_trips += 1
+        return await self.conn.fetch(query, *args)
+
+    async def fetchrow(self, query, *args):
+        self.owner.round_trips += 1
+        return await self.conn.fetchrow(query, *args)
+
+class CountingStatement:
+    def __init__(self, owner, statement):
+        self.owner = owner
+        self.statement = statement
+
+    async def fetch(self, *args):
+        self.owner.round_trips += 1
+        return await self.statement.fetch(*args)
+
+    async def fetchrow(self, *args):
+        self.owner.round_trips += 1
+        return await self.statement.fetchrow(*args)
+
+async def per_message_queries(guild_id, filtered):
+    """The lookups on_message made for every message before the context fetch."""
+    rows = await bot.db_fetch('''SELECT counting_channel FROM servers WHERE guild_id = $1''', guild_id)
+    async with bot.bot.db_pool.acquire() as conn:
+        row = await conn.fetchrow('''SELECT filter_level FROM servers WHERE guild_id = $1''', guild_id)
+    if filtered:
+        await bot.db_fetch('''SELECT logs_channel_id FROM servers WHERE guild_id = $1''', guild_id)
+    return rows, row
+
+async def context_cold(guild_id, filtered):
+    """get_message_context for a guild that isn't cached yet."""
+    bot.bot.guild_configs.pop(guild_id, None)
+    bot.bot.filter_rules.pop(guild_id, None)
+    bot.bot.counting_games.pop(guild_id, None)
+    return await bot.get_message_context(guild_id)
+
+async def context_warm(guild_id, filtered):
+    """get_message_context once the guild is cached."""
+    return await bot.get_message_context(guild_id)
+
+SCENARIOS = {
+    "per_message_queries": per_message_queries,
+    "context_cold": context_cold,
+    "context_warm": context_warm,
+}
+
+async def run(count, seed, filtered_rate, pool, backend):
+    rng = random.Random(seed)
+    bot.bot.db_pool = pool
+    guild_ids = [rng.randrange(10**17, 10**18) for _ in range(50)]
+    messages = [(rng.choice(guild_ids), rng.random() < filtered_rate) for _ in range(count)]
+    results = []
+    for scenario, func in SCENARIOS.items():
+        # Warm-up also fills the caches the warm scenario reads from
+        for guild_id in guild_ids:
+            await func(guild_id, False)
+        pool.round_trips = 0
+        latencies = []
+        for guild_id, filtered in messages:
+            start = perf_counter_ns()
+            await func(guild_id, filtered)
+            latencies.append(perf_counter_ns() - start)
+        result = {"scenario": scenario, "backend": backend, "filtered_rate": filtered_rate}
+        result.update(summarize(latencies))
+        result["round_trips_per_msg"] = round(pool.round_trips / count, 3)
+        results.append(result)
+    return results
+
+async def main_async(args):
+    count = 200 if args.quick else args.messages
+    if args.dsn:
+        import asyncpg
+        real_pool = await asyncpg.create_pool(
+            args.dsn, connection_class=bot.FrostConnection, init=bot.prepare_connection
+        )
+        try:
+            return await run(count, args.seed, args.filtered_rate, CountingPool(real_pool), "postgres")
+        finally:
+            await real_pool.close()
+    return await run(count, args.seed, args.filtered_rate, SimulatedPool(args.rtt_ms), f"simulated_{args.rtt_ms:g}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--quick", action="store_true", help="small run for a fast sanity check")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="simulated database round-trip time")
+    parser.add_argument("--filtered-rate", type=float, default=0.05, help="share of messages that trip the filter")
+    parser.add_argument("--dsn", help="run against this PostgreSQL database instead of the simulated pool")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    write_results("message_context", results, args.output)
+    if args.compare:
+        compare_results(
+            args.compare, results,
+            key_fields=("scenario", "backend", "filtered_rate"),
+            metrics=("msgs_per_sec", "p50_us", "p99_us", "round_trips_per_msg")
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Shared helpers for the FrostMod benchmark scripts.
+
+Benchmarks import bot.py directly, so they need the bot's requirements installed
+but no Discord token or database.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+def percentile(sorted_values, pct):
+    """Return the pct-th percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies_ns):
+    """Turn per-message latencies (ns) into throughput and percentile stats."""
+    latencies = sorted(latencies_ns)
+    total = sum(latencies)
+    count = len(latencies)
+    return {
+        "messages": count,
+        "msgs_per_sec": round(count / (total / 1e9), 1) if total else 0.0,
+        "mean_us": round(total / count / 1000, 3) if count else 0.0,
+        "p50_us": round(percentile(latencies, 50) / 1000, 3),
+        "p99_us": round(percentile(latencies, 99) / 1000, 3),
+    }
+
+def metadata():
+    """Describe the environment a result file came from."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+def write_results(name, results, output=None):
+    """Print results as JSON, or write them to a file if output is given."""
+    document = {"benchmark": name, "meta": metadata(), "results": results}
+    text = json.dumps(document, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {len(results)} results to {output}")
+    else:
+        print(text)
+    return document
+
+def compare_results(baseline_path, results, key_fields, metrics):
+    """Print the change in each metric against a previous result file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {tuple(r[k] for k in key_fields): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit') or 'unknown commit'}):")
+    for result in results:
+        key = tuple(result[k] for k in key_fields)
+        old = previous.get(key)
+        if old is None:
+            continue
+        changes = []
+        for metric in metrics:
+            if old.get(metric):
+                delta = (result[metric] - old[metric]) / old[metric] * 100
+                changes.append(f"{metric} {delta:+.1f}%")
+        print(f"  {' / '.join(str(k) for k in key)}: {', '.join(changes)}")
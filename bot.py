@@ -1,10 +1,19 @@
 import os
+import re
+import uuid
+import hashlib
+import random
 import discord
 import asyncio
 import logging
 import datetime
-from itertools import cycle
-from collections import defaultdict
+import time
+import heapq
+import bisect
+import unicodedata
+from typing import Optional
+from itertools import cycle, count
+from collections import defaultdict, deque, OrderedDict
 from discord import app_commands, ui
 from discord.ext import commands
 import asyncpg
@@ -27,6 +36,39 @@ DB_NAME = os.getenv("DB_NAME")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 OWNER_ID = int(os.getenv("OWNER_ID", "0"))
+FILTER_MATCHER_CACHE_SIZE = int(os.getenv("FILTER_MATCHER_CACHE_SIZE", "256"))
+FILTER_VERDICT_CACHE_SIZE = int(os.getenv("FILTER_VERDICT_CACHE_SIZE", "20000"))
+WARN_COUNT_CACHE_SIZE = int(os.getenv("WARN_COUNT_CACHE_SIZE", "50000"))
+FILTER_SHADOW_ENGINE = os.getenv("FILTER_SHADOW_ENGINE")
+FILTER_SHADOW_SAMPLE_RATE = float(os.getenv("FILTER_SHADOW_SAMPLE_RATE", "1.0"))
+FILTER_SHADOW_BUFFER_SIZE = int(os.getenv("FILTER_SHADOW_BUFFER_SIZE", "5000"))
+FILTER_SHADOW_FLUSH_SECONDS = int(os.getenv("FILTER_SHADOW_FLUSH_SECONDS", "60"))
+DELETION_PERSIST_SECONDS = float(os.getenv("DELETION_PERSIST_SECONDS", "2"))
+FLOOD_TRACKER_MAX_USERS = int(os.getenv("FLOOD_TRACKER_MAX_USERS", "100000"))
+FLOOD_TIMEOUT_SECONDS = int(os.getenv("FLOOD_TIMEOUT_SECONDS", "300"))
+DUPLICATE_WINDOW_SECONDS = int(os.getenv("DUPLICATE_WINDOW_SECONDS", "120"))
+DUPLICATE_MAX_ENTRIES = int(os.getenv("DUPLICATE_MAX_ENTRIES", "2000"))
+DUPLICATE_MIN_LENGTH = int(os.getenv("DUPLICATE_MIN_LENGTH", "30"))
+DUPLICATE_MIN_USERS = int(os.getenv("DUPLICATE_MIN_USERS", "10"))
+WARN_BATCH_SIZE = int(os.getenv("WARN_BATCH_SIZE", "100"))
+WARN_FLUSH_SECONDS = float(os.getenv("WARN_FLUSH_SECONDS", "1"))
+WARN_QUEUE_MAX = int(os.getenv("WARN_QUEUE_MAX", "10000"))
+EXPLAIN_HOT_QUERIES = os.getenv("EXPLAIN_HOT_QUERIES", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "5"))
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))
+DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "5"))
+DB_BREAKER_COOLDOWN = float(os.getenv("DB_BREAKER_COOLDOWN", "30"))
+DB_DEFERRED_WRITES_MAX = int(os.getenv("DB_DEFERRED_WRITES_MAX", "10000"))
+DB_REPLICA_DSN = os.getenv("DB_REPLICA_DSN")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "10"))
+LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "1"))
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "1000"))
+OUTBOUND_MAX_IN_FLIGHT = int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", "10"))
 
 # Set up Discord intents before bot definition
 intents = discord.Intents.default()
@@ -39,6 +81,24 @@ class FrostModBot(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix="!", intents=intents, application_id=None)
         self.db_pool = None
+        # Optional streaming replica for the queries in REPLICA_QUERIES, see read_pool
+        self.replica_pool = None
+        # Set once migrations have run, so new pool connections can prepare QUERIES up front
+        self.schema_ready = False
+        # Per-guild servers rows, see get_guild_config
+        self.guild_configs = {}
+        self.config_listener = None
+        # Per-guild counting_game rows, see get_counting_game
+        self.counting_games = {}
+        # Per-guild custom filter words and exemptions, see get_filter_rules
+        self.filter_rules = {}
+        # (guild_id, user_id) -> number of warns, loaded from warn_counts on first use and
+        # least recently used first, see cache_warn_count
+        self.warn_counts = OrderedDict()
+        # guild_id -> {warn count: (action, minutes)}, see get_escalation_ladder
+        self.escalation_ladders = {}
+        # Candidate filter engine run beside the live one, see FilterShadow
+        self.filter_shadow = None
         # Store bot start time in Texas timezone (Central Time)
         import datetime
         import pytz
@@ -69,14 +129,96 @@ class FrostModBot(commands.Bot):
         print("-------------------------------------------\n")
         
         # Connect to PostgreSQL
-        self.db_pool = await asyncpg.create_pool(
+        self.db_pool = InstrumentedPool(await asyncpg.create_pool(
             user=DB_USER,
             password=DB_PASS,
             database=DB_NAME,
             host=DB_HOST,
-            port=DB_PORT
-        )
+            port=DB_PORT,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            max_inactive_connection_lifetime=DB_MAX_INACTIVE_LIFETIME,
+            server_settings={
+                # Shows which bot process owns a connection in pg_stat_activity
+                'application_name': f"frostmod-{INSTANCE_ID[:8]}",
+                # Don't let a stuck handler hold locks inside an open transaction
+                'idle_in_transaction_session_timeout': str(int(DB_COMMAND_TIMEOUT * 6000)),
+            },
+            connection_class=FrostConnection,
+            init=prepare_connection
+        ), db_breaker)
         print("Connected to PostgreSQL!")
+        
+        # Bring the schema up to date, then log how the hot queries are planned
+        await run_migrations()
+        self.schema_ready = True
+        if EXPLAIN_HOT_QUERIES:
+            await explain_hot_queries()
+        
+        # Send latency-tolerant reads to the read replica if one is configured
+        if DB_REPLICA_DSN:
+            try:
+                self.replica_pool = InstrumentedPool(await asyncpg.create_pool(
+                    dsn=DB_REPLICA_DSN,
+                    min_size=1,
+                    max_size=DB_POOL_MAX_SIZE,
+                    command_timeout=DB_COMMAND_TIMEOUT,
+                    max_inactive_connection_lifetime=DB_MAX_INACTIVE_LIFETIME,
+                    server_settings={'application_name': f"frostmod-{INSTANCE_ID[:8]}-replica"},
+                    connection_class=FrostConnection,
+                    init=prepare_replica_connection
+                ), replica_breaker)
+            except Exception as e:
+                logger.error(f"Could not connect to the read replica, reading from the primary: {e}")
+            else:
+                print("Connected to the PostgreSQL read replica!")
+                await replica_monitor.check()
+                replica_monitor.start()
+        
+        # Keep cached guild configs in sync with other bot processes
+        await start_config_listener()
+        
+        # Load every guild's config before the gateway starts delivering events
+        await warm_config_cache()
+        
+        # Compare a candidate filter engine against live traffic if one is configured
+        if FILTER_SHADOW_ENGINE in FILTER_ENGINES:
+            self.filter_shadow = FilterShadow(FILTER_SHADOW_ENGINE)
+            self.loop.create_task(flush_filter_shadow())
+        elif FILTER_SHADOW_ENGINE:
+            logger.warning(
+                f"Unknown FILTER_SHADOW_ENGINE {FILTER_SHADOW_ENGINE!r} (expected one of "
+                f"{', '.join(FILTER_ENGINES)}), shadow mode is off"
+            )
+        
+        # Free fingerprint indexes of guilds that have gone quiet
+        self.loop.create_task(sweep_duplicate_index())
+        
+        # Pick up temporary messages that were still waiting to be deleted before a restart
+        await message_deletions.load()
+        message_deletions.start()
+        
+        # Batch warn inserts instead of writing each one in its own transaction
+        warn_writer.start()
+        
+        # Replay writes queued while the database circuit breaker was open
+        deferred_writes.start()
+
+    async def close(self):
+        if self.filter_shadow is not None:
+            await self.filter_shadow.flush()
+        await log_dispatcher.stop()
+        await message_deletions.stop()
+        await warn_writer.stop()
+        await deferred_writes.stop()
+        await replica_monitor.stop()
+        if self.replica_pool is not None:
+            await self.replica_pool.close()
+        if self.config_listener is not None:
+            self.config_listener.remove_termination_listener(on_config_listener_lost)
+            await self.config_listener.close()
+        await super().close()
 
 bot = FrostModBot()
 
@@ -97,6 +239,8 @@ async def on_ready():
     
     # Add persistent view for ticket buttons
     bot.add_view(TicketButton())
+    # /warns page buttons rebuild themselves from their custom_id
+    bot.add_dynamic_items(WarnsPageButton)
     
     # Log registered commands for debugging
     commands_registered = list(bot.tree.get_commands())
@@ -117,42 +261,39 @@ async def daily_birthday_check():
         month = today.month
         day = today.day
         try:
-            async with bot.db_pool.acquire() as conn:
-                # Find all birthdays for today
-                rows = await conn.fetch('''
-                    SELECT * FROM birthdays WHERE EXTRACT(MONTH FROM birthday) = $1 AND EXTRACT(DAY FROM birthday) = $2
-                ''', month, day)
-                # Group by guild
-                guild_birthdays = defaultdict(list)
-                for row in rows:
-                    guild_birthdays[row['guild_id']].append(row)
-                for guild_id, bdays in guild_birthdays.items():
-                    guild = bot.get_guild(guild_id)
-                    if not guild:
-                        continue
-                    server_row = await conn.fetchrow('''SELECT birthday_channel_id FROM servers WHERE guild_id = $1''', guild_id)
-                    if not server_row or not server_row['birthday_channel_id']:
-                        continue
-                    channel = guild.get_channel(server_row['birthday_channel_id'])
-                    if not channel:
-                        continue
-                    # Collect mentions/usernames
-                    mentions = []
-                    for row in bdays:
-                        member = guild.get_member(row['user_id'])
-                        mentions.append(member.mention if member else row['username'])
-                    mention_str = ' '.join(mentions)
-                    msg = f"Happy Birthday {mention_str}!\nFrostline wishes you the best birthday wishes!"
-                    embed = discord.Embed(
-                        title="🎉 Happy Birthday! 🎉",
-                        description=msg,
-                        color=discord.Color.magenta()
-                    )
-                    embed.set_footer(text="FrostMod Birthday System")
-                    try:
-                        await channel.send(embed=embed)
-                    except Exception as e:
-                        logger.error(f"Birthday Announce ERROR: {e}")
+            # Find all birthdays for today; a lagging replica is fine for a daily scan
+            rows = await query_fetch('birthdays_today', month, day)
+            # Group by guild
+            guild_birthdays = defaultdict(list)
+            for row in rows:
+                guild_birthdays[row['guild_id']].append(row)
+            for guild_id, bdays in guild_birthdays.items():
+                guild = bot.get_guild(guild_id)
+                if not guild:
+                    continue
+                config = await get_guild_config(guild_id)
+                if not config.birthday_channel_id:
+                    continue
+                channel = guild.get_channel(config.birthday_channel_id)
+                if not channel:
+                    continue
+                # Collect mentions/usernames
+                mentions = []
+                for row in bdays:
+                    member = guild.get_member(row['user_id'])
+                    mentions.append(member.mention if member else row['username'])
+                mention_str = ' '.join(mentions)
+                msg = f"Happy Birthday {mention_str}!\nFrostline wishes you the best birthday wishes!"
+                embed = discord.Embed(
+                    title="🎉 Happy Birthday! 🎉",
+                    description=msg,
+                    color=discord.Color.magenta()
+                )
+                embed.set_footer(text="FrostMod Birthday System")
+                try:
+                    await outbound.run('greeting', channel.guild.id, ('messages', channel.id), lambda: channel.send(embed=embed))
+                except Exception as e:
+                    logger.error(f"Birthday Announce ERROR: {e}")
         except Exception as e:
             logger.error(f"Birthday Check ERROR: {e}")
 
@@ -172,7 +313,8 @@ async def rotate_status():
 
 # --- Chat Filter Wordlists ---
 # These sets contain filtered words with different severity levels
-# Words are stored in lowercase for case-insensitive matching
+# Words are stored in lowercase for case-insensitive matching. Leetspeak and lookalike
+# spellings don't need their own entries, normalize_for_filter folds them before matching.
 STRICT_WORDS = {
     # General profanity, mild offensive terms
  
@@ -190,8 +332,7 @@ MODERATE_WORDS = {
 LIGHT_WORDS = {
     # Most severe hate speech and slurs
     "nigger", "kike", "chink", "retard", "spic", "nigga", "fag", "faggot", "coon", 
-    "monkey", "n1gg3r", "k1k3", "ch1nk", "r3tard", "sp1c", "n1gga", "f4g", "f4gg0t", 
-    "c00n", "m0nk3y", "negro", "rape", "jap", "mong", "paki", "mongoloid", "towelhead", 
+    "monkey", "negro", "rape", "jap", "mong", "paki", "mongoloid", "towelhead", 
     "jihad", "goatfucker", "sandnigger", "beaner", "cracker", "guido", "gypsy"
 }
 
@@ -200,12 +341,201 @@ STRICT_WORDS = {word.lower() for word in STRICT_WORDS}
 MODERATE_WORDS = {word.lower() for word in MODERATE_WORDS}
 LIGHT_WORDS = {word.lower() for word in LIGHT_WORDS}
 
-def check_message_for_filter(message_content, filter_level):
+# --- Chat Filter Normalization ---
+# Messages (and filter words) are folded to a canonical form before matching so that
+# case, leetspeak, lookalike letters, accents and invisible characters don't dodge the filter.
+
+LEET_CHARACTERS = {
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b',
+    '@': 'a', '$': 's', '!': 'i', '€': 'e', '£': 'l'
+}
+
+# Cyrillic and Greek letters that render like Latin ones
+CONFUSABLE_CHARACTERS = {
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o',
+    'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'ѕ': 's', 'і': 'i', 'ї': 'i',
+    'ј': 'j', 'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w', 'ո': 'n', 'ɡ': 'g', 'ı': 'i',
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o',
+    'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x', 'ω': 'w'
+}
+
+# Zero-width and soft-hyphen characters are dropped entirely
+INVISIBLE_CHARACTERS = '\u00ad\u180e\u200b\u200c\u200d\u2060\ufeff'
+
+FILTER_TRANSLATION = str.maketrans({
+    **LEET_CHARACTERS,
+    **CONFUSABLE_CHARACTERS,
+    **{ch: None for ch in INVISIBLE_CHARACTERS},
+    # Combining accents left over from NFKD decomposition
+    **{chr(code): None for code in range(0x0300, 0x0370)}
+})
+
+# Single letters separated by spaces or punctuation, e.g. "n i g g a" or "k.y.s"
+SPACED_LETTERS_RE = re.compile(r'(?<!\w)(?:\w[\s.\-_*]+){2,}\w(?!\w)')
+SPACING_RE = re.compile(r'[\s.\-_*]+')
+
+def normalize_for_filter(text):
+    """Fold text to the canonical form used by the chat filter.
+    
+    Case is folded, compatibility characters (fullwidth, math letters, accents) are
+    decomposed, and leetspeak, lookalike and invisible characters are mapped through
+    one precomputed translation table. Letters spaced out one at a time are joined.
+    Repeated letters are handled by WordMatcher.find rather than here.
+    
+    Args:
+        text (str): The text to normalize
+        
+    Returns:
+        str: The normalized text
+    """
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+    text = text.casefold().translate(FILTER_TRANSLATION)
+    if SPACED_LETTERS_RE.search(text):
+        text = SPACED_LETTERS_RE.sub(lambda m: SPACING_RE.sub('', m.group()), text)
+    return text
+
+class WordMatcher:
+    """Aho-Corasick automaton that finds any of a set of words in a single pass.
+
+    The automaton is built once from the word list; matching walks the text one
+    character at a time, so the cost doesn't grow with the number of words.
+    Words are compiled in their normalize_for_filter form but reported as given.
+    """
+    __slots__ = ('_goto', '_fail', '_output', 'size')
+
+    def __init__(self, words):
+        goto = [{}]
+        output = [None]
+        size = 0
+        # Sorted so the reported word is the same from run to run
+        for word in sorted(words):
+            pattern = normalize_for_filter(word)
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    output.append(None)
+                state = nxt
+            if output[state] is None:
+                size += 1
+            output[state] = word
+
+        # Breadth-first pass to link each state to its longest proper suffix state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                # A state also matches whatever its suffix state matches
+                if output[nxt] is None:
+                    output[nxt] = output[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+        self.size = size
+
+    def find(self, text):
+        """Return the first word found in normalized text (by end position), or None.
+        
+        Alongside the normal walk, a second "tolerant" walk skips a repeated character
+        when it can't extend the partial match, so stretched spellings like "niiiigger"
+        or "kill  yourself" still match. Both walks share the automaton and only
+        separate after such a skip, so ordinary text costs a single walk.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = tolerant = 0
+        previous = None
+        for ch in text:
+            repeat = ch == previous
+            previous = ch
+            if tolerant != state:
+                # The walks have diverged, advance the tolerant one on its own
+                if not (repeat and ch not in goto[tolerant]):
+                    while tolerant and ch not in goto[tolerant]:
+                        tolerant = fail[tolerant]
+                    tolerant = goto[tolerant].get(ch, 0)
+                    if output[tolerant] is not None:
+                        return output[tolerant]
+                synced = False
+            else:
+                # Stay in step unless this is a stretched letter to skip
+                synced = not (repeat and state and ch not in goto[state])
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state] is not None:
+                return output[state]
+            if synced:
+                tolerant = state
+        return None
+
+# Words blocked at each filter level; at 'none' only a guild's custom words are
+FILTER_LEVEL_WORDS = {
+    'none': frozenset(),
+    'light': frozenset(LIGHT_WORDS),
+    'moderate': frozenset(MODERATE_WORDS | LIGHT_WORDS),
+    'strict': frozenset(STRICT_WORDS | MODERATE_WORDS | LIGHT_WORDS),
+}
+
+# Compiled once at startup, one automaton per filter level
+FILTER_MATCHERS = {level: WordMatcher(words) for level, words in FILTER_LEVEL_WORDS.items() if words}
+
+# Matchers for guilds with custom words, keyed by (guild_id, filter_level) -> (version, matcher).
+# Least recently used entries are evicted once FILTER_MATCHER_CACHE_SIZE is reached.
+guild_matchers = OrderedDict()
+
+def get_filter_matcher(filter_level, rules=None):
+    """Get the compiled matcher for a filter level and a guild's custom words.
+    
+    Guilds without custom words share the per-level matcher. Others get their own,
+    built on first use and rebuilt only when their rules version changes.
+    
+    Args:
+        filter_level (str): The filter level
+        rules (FilterRules, optional): The guild's custom filter rules
+        
+    Returns:
+        WordMatcher: The matcher, or None if nothing is filtered at this level
+    """
+    base = FILTER_MATCHERS.get(filter_level)
+    if filter_level not in FILTER_LEVEL_WORDS or rules is None or not (rules.blocked or rules.allowed):
+        return base
+        
+    key = (rules.guild_id, filter_level)
+    entry = guild_matchers.get(key)
+    if entry is not None and entry[0] == rules.version:
+        guild_matchers.move_to_end(key)
+        return entry[1]
+        
+    allowed = {normalize_for_filter(word) for word in rules.allowed}
+    words = [word for word in FILTER_LEVEL_WORDS[filter_level] | rules.blocked if normalize_for_filter(word) not in allowed]
+    matcher = WordMatcher(words) if words else None
+    guild_matchers[key] = (rules.version, matcher)
+    guild_matchers.move_to_end(key)
+    while len(guild_matchers) > FILTER_MATCHER_CACHE_SIZE:
+        guild_matchers.popitem(last=False)
+    return matcher
+
+def check_message_for_filter(message_content, filter_level, rules=None):
     """Check if a message contains filtered words based on the filter level.
     
     Args:
         message_content (str): The message content to check
         filter_level (str): The filter level ('none', 'strict', 'moderate', or 'light')
+        rules (FilterRules, optional): The guild's custom blocked and allowed words
         
     Returns:
         tuple: (bool, str) - Whether the message is blocked and the offending word if any
@@ -213,27 +543,58 @@ def check_message_for_filter(message_content, filter_level):
     if not message_content or not filter_level:
         return False, None
         
-    # If filter level is set to none, don't filter any messages
-    if filter_level == 'none':
+    # 'none' without custom words (or an unknown level) has no matcher, so nothing is filtered
+    matcher = get_filter_matcher(filter_level, rules)
+    if matcher is None:
         return False, None
         
-    lowered = message_content.lower()
-    
-    # Use sets for more efficient lookups
-    if filter_level == 'strict':
-        for word in STRICT_WORDS | MODERATE_WORDS | LIGHT_WORDS:
-            if word.lower() in lowered:
-                return True, word
-    elif filter_level == 'moderate':
-        for word in MODERATE_WORDS | LIGHT_WORDS:
-            if word.lower() in lowered:
-                return True, word
-    elif filter_level == 'light':
-        for word in LIGHT_WORDS:
-            if word.lower() in lowered:
-                return True, word
+    word = matcher.find(normalize_for_filter(message_content))
+    if word is not None:
+        return True, word
     return False, None
 
+class VerdictCache:
+    """Bounded LRU of filter verdicts, so repeated content (spam waves, copypasta) is only scanned once.
+    
+    Entries are keyed by a digest of the content, the filter level and the guild's rules
+    version. Changing a guild's level or custom words changes its key, so stale verdicts
+    are never returned and simply age out of the cache.
+    """
+    __slots__ = ('entries', 'max_size', 'hits', 'misses')
+
+    def __init__(self, max_size):
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def check(self, message_content, filter_level, rules=None):
+        """Same as check_message_for_filter, answered from the cache when possible."""
+        if not message_content or self.max_size <= 0:
+            return check_message_for_filter(message_content, filter_level, rules)
+        
+        # Guilds without custom words all share the per-level verdicts
+        version = rules.version if rules is not None and (rules.blocked or rules.allowed) else 0
+        digest = hashlib.blake2b(message_content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        key = (filter_level, version, digest)
+        verdict = self.entries.get(key)
+        if verdict is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return verdict
+            
+        self.misses += 1
+        verdict = check_message_for_filter(message_content, filter_level, rules)
+        self.entries[key] = verdict
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return verdict
+
+    def clear(self):
+        self.entries.clear()
+
+filter_verdicts = VerdictCache(FILTER_VERDICT_CACHE_SIZE)
+
 async def get_filter_level(guild_id):
     """Get the filter level for a guild.
     
@@ -244,9 +605,8 @@ async def get_filter_level(guild_id):
         str: The filter level ('none', 'strict', 'moderate', or 'light')
     """
     try:
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT filter_level FROM servers WHERE guild_id = $1''', guild_id)
-        return row['filter_level'] if row and row['filter_level'] else 'light'
+        config = await get_guild_config(guild_id)
+        return config.filter_level or 'light'
     except Exception as e:
         logger.error(f"Error getting filter level for guild {guild_id}: {e}")
         return 'light'  # Default to light filtering if there's an error
@@ -260,14 +620,7 @@ async def set_filter_level(guild_id, level, guild_name=None):
         guild_name (str, optional): The guild name
     """
     try:
-        async with bot.db_pool.acquire() as conn:
-            # Use upsert pattern for cleaner code
-            await conn.execute('''
-                INSERT INTO servers (guild_id, guild_name, filter_level) 
-                VALUES ($1, $2, $3)
-                ON CONFLICT (guild_id) 
-                DO UPDATE SET filter_level = $3, guild_name = COALESCE($2, servers.guild_name)
-            ''', guild_id, guild_name or "Unknown", level)
+        await update_guild_config(guild_id, guild_name, filter_level=level)
         logger.info(f"Set filter_level={level} for guild {guild_id}")
     except Exception as e:
         logger.error(f"Error setting filter level for guild {guild_id}: {e}")
@@ -289,11 +642,10 @@ async def is_admin(interaction):
         
     try:
         # Then check for mod role
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT mod_role_id FROM servers WHERE guild_id = $1''', interaction.guild.id)
+        config = await get_guild_config(interaction.guild.id)
         
-        if row and row['mod_role_id']:
-            mod_role = interaction.guild.get_role(row['mod_role_id'])
+        if config.mod_role_id:
+            mod_role = interaction.guild.get_role(config.mod_role_id)
             if mod_role and mod_role in interaction.user.roles:
                 logger.debug(f"User {interaction.user.name} has mod role: {mod_role.name}")
                 return True
@@ -304,6 +656,299 @@ async def is_admin(interaction):
         
     return False
 
+# --- Database Instrumentation ---
+# bot.db_pool is wrapped in InstrumentedPool, so every acquire and every query made
+# through it is timed without changing call sites. Queries are grouped by name:
+# named queries (see QUERIES) by their registry name, everything else by a label
+# built from the SQL, such as "select warns" or "insert tickets". Counts, latency
+# histograms and pool wait times are shown in /perfstats, and queries slower than
+# SLOW_QUERY_MS are logged with their arguments reduced to types and sizes.
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds the rest
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+SQL_COMMENT_RE = re.compile(r'--[^\n]*')
+SQL_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+(\w+)', re.IGNORECASE)
+SQL_FUNCTION_RE = re.compile(r'^SELECT\s+(\w+)\s*\(', re.IGNORECASE)
+
+class LatencyHistogram:
+    """Call count, errors and a bucketed latency distribution."""
+    __slots__ = ('buckets', 'count', 'errors', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given percentile, e.g. 0.99."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, bucket in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+class QueryStats:
+    """Per-query latency histograms and a count of slow queries."""
+
+    def __init__(self):
+        self.queries = defaultdict(LatencyHistogram)
+        self.slow = 0
+        # SQL text -> label, see query_label
+        self.labels = {}
+
+    def record(self, name, start, query, args, failed=False):
+        """Record a query that began at perf_counter() time `start`."""
+        elapsed = (time.perf_counter() - start) * 1000
+        stats = self.queries[name]
+        stats.record(elapsed)
+        if failed:
+            stats.errors += 1
+        if elapsed >= SLOW_QUERY_MS:
+            self.slow += 1
+            logger.warning(f"Slow query {name} took {elapsed:.1f}ms, args {redact_args(args)}: {' '.join(query.split())[:500]}")
+
+    def top(self, limit=5):
+        """The query names that have taken the most total time."""
+        return sorted(self.queries.items(), key=lambda item: item[1].total_ms, reverse=True)[:limit]
+
+query_stats = QueryStats()
+
+def redact_args(args):
+    """Describe query arguments by type and size, so logs never hold member data."""
+    described = []
+    for value in args:
+        if isinstance(value, (str, bytes, list, tuple)):
+            described.append(f"{type(value).__name__}[{len(value)}]")
+        else:
+            described.append(type(value).__name__)
+    return f"({', '.join(described)})"
+
+def query_label(query):
+    """Name a query for the stats: its QUERIES name, or its verb and table."""
+    label = query_stats.labels.get(query)
+    if label is not None:
+        return label
+    label = next((name for name, sql in QUERIES.items() if sql == query), None)
+    if label is None:
+        text = SQL_COMMENT_RE.sub('', query).strip()
+        verb = text.split(None, 1)[0].lower() if text else 'query'
+        function = SQL_FUNCTION_RE.match(text)
+        table = SQL_TABLE_RE.search(text)
+        if function:
+            label = f"select {function[1]}"
+        elif table and verb in ('select', 'insert', 'update', 'delete', 'with'):
+            label = f"{verb} {table[1]}"
+        else:
+            label = verb
+    query_stats.labels[query] = label
+    return label
+
+# --- Database Circuit Breaker ---
+# When PostgreSQL stops answering, every handler waiting on the pool would otherwise
+# pile up behind DB_ACQUIRE_TIMEOUT and log its own error. After DB_BREAKER_FAILURES
+# connection failures or timeouts in a row the breaker opens: acquire() fails at once
+# with DatabaseUnavailable, config reads fall back to the cache or defaults, and
+# writes that can wait are queued in deferred_writes. After DB_BREAKER_COOLDOWN
+# seconds one request is let through as a probe; if it succeeds the breaker closes.
+
+class DatabaseUnavailable(Exception):
+    """Raised instead of waiting for a connection while the circuit breaker is open."""
+
+# Errors that mean the database is unreachable or overloaded, as opposed to a bad query.
+# asyncpg raises asyncio.TimeoutError for acquire and command timeouts.
+DB_AVAILABILITY_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.ConnectionDoesNotExistError,
+    asyncpg.exceptions.TooManyConnectionsError,
+    asyncpg.exceptions.CannotConnectNowError,
+)
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half open (one probe) -> closed."""
+
+    def __init__(self, name, failure_threshold, cooldown):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+        self.rejected = 0
+        # Called when the breaker closes again after being open
+        self.on_close = None
+
+    @property
+    def is_open(self):
+        """Whether requests are being turned away right now (no probe is due)."""
+        if self.state == 'closed':
+            return False
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+            return False
+        return self.state == 'open' or self.probing
+
+    def allow(self):
+        """Whether a request may go to the database; lets one probe through when due."""
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = 'half_open'
+        if self.state == 'half_open' and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self):
+        if self.state != 'closed':
+            logger.info(f"{self.name} is reachable again, closing the circuit breaker")
+            if self.on_close is not None:
+                self.on_close()
+        self.state = 'closed'
+        self.failures = 0
+        self.probing = False
+
+    def release_probe(self):
+        """Give up a probe that ended without telling whether the database is back."""
+        self.probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+            if self.state == 'closed':
+                self.trips += 1
+                logger.error(f"{self.name} failed {self.failures} times in a row, opening the circuit breaker for {self.cooldown:g}s")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+db_breaker = CircuitBreaker("Database", DB_BREAKER_FAILURES, DB_BREAKER_COOLDOWN)
+replica_breaker = CircuitBreaker("Read replica", DB_BREAKER_FAILURES, DB_BREAKER_COOLDOWN)
+
+class InstrumentedPool:
+    """Wraps an asyncpg pool to time acquires and the queries run on its connections.
+    
+    Args:
+        pool (asyncpg.Pool): The pool to wrap
+        breaker (CircuitBreaker): Breaker tripped by this pool's connection failures
+    """
+
+    def __init__(self, pool, breaker):
+        self.pool = pool
+        self.breaker = breaker
+        self.acquire_wait = LatencyHistogram()
+
+    def acquire(self):
+        return InstrumentedAcquire(self, self.pool.acquire(timeout=DB_ACQUIRE_TIMEOUT))
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+class InstrumentedAcquire:
+    def __init__(self, owner, context):
+        self.breaker = owner.breaker
+        self.acquire_wait = owner.acquire_wait
+        self.context = context
+        # Whether this acquire is the breaker's half-open probe
+        self.probe = False
+
+    async def __aenter__(self):
+        if not self.breaker.allow():
+            raise DatabaseUnavailable(f"{self.breaker.name} circuit breaker is open")
+        self.probe = self.breaker.state == 'half_open'
+        start = time.perf_counter()
+        try:
+            conn = await self.context.__aenter__()
+        except asyncio.CancelledError:
+            if self.probe:
+                self.breaker.release_probe()
+            raise
+        except BaseException:
+            # No connection to hand back, e.g. refused, timed out or a bad password
+            self.breaker.failure()
+            raise
+        self.acquire_wait.record((time.perf_counter() - start) * 1000)
+        return InstrumentedConnection(conn)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, (asyncio.CancelledError, DatabaseUnavailable)):
+            # Cancelled mid-query, or a nested acquire was turned away while this one
+            # probed; neither says anything about the database
+            if self.probe:
+                self.breaker.release_probe()
+        elif exc_type is None or not issubclass(exc_type, DB_AVAILABILITY_ERRORS):
+            # The database answered, even if the query itself was rejected
+            self.breaker.success()
+        elif issubclass(exc_type, DB_AVAILABILITY_ERRORS):
+            self.breaker.failure()
+        return await self.context.__aexit__(exc_type, exc, tb)
+
+class InstrumentedConnection:
+    """Pooled connection whose query methods are timed; everything else passes through."""
+    __slots__ = ('conn',)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    async def timed(self, method, query, args, kwargs):
+        start = time.perf_counter()
+        try:
+            result = await method(query, *args, **kwargs)
+        except Exception:
+            query_stats.record(query_label(query), start, query, args, failed=True)
+            raise
+        query_stats.record(query_label(query), start, query, args)
+        return result
+
+    async def execute(self, query, *args, **kwargs):
+        return await self.timed(self.conn.execute, query, args, kwargs)
+
+    async def fetch(self, query, *args, **kwargs):
+        return await self.timed(self.conn.fetch, query, args, kwargs)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        return await self.timed(self.conn.fetchrow, query, args, kwargs)
+
+    async def fetchval(self, query, *args, **kwargs):
+        return await self.timed(self.conn.fetchval, query, args, kwargs)
+
+    async def executemany(self, query, args, **kwargs):
+        return await self.timed(self.conn.executemany, query, (args,), kwargs)
+
+    async def copy_records_to_table(self, table_name, **kwargs):
+        start = time.perf_counter()
+        label = f"copy {table_name}"
+        records = (kwargs.get('records', ()),)
+        try:
+            result = await self.conn.copy_records_to_table(table_name, **kwargs)
+        except Exception:
+            query_stats.record(label, start, label, records, failed=True)
+            raise
+        query_stats.record(label, start, label, records)
+        return result
+
 async def db_execute(query, *args):
     """Execute a database query.
     
@@ -317,6 +962,8 @@ async def db_execute(query, *args):
     try:
         async with bot.db_pool.acquire() as conn:
             return await conn.execute(query, *args)
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Database execute error: {e}\nQuery: {query}\nArgs: {args}")
         raise
@@ -334,133 +981,2844 @@ async def db_fetch(query, *args):
     try:
         async with bot.db_pool.acquire() as conn:
             return await conn.fetch(query, *args)
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Database fetch error: {e}\nQuery: {query}\nArgs: {args}")
         raise
 
-# --- Moderation Commands ---
+# --- Guild Config Cache ---
+# Each guild's row in the servers table is loaded once and kept in bot.guild_configs.
+# Config commands write through update_guild_config, which refreshes the cached copy
+# and sends a NOTIFY so other bot processes drop their stale copy.
 
-from discord import app_commands
+CONFIG_NOTIFY_CHANNEL = "frostmod_config"
+INSTANCE_ID = uuid.uuid4().hex
 
-@bot.tree.command(name="filter", description="Set the chat filter level for this server (admin only)")
-@app_commands.describe(level="Filter level: none, light, moderate, or strict")
-@app_commands.choices(level=[
-    app_commands.Choice(name="None (no filtering)", value="none"),
-    app_commands.Choice(name="Light (only blocks egregious text)", value="light"),
-    app_commands.Choice(name="Moderate (no slurs)", value="moderate"),
-    app_commands.Choice(name="Strict (fully family friendly)", value="strict")
-])
-async def filter_command(interaction: discord.Interaction, level: app_commands.Choice[str]):
-    """Admin-only: Set the chat filter level for this server."""
-    if not await is_admin(interaction):
-        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
-        return
-    await set_filter_level(interaction.guild.id, level.value, interaction.guild.name)
-    await interaction.response.send_message(f"Chat filter level set to **{level.value}**.", ephemeral=True)
+class GuildConfig:
+    """In-memory copy of a guild's row in the servers table."""
+    __slots__ = (
+        'guild_id', 'guild_name', 'welcome_channel_id', 'welcome_message',
+        'leave_channel_id', 'leave_message', 'join_role_id', 'logs_channel_id',
+        'ticket_channel_id', 'birthday_channel_id', 'help_channel_id',
+        'filter_level', 'mod_role_id', 'counting_channel',
+        'flood_action', 'flood_messages', 'flood_seconds', 'flood_mentions', 'flood_links',
+        'flood_duplicates', 'log_webhooks'
+    )
 
-# --- Birthday Commands ---
-from discord.app_commands import describe
+    guild_id: int
+    guild_name: Optional[str]
+    welcome_channel_id: Optional[int]
+    welcome_message: Optional[str]
+    leave_channel_id: Optional[int]
+    leave_message: Optional[str]
+    join_role_id: Optional[int]
+    logs_channel_id: Optional[int]
+    ticket_channel_id: Optional[int]
+    birthday_channel_id: Optional[int]
+    help_channel_id: Optional[int]
+    filter_level: Optional[str]
+    mod_role_id: Optional[int]
+    counting_channel: Optional[int]
+    flood_action: Optional[str]
+    flood_messages: Optional[int]
+    flood_seconds: Optional[int]
+    flood_mentions: Optional[int]
+    flood_links: Optional[int]
+    flood_duplicates: Optional[int]
+    log_webhooks: Optional[int]
 
-@bot.tree.command(name="testbirthdays", description="Test birthday announcements for today (admin only)")
-async def testbirthdays(interaction: discord.Interaction):
-    """Admin-only: Immediately run birthday announcement logic for this guild for today."""
-    if not await is_admin(interaction):
-        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
-        return
-    import datetime
-    today = datetime.date.today()
-    month = today.month
-    day = today.day
-    try:
-        async with bot.db_pool.acquire() as conn:
-            rows = await conn.fetch('''
-                SELECT * FROM birthdays WHERE guild_id = $1 AND EXTRACT(MONTH FROM birthday) = $2 AND EXTRACT(DAY FROM birthday) = $3
-            ''', interaction.guild.id, month, day)
-            if not rows:
-                await interaction.response.send_message("No birthdays found for today in this server.", ephemeral=True)
-                return
-            server_row = await conn.fetchrow('''SELECT birthday_channel_id FROM servers WHERE guild_id = $1''', interaction.guild.id)
-            if not server_row or not server_row['birthday_channel_id']:
-                await interaction.response.send_message("Birthday channel is not set for this server.", ephemeral=True)
-                return
-            channel = interaction.guild.get_channel(server_row['birthday_channel_id'])
-            if not channel:
-                await interaction.response.send_message("Birthday channel not found in this server.", ephemeral=True)
-                return
-            mentions = []
-            for row in rows:
-                member = interaction.guild.get_member(row['user_id'])
-                mentions.append(member.mention if member else row['username'])
-            mention_str = ' '.join(mentions)
-            msg = f"Happy Birthday {mention_str}!\nFrostline wishes you the best birthday wishes!"
-            embed = discord.Embed(
-                title="🎉 Happy Birthday! 🎉",
-                description=msg,
-                color=discord.Color.magenta()
-            )
-            embed.set_footer(text="FrostMod Birthday System")
-            await channel.send(embed=embed)
-            await interaction.response.send_message("Birthday announcement sent!", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"[ERROR] {e}", ephemeral=True)
+    def __init__(self, guild_id: int, record=None):
+        self.guild_id = guild_id
+        for name in self.__slots__[1:]:
+            setattr(self, name, record[name] if record else None)
 
-@bot.tree.command(name="delbday", description="Delete a user's birthday (admins can delete any, users can delete their own)")
-@describe(user="The user whose birthday to delete")
-async def delbday(interaction: discord.Interaction, user: discord.Member):
-    """Delete a user's birthday. Users can delete their own, admins (or mod role) can delete any."""
-    # Check if the user is deleting their own birthday or is admin
-    is_self = user.id == interaction.user.id
-    is_admin_user = await is_admin(interaction)
-    if not (is_self or is_admin_user):
-        await interaction.response.send_message("You can only delete your own birthday.", ephemeral=True)
-        return
+    def __repr__(self):
+        return f"<GuildConfig guild_id={self.guild_id} filter_level={self.filter_level!r}>"
+
+GUILD_CONFIG_COLUMNS = ', '.join(GuildConfig.__slots__)
+GUILD_CONFIG_SELECT = f'''SELECT {GUILD_CONFIG_COLUMNS} FROM servers WHERE guild_id = $1'''
+
+async def get_guild_config(guild_id):
+    """Get the cached config for a guild, loading it from the database on first use.
+
+    Guilds without a servers row are cached as an empty config so they don't
+    cost a query on every event either.
+
+    Args:
+        guild_id (int): The guild ID
+
+    Returns:
+        GuildConfig: The guild's configuration
+    """
+    config = bot.guild_configs.get(guild_id)
+    if config is not None:
+        return config
     try:
-        async with bot.db_pool.acquire() as conn:
-            result = await conn.execute(
-                '''DELETE FROM birthdays WHERE guild_id = $1 AND user_id = $2''',
-                interaction.guild.id, user.id
-            )
-        if result and result.startswith("DELETE"):
-            print(f"[BIRTHDAY DELETED] {user} ({user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
-            await interaction.response.send_message(f"Birthday for {user.display_name} deleted.", ephemeral=True)
-        else:
-            await interaction.response.send_message(f"No birthday found for {user.display_name}.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"[ERROR] Could not delete birthday: {e}", ephemeral=True)
+        row = await query_fetchrow('guild_config', guild_id)
+    except DatabaseUnavailable:
+        # Use defaults without caching them until the database is back
+        return GuildConfig(guild_id)
+    # A config command may have written a fresher copy while we were waiting
+    return bot.guild_configs.setdefault(guild_id, GuildConfig(guild_id, row))
 
-@bot.tree.command(name="setbirthday", description="Set your birthday (mm/dd/yyyy)")
-@describe(date="Your birthday in mm/dd/yyyy format")
-async def setbirthday(interaction: discord.Interaction, date: str):
-    """Allow a user to set their birthday."""
+async def update_guild_config(guild_id, guild_name=None, **fields):
+    """Write config columns for a guild and refresh the cached copy.
+
+    The servers row is created if it doesn't exist yet. Other bot processes are
+    told to drop their cached copy through Postgres NOTIFY.
+
+    Args:
+        guild_id (int): The guild ID
+        guild_name (str, optional): The guild name
+        **fields: servers columns to set, e.g. logs_channel_id=123
+
+    Returns:
+        GuildConfig: The updated configuration
+    """
+    unknown = set(fields) - set(GuildConfig.__slots__[2:])
+    if not fields or unknown:
+        raise ValueError(f"Invalid guild config fields: {', '.join(unknown) or 'none given'}")
+    columns = list(fields)
+    placeholders = ', '.join(f"${i + 3}" for i in range(len(columns)))
+    assignments = ', '.join(f"{col} = EXCLUDED.{col}" for col in columns)
+    query = f'''
+        INSERT INTO servers (guild_id, guild_name, {', '.join(columns)})
+        VALUES ($1, $2, {placeholders})
+        ON CONFLICT (guild_id)
+        DO UPDATE SET {assignments}, guild_name = COALESCE($2, servers.guild_name)
+        RETURNING {GUILD_CONFIG_COLUMNS}
+    '''
+    async with bot.db_pool.acquire() as conn:
+        async with conn.transaction():
+            row = await conn.fetchrow(query, guild_id, guild_name, *fields.values())
+            await conn.execute('''SELECT pg_notify($1, $2)''', CONFIG_NOTIFY_CHANNEL, f"{INSTANCE_ID}:{guild_id}")
+    config = GuildConfig(guild_id, row)
+    bot.guild_configs[guild_id] = config
+    return config
+
+def on_config_notify(connection, pid, channel, payload):
+    """Drop a guild's cached config, or cached warn counts, when another process changed them.
+    
+    Payloads are "instance:guild_id" for config, and "instance:warns:guild_id[:user_id]"
+    for one member's warn count or a whole guild's.
+    """
     try:
-        # Parse date
-        birthday = datetime.datetime.strptime(date, "%m/%d/%Y").date()
-        
-        # Validate the date
-        today = datetime.date.today()
-        
-        # Prevent future dates
-        if birthday > today:
-            await interaction.response.send_message("Birthday cannot be in the future!", ephemeral=True)
+        instance_id, target = payload.split(':', 1)
+        if instance_id == INSTANCE_ID:
             return
-            
-        # Reasonable age check (older than 120 years is unlikely)
-        years_ago = today.replace(year=today.year - 120)
-        if birthday < years_ago:
-            await interaction.response.send_message("Please enter a valid birthday. The date you entered is too far in the past.", ephemeral=True)
+        if target.startswith('warns:'):
+            ids = [int(part) for part in target.split(':')[1:]]
+            if len(ids) == 2:
+                bot.warn_counts.pop(tuple(ids), None)
+            else:
+                for key in [key for key in bot.warn_counts if key[0] == ids[0]]:
+                    del bot.warn_counts[key]
             return
-            
-        # Insert or update birthday
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                INSERT INTO birthdays (guild_id, guild_name, user_id, username, birthday)
-                VALUES ($1, $2, $3, $4, $5)
-                ON CONFLICT (guild_id, user_id) DO UPDATE SET
-                    username = EXCLUDED.username,
-                    birthday = EXCLUDED.birthday
-            ''',
-                interaction.guild.id,
-                interaction.guild.name,
+        bot.guild_configs.pop(int(target), None)
+        bot.filter_rules.pop(int(target), None)
+        bot.escalation_ladders.pop(int(target), None)
+    except ValueError:
+        logger.warning(f"Ignoring malformed config notification: {payload!r}")
+
+def on_config_listener_lost(connection):
+    """Invalidate everything when the NOTIFY connection drops, since changes may be missed."""
+    logger.warning("Config listener connection lost, clearing guild config cache")
+    bot.guild_configs.clear()
+    bot.filter_rules.clear()
+    bot.escalation_ladders.clear()
+    bot.warn_counts.clear()
+    if not bot.is_closed():
+        bot.loop.create_task(start_config_listener(delay=5))
+
+async def start_config_listener(delay=0):
+    """Open a dedicated connection that LISTENs for config changes from other processes."""
+    await asyncio.sleep(delay)
+    try:
+        conn = await asyncpg.connect(
+            user=DB_USER,
+            password=DB_PASS,
+            database=DB_NAME,
+            host=DB_HOST,
+            port=DB_PORT
+        )
+        await conn.add_listener(CONFIG_NOTIFY_CHANNEL, on_config_notify)
+        conn.add_termination_listener(on_config_listener_lost)
+        bot.config_listener = conn
+        # Anything cached before LISTEN started may have missed a notification
+        bot.guild_configs.clear()
+        bot.filter_rules.clear()
+        bot.escalation_ladders.clear()
+    except Exception as e:
+        logger.error(f"Could not start config listener: {e}")
+        if not bot.is_closed():
+            bot.loop.create_task(start_config_listener(delay=30))
+
+# --- Custom Filter Rules ---
+# Guilds can block extra words, allow words from the built-in lists, and exempt roles
+# and channels from the filter. Rules are stored in filter_rules and cached per guild.
+
+FILTER_RULE_TYPES = ('block', 'allow', 'exempt_role', 'exempt_channel')
+MAX_FILTER_RULES = 500
+filter_rules_version = count(1)
+
+class FilterRules:
+    """A guild's custom filter words and exemptions."""
+    __slots__ = ('guild_id', 'blocked', 'allowed', 'exempt_roles', 'exempt_channels', 'version')
+
+    guild_id: int
+    blocked: frozenset
+    allowed: frozenset
+    exempt_roles: frozenset
+    exempt_channels: frozenset
+    version: int
+
+    def __init__(self, guild_id: int, rows=()):
+        values = defaultdict(set)
+        for rule_type, value in rows:
+            values[rule_type].add(value)
+        self.guild_id = guild_id
+        self.blocked = frozenset(values['block'])
+        self.allowed = frozenset(values['allow'])
+        self.exempt_roles = frozenset(int(v) for v in values['exempt_role'])
+        self.exempt_channels = frozenset(int(v) for v in values['exempt_channel'])
+        # Unique across guilds, so compiled matchers can tell when they're stale
+        self.version = next(filter_rules_version)
+
+    def __len__(self):
+        return len(self.blocked) + len(self.allowed) + len(self.exempt_roles) + len(self.exempt_channels)
+
+async def get_filter_rules(guild_id):
+    """Get the cached custom filter rules for a guild, loading them on first use.
+    
+    Args:
+        guild_id (int): The guild ID
+        
+    Returns:
+        FilterRules: The guild's rules, or None if they couldn't be loaded
+    """
+    rules = bot.filter_rules.get(guild_id)
+    if rules is not None:
+        return rules
+    try:
+        rows = await query_fetch('filter_rules', guild_id)
+    except Exception as e:
+        logger.error(f"Error getting filter rules for guild {guild_id}: {e}")
+        return None
+    return bot.filter_rules.setdefault(guild_id, FilterRules(guild_id, [(r['rule_type'], r['value']) for r in rows]))
+
+async def update_filter_rule(guild_id, rule_type, value, remove=False, added_by_id=None):
+    """Add or remove one custom filter rule and refresh the cached rules.
+    
+    Args:
+        guild_id (int): The guild ID
+        rule_type (str): One of FILTER_RULE_TYPES
+        value (str): The word, or the role/channel ID
+        remove (bool): Remove the rule instead of adding it
+        added_by_id (int, optional): The user adding the rule
+        
+    Returns:
+        bool: Whether anything changed
+    """
+    if rule_type not in FILTER_RULE_TYPES:
+        raise ValueError(f"Invalid filter rule type: {rule_type}")
+    async with bot.db_pool.acquire() as conn:
+        async with conn.transaction():
+            if remove:
+                result = await conn.execute(
+                    '''DELETE FROM filter_rules WHERE guild_id = $1 AND rule_type = $2 AND value = $3''',
+                    guild_id, rule_type, value
+                )
+            else:
+                result = await conn.execute('''
+                    INSERT INTO filter_rules (guild_id, rule_type, value, added_by_id)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT DO NOTHING
+                ''', guild_id, rule_type, value, added_by_id)
+            rows = await conn.fetch('''SELECT rule_type, value FROM filter_rules WHERE guild_id = $1''', guild_id)
+            await conn.execute('''SELECT pg_notify($1, $2)''', CONFIG_NOTIFY_CHANNEL, f"{INSTANCE_ID}:{guild_id}")
+    bot.filter_rules[guild_id] = FilterRules(guild_id, [(r['rule_type'], r['value']) for r in rows])
+    return not result.endswith(" 0")
+
+def is_filter_exempt(message, rules):
+    """Check if a message's channel or author is exempt from the chat filter.
+    
+    Args:
+        message (discord.Message): The message to check
+        rules (FilterRules): The guild's custom filter rules
+        
+    Returns:
+        bool: Whether the message should skip the filter
+    """
+    if rules is None:
+        return False
+    if rules.exempt_channels:
+        channel = message.channel
+        # Threads and channels inside an exempt category are exempt too
+        if (channel.id in rules.exempt_channels
+                or getattr(channel, 'parent_id', None) in rules.exempt_channels
+                or getattr(channel, 'category_id', None) in rules.exempt_channels):
+            return True
+    if rules.exempt_roles:
+        return any(role.id in rules.exempt_roles for role in getattr(message.author, 'roles', ()))
+    return False
+
+# --- Filter Shadow Mode ---
+# When FILTER_SHADOW_ENGINE names one of FILTER_ENGINES, that engine runs beside the live
+# filter on a sample of messages without enforcing anything. Verdicts and timings are kept
+# in a bounded buffer, flushed to filter_shadow_results, and summarized by /shadowreport.
+
+def substring_filter_check(message_content, filter_level, rules=None):
+    """The original filter engine: one substring scan per word over the lowercased text."""
+    if not message_content or filter_level not in FILTER_LEVEL_WORDS:
+        return False, None
+    words = FILTER_LEVEL_WORDS[filter_level]
+    if rules is not None:
+        words = (words | rules.blocked) - rules.allowed
+    lowered = message_content.lower()
+    for word in words:
+        if word in lowered:
+            return True, word
+    return False, None
+
+# Engines that can be compared in shadow mode, by name
+FILTER_ENGINES = {
+    'automaton': check_message_for_filter,
+    'substring': substring_filter_check,
+}
+# The engine that enforces the filter; shadow mode compares against it
+LIVE_FILTER_ENGINE = 'automaton'
+
+class FilterShadow:
+    """Runs a candidate filter engine beside the live one and records how they compare."""
+
+    def __init__(self, engine_name):
+        if engine_name not in FILTER_ENGINES:
+            raise ValueError(f"Unknown filter engine: {engine_name}")
+        self.engine_name = engine_name
+        self.engine = FILTER_ENGINES[engine_name]
+        self.live_engine_name = LIVE_FILTER_ENGINE
+        self.live_engine = FILTER_ENGINES[LIVE_FILTER_ENGINE]
+        # Rows waiting to be written to filter_shadow_results; oldest are dropped when full
+        self.pending = deque(maxlen=FILTER_SHADOW_BUFFER_SIZE)
+        # Recent shadow-minus-live latency in microseconds, for /shadowreport
+        self.latency_deltas = deque(maxlen=FILTER_SHADOW_BUFFER_SIZE)
+        self.compared = 0
+        self.disagreements = 0
+        self.dropped = 0
+
+    def sampled(self):
+        """Whether to compare the engines on the next message, per FILTER_SHADOW_SAMPLE_RATE."""
+        return FILTER_SHADOW_SAMPLE_RATE >= 1 or random.random() < FILTER_SHADOW_SAMPLE_RATE
+
+    def observe(self, message, filter_level, rules):
+        """Check a message with the live engine and the shadow engine.
+        
+        Both engines are timed on a full scan, bypassing filter_verdicts, so cache
+        hits on repeated content don't make the live engine look faster.
+        
+        Args:
+            message (discord.Message): The message to check
+            filter_level (str): The guild's filter level
+            rules (FilterRules): The guild's custom filter rules
+            
+        Returns:
+            tuple: The live (is_filtered, word) verdict, which is the one enforced
+        """
+        start = time.perf_counter_ns()
+        verdict = self.live_engine(message.content, filter_level, rules)
+        live_ns = time.perf_counter_ns() - start
+        try:
+            start = time.perf_counter_ns()
+            shadow_verdict = self.engine(message.content, filter_level, rules)
+            shadow_ns = time.perf_counter_ns() - start
+        except Exception as e:
+            logger.error(f"Shadow filter engine {self.engine_name} failed: {e}")
+            return verdict
+        
+        self.compared += 1
+        disagrees = shadow_verdict[0] != verdict[0]
+        if disagrees:
+            self.disagreements += 1
+        self.latency_deltas.append((shadow_ns - live_ns) / 1000)
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append((
+            message.guild.id, message.channel.id, message.id, self.engine_name, filter_level,
+            verdict[0], verdict[1], shadow_verdict[0], shadow_verdict[1],
+            live_ns // 1000, shadow_ns // 1000,
+            # Content is only kept where the engines disagree, for review
+            message.content[:500] if disagrees else None
+        ))
+        return verdict
+
+    async def flush(self):
+        """Write buffered comparisons to the database."""
+        if not self.pending or bot.db_pool is None:
+            return
+        rows = list(self.pending)
+        self.pending.clear()
+        try:
+            async with bot.db_pool.acquire() as conn:
+                await conn.executemany('''
+                    INSERT INTO filter_shadow_results
+                    (guild_id, channel_id, message_id, engine, filter_level,
+                    live_blocked, live_word, shadow_blocked, shadow_word, live_us, shadow_us, content)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+                ''', rows)
+        except Exception as e:
+            logger.error(f"Could not flush {len(rows)} shadow filter results: {e}")
+
+async def flush_filter_shadow():
+    """Periodically write shadow filter results to the database."""
+    while not bot.is_closed():
+        await asyncio.sleep(FILTER_SHADOW_FLUSH_SECONDS)
+        await bot.filter_shadow.flush()
+
+# --- Outbound Request Scheduler ---
+# Requests the bot makes on its own (not replies to interactions, which have their
+# own per-interaction bucket and a 3 second deadline) go through outbound.run with a
+# priority class. Discord rate limits each route per major parameter (channel, guild
+# or webhook), so requests are queued per (route, major ID) bucket and run one at a
+# time, highest priority first: a filter deletion queued behind a run of cleanup
+# deletions in the same channel goes next. At most OUTBOUND_MAX_IN_FLIGHT requests run
+# at once per guild, and the last OUTBOUND_RESERVED of those are kept for moderation
+# and notices, so a raid's worth of logs and welcomes waits instead. The cap is per
+# guild because discord.py sleeps out rate limits inside the request: a guild whose
+# buckets are rate limited only holds its own slots, not other guilds'.
+
+# Highest priority first
+OUTBOUND_CLASSES = ('moderation', 'notice', 'game', 'greeting', 'log', 'cleanup')
+OUTBOUND_PRIORITY = {name: priority for priority, name in enumerate(OUTBOUND_CLASSES)}
+OUTBOUND_RESERVED = 2
+
+class OutboundScheduler:
+    """Runs Discord requests by priority, one at a time per rate limit bucket."""
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        # bucket -> heap of (priority, sequence, queued_at, class, request, future)
+        self.buckets = {}
+        # bucket -> task running its queue
+        self.workers = {}
+        # guild_id -> requests running for that guild
+        self.in_flight = {}
+        # guild_id -> heap of (priority, sequence, future) for buckets waiting on a free slot
+        self.waiting = {}
+        self.sequence = count()
+        # Time from queueing to starting, per class
+        self.wait = {name: LatencyHistogram() for name in OUTBOUND_CLASSES}
+        self.queued = dict.fromkeys(OUTBOUND_CLASSES, 0)
+
+    async def run(self, send_class, guild_id, bucket, request):
+        """Queue a request and wait for its result.
+        
+        Args:
+            send_class (str): One of OUTBOUND_CLASSES
+            guild_id (int): The guild the request is for, or None outside a guild
+            bucket (tuple): Route name and major ID, e.g. ('messages', channel.id)
+            request (callable): Returns the coroutine that makes the request
+            
+        Returns:
+            The request's result; its exception is raised here
+        """
+        future = bot.loop.create_future()
+        heap = self.buckets.get(bucket)
+        if heap is None:
+            heap = self.buckets[bucket] = []
+        heapq.heappush(heap, (OUTBOUND_PRIORITY[send_class], next(self.sequence), time.perf_counter(), send_class, request, future))
+        self.queued[send_class] += 1
+        if bucket not in self.workers:
+            self.workers[bucket] = bot.loop.create_task(self.drain(guild_id, bucket))
+        return await future
+
+    async def drain(self, guild_id, bucket):
+        """Run a bucket's queue until it's empty."""
+        heap = self.buckets[bucket]
+        try:
+            while heap:
+                if heap[0][5].done():
+                    # The caller gave up waiting
+                    self.queued[heapq.heappop(heap)[3]] -= 1
+                    continue
+                await self.acquire(guild_id, heap[0][0])
+                try:
+                    # Something more urgent may have been queued while waiting for a slot
+                    _, _, queued_at, send_class, request, future = heapq.heappop(heap)
+                    self.queued[send_class] -= 1
+                    if future.done():
+                        # Its caller gave up while this bucket waited for a slot
+                        continue
+                    self.wait[send_class].record((time.perf_counter() - queued_at) * 1000)
+                    try:
+                        result = await request()
+                    except Exception as e:
+                        self.wait[send_class].errors += 1
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                finally:
+                    self.release(guild_id)
+        finally:
+            del self.workers[bucket]
+            if not heap:
+                del self.buckets[bucket]
+
+    def can_start(self, guild_id, priority):
+        limit = self.max_in_flight
+        if priority > OUTBOUND_PRIORITY['notice']:
+            limit = max(1, limit - OUTBOUND_RESERVED)
+        return self.in_flight.get(guild_id, 0) < limit
+
+    async def acquire(self, guild_id, priority):
+        """Wait for one of the guild's request slots; higher priorities are handed free slots first."""
+        waiting = self.waiting.get(guild_id)
+        if self.can_start(guild_id, priority) and not (waiting and waiting[0][0] <= priority):
+            self.in_flight[guild_id] = self.in_flight.get(guild_id, 0) + 1
+            return
+        if waiting is None:
+            waiting = self.waiting[guild_id] = []
+        future = bot.loop.create_future()
+        heapq.heappush(waiting, (priority, next(self.sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # A slot handed over just as the worker was cancelled would never be released
+            if future.done() and not future.cancelled():
+                self.release(guild_id)
+            raise
+
+    def release(self, guild_id):
+        self.in_flight[guild_id] -= 1
+        waiting = self.waiting.get(guild_id)
+        while waiting and self.can_start(guild_id, waiting[0][0]):
+            _, _, future = heapq.heappop(waiting)
+            if not future.done():
+                self.in_flight[guild_id] += 1
+                future.set_result(None)
+        if not waiting:
+            self.waiting.pop(guild_id, None)
+        if not self.in_flight[guild_id]:
+            del self.in_flight[guild_id]
+
+outbound = OutboundScheduler(OUTBOUND_MAX_IN_FLIGHT)
+
+# --- Deferred Message Deletion ---
+# Temporary bot messages (filter warnings, counting notices) are handed to one scheduler
+# instead of each handler sleeping until it can delete them. Due messages are deleted per
+# channel with bulk delete where possible. Jobs due more than DELETION_PERSIST_SECONDS
+# out (every timed notice, but not the immediate deletions of spam copies) are saved to
+# pending_deletions within about a second, in batches, so they survive a crash.
+
+# Discord only bulk deletes 2-100 messages, and only ones younger than 14 days
+BULK_DELETE_MAX = 100
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+
+class DeletionScheduler:
+    """Owns every "delete this bot message in N seconds" job."""
+
+    def __init__(self):
+        # Heap of (delete_at, channel_id, message_id), delete_at in UNIX time
+        self.heap = []
+        # Jobs not yet written to pending_deletions
+        self.unsaved = []
+        # message_id of jobs that have been written, so they can be removed once done
+        self.saved = set()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.deleted = 0
+        self.bulk_requests = 0
+        self.single_requests = 0
+
+    def schedule(self, message, delay):
+        """Delete a message after delay seconds.
+        
+        Args:
+            message (discord.Message): A message sent by the bot
+            delay (float): Seconds to wait before deleting it
+        """
+        self.schedule_ids(message.channel.id, message.id, delay)
+
+    def schedule_ids(self, channel_id, message_id, delay):
+        """Delete a message by ID after delay seconds, for messages that aren't at hand."""
+        job = (time.time() + delay, channel_id, message_id)
+        heapq.heappush(self.heap, job)
+        if delay > DELETION_PERSIST_SECONDS:
+            self.unsaved.append(job)
+            # Wake the runner so it saves the job soon, not just before it's due
+            if len(self.unsaved) == 1:
+                self.wakeup.set()
+        # Wake the runner if this job is now the next one due
+        if self.heap[0] is job:
+            self.wakeup.set()
+
+    def start(self):
+        if self.task is None:
+            self.task = bot.loop.create_task(self.run())
+
+    async def stop(self):
+        """Stop the runner and save whatever is still pending."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.unsaved.extend(job for job in self.heap if job[2] not in self.saved)
+        await self.persist(force=True)
+
+    async def load(self):
+        """Reschedule deletions saved before the last restart."""
+        try:
+            async with bot.db_pool.acquire() as conn:
+                rows = await conn.fetch('''SELECT channel_id, message_id, delete_at FROM pending_deletions''')
+        except Exception as e:
+            logger.error(f"Could not load pending message deletions: {e}")
+            return
+        for row in rows:
+            heapq.heappush(self.heap, (row['delete_at'].timestamp(), row['channel_id'], row['message_id']))
+            self.saved.add(row['message_id'])
+        if rows:
+            logger.info(f"Rescheduled {len(rows)} pending message deletions")
+
+    async def persist(self, force=False):
+        """Save jobs that are still pending to pending_deletions.
+        
+        Only jobs scheduled more than DELETION_PERSIST_SECONDS out are queued for
+        saving, so immediate deletions never touch the database unless the bot shuts
+        down while they're pending.
+        """
+        if not self.unsaved or bot.db_pool is None:
+            return
+        now = time.time()
+        rows = [
+            (job[1], job[2], datetime.datetime.fromtimestamp(job[0], datetime.timezone.utc))
+            for job in self.unsaved if force or job[0] > now
+        ]
+        self.unsaved = []
+        if not rows:
+            return
+        try:
+            async with bot.db_pool.acquire() as conn:
+                await conn.executemany('''
+                    INSERT INTO pending_deletions (channel_id, message_id, delete_at)
+                    VALUES ($1, $2, $3) ON CONFLICT DO NOTHING
+                ''', rows)
+            self.saved.update(row[1] for row in rows)
+        except Exception as e:
+            logger.error(f"Could not save {len(rows)} pending message deletions: {e}")
+
+    async def run(self):
+        """Sleep until the next job is due, then delete everything that's due."""
+        while True:
+            try:
+                timeout = self.heap[0][0] - time.time() if self.heap else None
+                if self.unsaved:
+                    # Gather up to a second of new jobs into one write
+                    timeout = 1.0 if timeout is None else min(timeout, 1.0)
+                if timeout is None or timeout > 0:
+                    self.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                await self.persist()
+                
+                due = defaultdict(list)
+                now = time.time()
+                while self.heap and self.heap[0][0] <= now:
+                    _, channel_id, message_id = heapq.heappop(self.heap)
+                    due[channel_id].append(message_id)
+                if due:
+                    await asyncio.gather(*(self.delete_channel_messages(channel_id, ids) for channel_id, ids in due.items()))
+                    done = [message_id for ids in due.values() for message_id in ids if message_id in self.saved]
+                    if done:
+                        self.saved.difference_update(done)
+                        await query_execute('pending_deletions_done', done)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in message deletion scheduler: {e}")
+
+    async def delete_channel_messages(self, channel_id, message_ids):
+        """Delete messages from one channel, in bulk where Discord allows it."""
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent = [m for m in message_ids if discord.utils.snowflake_time(m) > cutoff]
+        singles = [m for m in message_ids if m not in recent]
+        # Only the channel ID is saved, so look up which guild's request slots to use
+        guild_id = getattr(getattr(bot.get_channel(channel_id), 'guild', None), 'id', None)
+        for start in range(0, len(recent), BULK_DELETE_MAX):
+            chunk = recent[start:start + BULK_DELETE_MAX]
+            if len(chunk) < 2:
+                singles.extend(chunk)
+                continue
+            try:
+                await outbound.run('cleanup', guild_id, ('bulk_delete', channel_id), lambda: bot.http.delete_messages(channel_id, chunk))
+                self.bulk_requests += 1
+                self.deleted += len(chunk)
+            except discord.errors.Forbidden:
+                # Bulk delete needs Manage Messages; the bot can always delete its own messages one by one
+                singles.extend(chunk)
+            except discord.errors.HTTPException as e:
+                logger.error(f"Bulk delete failed in channel {channel_id}: {e}")
+                singles.extend(chunk)
+        for message_id in singles:
+            try:
+                await outbound.run('cleanup', guild_id, ('delete', channel_id), lambda: bot.http.delete_message(channel_id, message_id))
+                self.single_requests += 1
+                self.deleted += 1
+            except (discord.errors.NotFound, discord.errors.Forbidden):
+                # Already deleted, or the channel is gone or hidden from the bot
+                pass
+            except discord.errors.HTTPException as e:
+                logger.error(f"Could not delete message {message_id} in channel {channel_id}: {e}")
+
+message_deletions = DeletionScheduler()
+
+# --- Log Channel Dispatcher ---
+# Log embeds (joins, leaves, warnings, purges, filtered messages...) are queued per
+# logs channel instead of each event sending its own message. Every channel has one
+# sender task that waits up to LOG_FLUSH_SECONDS for more events, then packs up to 10
+# embeds into one message, so a raid costs a tenth of the requests and stays inside
+# the per-channel rate limit. Messages go out in the order their events were queued.
+
+# Discord's limits on the embeds in one message
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS_PER_MESSAGE = 6000
+
+class LogDispatcher:
+    """Per-channel queues of log embeds, sent in batches."""
+
+    def __init__(self):
+        # channel_id -> deque of embeds waiting to be sent
+        self.queues = {}
+        # channel_id -> channel to send the queue to
+        self.channels = {}
+        # channel_id -> sender task, while the channel has anything queued
+        self.senders = {}
+        # channel_id -> set when the channel has a full message's worth queued
+        self.full = {}
+        # Set on shutdown, so senders stop waiting for more events
+        self.stopping = False
+        self.messages = 0
+        self.embeds = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        """Embeds queued across every channel."""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def post(self, channel, embed):
+        """Queue an embed for a logs channel.
+        
+        Args:
+            channel (discord.abc.Messageable): The logs channel
+            embed (discord.Embed): The log entry
+        """
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            queue = self.queues[channel.id] = deque()
+            self.full[channel.id] = asyncio.Event()
+        self.channels[channel.id] = channel
+        queue.append(embed)
+        if len(queue) > LOG_QUEUE_MAX:
+            # Sending has fallen far behind; keep the newest entries
+            queue.popleft()
+            if not self.dropped:
+                logger.error(f"Log queue for channel {channel.id} is full, dropping the oldest entries")
+            self.dropped += 1
+        self.max_depth = max(self.max_depth, len(queue))
+        if len(queue) >= EMBEDS_PER_MESSAGE:
+            self.full[channel.id].set()
+        if channel.id not in self.senders:
+            self.senders[channel.id] = bot.loop.create_task(self.run(channel.id))
+
+    async def run(self, channel_id):
+        """Send a channel's queue in batches until it's empty."""
+        queue = self.queues[channel_id]
+        full = self.full[channel_id]
+        try:
+            while queue:
+                if len(queue) < EMBEDS_PER_MESSAGE and not self.stopping:
+                    # Give the events that come right after this one a chance to share its message
+                    full.clear()
+                    try:
+                        await asyncio.wait_for(full.wait(), LOG_FLUSH_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                await self.send(channel_id, self.take_batch(queue))
+        finally:
+            del self.senders[channel_id]
+            if not queue:
+                del self.queues[channel_id], self.channels[channel_id], self.full[channel_id]
+
+    def take_batch(self, queue):
+        """Pop the oldest embeds that fit in one message."""
+        batch = [queue.popleft()]
+        size = len(batch[0])
+        while queue and len(batch) < EMBEDS_PER_MESSAGE and size + len(queue[0]) <= EMBED_CHARS_PER_MESSAGE:
+            size += len(queue[0])
+            batch.append(queue.popleft())
+        return batch
+
+    async def send(self, channel_id, batch):
+        channel = self.channels[channel_id]
+        try:
+            config = bot.guild_configs.get(channel.guild.id)
+            if not (config and config.log_webhooks and await log_webhooks.send(channel, config.log_webhooks, batch)):
+                await outbound.run('log', channel.guild.id, ('messages', channel_id), lambda: channel.send(embeds=batch))
+            self.messages += 1
+            self.embeds += len(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Could not send {len(batch)} log entries to channel {channel_id}: {e}")
+
+    async def stop(self):
+        """Send whatever is still queued without waiting for more."""
+        self.stopping = True
+        for full in self.full.values():
+            full.set()
+        await asyncio.gather(*self.senders.values(), return_exceptions=True)
+
+log_dispatcher = LogDispatcher()
+
+# Servers can have log batches sent through a few webhooks FrostMod creates in the
+# logs channel (/logwebhooks). Each webhook has its own rate limit bucket, separate
+# from the bot's per-channel one, and batches rotate between them. The webhooks are
+# cached per guild and created again if someone deletes them.
+
+LOG_WEBHOOK_NAME = "FrostMod Logs"
+# Discord allows 15 webhooks per channel; leave room for the server's own
+LOG_WEBHOOK_POOL_MAX = 5
+# How long to wait before trying again after the bot couldn't manage webhooks
+LOG_WEBHOOK_RETRY_SECONDS = 300
+# Webhook update events this soon after the bot changed a channel's webhooks are its own
+LOG_WEBHOOK_OWN_CHANGE_SECONDS = 10
+
+class LogWebhookPool:
+    """The log webhooks of one guild's logs channel."""
+    __slots__ = ('channel_id', 'size', 'webhooks', 'turn', 'loaded_at')
+
+    def __init__(self, channel_id, size, webhooks):
+        self.channel_id = channel_id
+        self.size = size
+        self.webhooks = webhooks
+        self.turn = 0
+        self.loaded_at = time.monotonic()
+
+class LogWebhooks:
+    """Per-guild pools of webhooks for sending log batches."""
+
+    def __init__(self):
+        # guild_id -> LogWebhookPool
+        self.pools = {}
+        # channel_id -> monotonic time the bot last created or deleted webhooks there
+        self.changed_at = {}
+        self.sent = 0
+        self.created = 0
+        self.fallbacks = 0
+
+    async def send(self, channel, size, embeds):
+        """Send a log batch through the next webhook in the guild's pool.
+        
+        Args:
+            channel (discord.TextChannel): The logs channel
+            size (int): How many webhooks the guild's pool should have
+            embeds (list): The embeds to send
+            
+        Returns:
+            bool: False if no webhook could be used and the caller should send as the bot
+        """
+        for _ in range(2):
+            webhook = await self.next_webhook(channel, min(size, LOG_WEBHOOK_POOL_MAX))
+            if webhook is None:
+                break
+            try:
+                await outbound.run('log', channel.guild.id, ('webhook', webhook.id), lambda: webhook.send(
+                    embeds=embeds, username=bot.user.name, avatar_url=bot.user.display_avatar.url
+                ))
+                self.sent += 1
+                return True
+            except discord.errors.NotFound:
+                # The webhook was deleted; load the pool again, which replaces it
+                self.pools.pop(channel.guild.id, None)
+            except discord.errors.Forbidden as e:
+                # Stop using the pool until LOG_WEBHOOK_RETRY_SECONDS have passed
+                logger.warning(f"Log webhook rejected in channel {channel.id}, sending logs as the bot: {e}")
+                self.pools[channel.guild.id] = LogWebhookPool(channel.id, min(size, LOG_WEBHOOK_POOL_MAX), [])
+                break
+            except discord.errors.HTTPException as e:
+                logger.warning(f"Log webhook send failed in channel {channel.id}, sending as the bot: {e}")
+                break
+        self.fallbacks += 1
+        return False
+
+    async def next_webhook(self, channel, size):
+        """The guild's next webhook in rotation, or None if it has none."""
+        pool = self.pools.get(channel.guild.id)
+        if (
+            pool is None
+            or pool.channel_id != channel.id
+            or pool.size != size
+            or (not pool.webhooks and time.monotonic() - pool.loaded_at >= LOG_WEBHOOK_RETRY_SECONDS)
+        ):
+            pool = self.pools[channel.guild.id] = LogWebhookPool(channel.id, size, await self.load(channel, size))
+        if not pool.webhooks:
+            return None
+        webhook = pool.webhooks[pool.turn % len(pool.webhooks)]
+        pool.turn += 1
+        return webhook
+
+    async def managed(self, channel):
+        """The log webhooks FrostMod created in a channel."""
+        return [
+            webhook for webhook in await channel.webhooks()
+            if webhook.name == LOG_WEBHOOK_NAME and webhook.token and webhook.user and webhook.user.id == bot.user.id
+        ]
+
+    async def load(self, channel, size):
+        """Find the channel's log webhooks, creating or deleting some to make `size` of them."""
+        try:
+            webhooks = await self.managed(channel)
+            while len(webhooks) < size:
+                self.changed_at[channel.id] = time.monotonic()
+                webhooks.append(await channel.create_webhook(name=LOG_WEBHOOK_NAME, reason="FrostMod log delivery"))
+                self.created += 1
+            for webhook in webhooks[size:]:
+                self.changed_at[channel.id] = time.monotonic()
+                await webhook.delete(reason="FrostMod log webhook pool shrunk")
+            return webhooks[:size]
+        except discord.errors.HTTPException as e:
+            logger.warning(f"Could not set up log webhooks in channel {channel.id}, sending logs as the bot: {e}")
+            return []
+
+    async def remove(self, channel):
+        """Delete the log webhooks in a channel and forget its guild's pool."""
+        self.pools.pop(channel.guild.id, None)
+        for webhook in await self.managed(channel):
+            self.changed_at[channel.id] = time.monotonic()
+            await webhook.delete(reason="FrostMod log webhooks turned off")
+
+    def invalidate(self, channel):
+        """Forget a guild's pool if it belongs to this channel, e.g. after its webhooks changed.
+        
+        Changes the bot just made itself are skipped, so filling the pool doesn't
+        trigger loading it all over again.
+        """
+        changed_at = self.changed_at.get(channel.id)
+        if changed_at is not None and time.monotonic() - changed_at < LOG_WEBHOOK_OWN_CHANGE_SECONDS:
+            return
+        pool = self.pools.get(channel.guild.id)
+        if pool is not None and pool.channel_id == channel.id:
+            del self.pools[channel.guild.id]
+
+log_webhooks = LogWebhooks()
+
+# --- Warn Write-Behind ---
+# /warn and the filter's auto-warn queue their warns rows here instead of inserting them
+# one transaction at a time. The queue is written with COPY once it holds WARN_BATCH_SIZE
+# rows or WARN_FLUSH_SECONDS have passed, and on shutdown. Anything that reads the warns
+# rows calls flush() first, so it always sees every warn issued before it.
+#
+# Per-member totals are materialized in warn_counts, updated in the same transaction as
+# each batch, and cached in bot.warn_counts so counts never need a COUNT(*) over warns.
+# The cache keeps the WARN_COUNT_CACHE_SIZE most recently used members, and every change
+# to warn_counts is announced on CONFIG_NOTIFY_CHANNEL so other processes drop theirs.
+
+WARN_COLUMNS = ('guild_id', 'guild_name', 'user_id', 'username', 'reason', 'moderator_id', 'warned_at')
+
+class WarnWriter:
+    """Write-behind queue for rows in the warns table."""
+
+    def __init__(self):
+        self.pending = []
+        # (guild_id, user_id) -> warns queued but not yet written
+        self.pending_counts = defaultdict(int)
+        # guild_id -> monotonic time its warns last changed, see recently_written
+        self.written_at = {}
+        self.wakeup = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def add(self, guild_id, guild_name, user_id, username, reason, moderator_id=None):
+        """Queue a warning to be written with the next batch.
+        
+        Args:
+            guild_id (int): The guild ID
+            guild_name (str): The guild name
+            user_id (int): The warned user's ID
+            username (str): The warned user's name
+            reason (str): The reason for the warning
+            moderator_id (int, optional): Who gave the warning
+            
+        Returns:
+            int: The member's new warn count if it's cached, otherwise None
+        """
+        # Naive UTC, like the warned_at column's CURRENT_TIMESTAMP default on a UTC database
+        warned_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        self.pending.append((guild_id, guild_name, user_id, username, reason, moderator_id, warned_at))
+        key = (guild_id, user_id)
+        self.pending_counts[key] += 1
+        count = bot.warn_counts.get(key)
+        if count is not None:
+            count += 1
+            cache_warn_count(key, count)
+        self.enforce_limit()
+        if len(self.pending) >= WARN_BATCH_SIZE:
+            self.wakeup.set()
+        return count
+
+    def recently_written(self, guild_id):
+        """Whether the read replica might not have a guild's latest warns yet.
+        
+        Args:
+            guild_id (int): The guild ID
+            
+        Returns:
+            bool: True if warns are queued or changed within REPLICA_MAX_LAG_SECONDS
+        """
+        if any(g == guild_id for g, _ in self.pending_counts):
+            return True
+        written_at = self.written_at.get(guild_id)
+        return written_at is not None and time.monotonic() - written_at < REPLICA_MAX_LAG_SECONDS
+
+    def enforce_limit(self):
+        """Drop the oldest queued warns beyond WARN_QUEUE_MAX."""
+        if len(self.pending) > WARN_QUEUE_MAX:
+            # The database has been unreachable for a while; keep the newest warns
+            overflow = len(self.pending) - WARN_QUEUE_MAX
+            for row in self.pending[:overflow]:
+                self.uncount((row[0], row[2]), 1)
+            del self.pending[:overflow]
+            self.dropped += overflow
+            logger.error(f"Warn queue full, dropped {overflow} warns")
+
+    def uncount(self, key, amount):
+        """Take warns that will never be written back out of the queued and cached counts."""
+        self.pending_counts[key] -= amount
+        if self.pending_counts[key] <= 0:
+            del self.pending_counts[key]
+        if key in bot.warn_counts:
+            bot.warn_counts[key] -= amount
+
+    def start(self):
+        if self.task is None:
+            self.task = bot.loop.create_task(self.run())
+
+    async def stop(self):
+        """Stop the flush loop and write out whatever is queued."""
+        if self.task is not None:
+            # Holding the lock means the loop isn't partway through writing a batch
+            async with self.lock:
+                self.task.cancel()
+            self.task = None
+        await self.flush()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), WARN_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write every queued warn in one COPY, and add them to warn_counts.
+        
+        Returns:
+            bool: Whether the queue is now empty
+        """
+        async with self.lock:
+            return await self.flush_locked()
+
+    async def flush_locked(self):
+        """flush() for callers already holding self.lock."""
+        if not self.pending:
+            return True
+        if db_breaker.is_open:
+            # Keep the queue until the database is back
+            return False
+        rows, self.pending = self.pending, []
+        counts, self.pending_counts = self.pending_counts, defaultdict(int)
+        start = time.perf_counter()
+        try:
+            async with bot.db_pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.copy_records_to_table('warns', records=rows, columns=WARN_COLUMNS)
+                    await conn.executemany('''
+                        INSERT INTO warn_counts (guild_id, user_id, count) VALUES ($1, $2, $3)
+                        ON CONFLICT (guild_id, user_id) DO UPDATE SET count = warn_counts.count + EXCLUDED.count
+                    ''', [(guild_id, user_id, count) for (guild_id, user_id), count in counts.items()])
+                    await conn.executemany(
+                        '''SELECT pg_notify($1, $2)''',
+                        [(CONFIG_NOTIFY_CHANNEL, f"{INSTANCE_ID}:warns:{guild_id}:{user_id}") for guild_id, user_id in counts]
+                    )
+        except BaseException as e:
+            # Put the rows back in front of anything queued meanwhile and retry next time
+            self.pending[:0] = rows
+            for key, count in counts.items():
+                self.pending_counts[key] += count
+            self.enforce_limit()
+            if not isinstance(e, Exception):
+                raise
+            self.failures += 1
+            logger.error(f"Could not write {len(rows)} queued warns: {e}")
+            return False
+        elapsed = (time.perf_counter() - start) * 1000
+        now = time.monotonic()
+        for guild_id, _ in counts:
+            self.written_at[guild_id] = now
+        self.flushes += 1
+        self.written += len(rows)
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self.total_flush_ms += elapsed
+        return True
+
+warn_writer = WarnWriter()
+
+async def get_warn_count(guild_id, user_id):
+    """Get how many warns a member has, from the cache or warn_counts.
+    
+    Args:
+        guild_id (int): The guild ID
+        user_id (int): The user ID
+        
+    Returns:
+        int: The member's warn count, including warns still queued
+    """
+    key = (guild_id, user_id)
+    count = bot.warn_counts.get(key)
+    if count is not None:
+        bot.warn_counts.move_to_end(key)
+        return count
+    # Holding the writer's lock means no batch is half written while we read
+    async with warn_writer.lock:
+        count = bot.warn_counts.get(key)
+        if count is None:
+            stored = await query_fetchval('warn_count', guild_id, user_id)
+            count = (stored or 0) + warn_writer.pending_counts.get(key, 0)
+            cache_warn_count(key, count)
+        return count
+
+def cache_warn_count(key, count):
+    """Cache a member's warn count, evicting the least recently used beyond WARN_COUNT_CACHE_SIZE."""
+    bot.warn_counts[key] = count
+    bot.warn_counts.move_to_end(key)
+    while len(bot.warn_counts) > WARN_COUNT_CACHE_SIZE:
+        bot.warn_counts.popitem(last=False)
+
+async def get_guild_warn_total(guild_id):
+    """Get the total number of warns in a guild, from warn_counts.
+    
+    Args:
+        guild_id (int): The guild ID
+        
+    Returns:
+        int: The guild's warn count, including warns still queued
+    """
+    async with warn_writer.lock:
+        stored = await query_fetchval('guild_warn_total', guild_id, primary=warn_writer.recently_written(guild_id))
+        return stored + sum(count for (g, _), count in warn_writer.pending_counts.items() if g == guild_id)
+
+async def delete_warns(guild_id, user_id):
+    """Delete every warn for a member, including queued ones, and reset their count.
+    
+    Args:
+        guild_id (int): The guild ID
+        user_id (int): The user ID
+        
+    Returns:
+        str: The status of the DELETE on warns
+    """
+    key = (guild_id, user_id)
+    async with warn_writer.lock:
+        # Queued warns would otherwise be written after the delete and survive it
+        warn_writer.pending = [row for row in warn_writer.pending if (row[0], row[2]) != key]
+        warn_writer.pending_counts.pop(key, None)
+        async with bot.db_pool.acquire() as conn:
+            async with conn.transaction():
+                result = await conn.execute('''DELETE FROM warns WHERE guild_id = $1 AND user_id = $2''', guild_id, user_id)
+                await conn.execute('''DELETE FROM warn_counts WHERE guild_id = $1 AND user_id = $2''', guild_id, user_id)
+                await conn.execute(
+                    '''SELECT pg_notify($1, $2)''', CONFIG_NOTIFY_CHANNEL, f"{INSTANCE_ID}:warns:{guild_id}:{user_id}"
+                )
+        cache_warn_count(key, 0)
+        warn_writer.written_at[guild_id] = time.monotonic()
+    return result
+
+async def rebuild_warn_counts(guild_id):
+    """Recompute a guild's warn_counts from the warns table, fixing any drift.
+    
+    Args:
+        guild_id (int): The guild ID
+        
+    Returns:
+        tuple: (int, int) - Members with warns and total warns after the rebuild
+    """
+    async with warn_writer.lock:
+        await warn_writer.flush_locked()
+        async with bot.db_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute('''DELETE FROM warn_counts WHERE guild_id = $1''', guild_id)
+                await conn.execute('''
+                    INSERT INTO warn_counts (guild_id, user_id, count)
+                    SELECT guild_id, user_id, COUNT(*) FROM warns WHERE guild_id = $1 GROUP BY guild_id, user_id
+                ''', guild_id)
+                totals = await conn.fetchrow(
+                    '''SELECT COUNT(*) AS members, COALESCE(SUM(count), 0) AS warns FROM warn_counts WHERE guild_id = $1''',
+                    guild_id
+                )
+                await conn.execute('''SELECT pg_notify($1, $2)''', CONFIG_NOTIFY_CHANNEL, f"{INSTANCE_ID}:warns:{guild_id}")
+        for key in [key for key in bot.warn_counts if key[0] == guild_id]:
+            del bot.warn_counts[key]
+        warn_writer.written_at[guild_id] = time.monotonic()
+    return totals['members'], totals['warns']
+
+# --- Warn Escalation ---
+# Each guild can set a ladder of punishments by warn count, e.g. 3 warns -> 60 minute
+# timeout, 5 warns -> kick. Ladders are cached per guild and checked against the cached
+# warn count every time /warn or the auto-warn fires, so escalation costs no queries.
+
+ESCALATION_ACTIONS = ('timeout', 'kick', 'ban')
+# Discord's longest timeout is 28 days
+MAX_TIMEOUT_MINUTES = 28 * 24 * 60
+
+async def get_escalation_ladder(guild_id):
+    """Get a guild's escalation ladder, loading it on first use.
+    
+    Args:
+        guild_id (int): The guild ID
+        
+    Returns:
+        dict: Warn count -> (action, minutes); empty if the guild has no ladder
+    """
+    ladder = bot.escalation_ladders.get(guild_id)
+    if ladder is not None:
+        return ladder
+    rows = await query_fetch('escalation_ladder', guild_id)
+    return bot.escalation_ladders.setdefault(
+        guild_id, {row['warn_count']: (row['action'], row['duration_minutes']) for row in rows}
+    )
+
+async def update_escalation_rule(guild_id, warn_count, action=None, minutes=None):
+    """Set or remove the ladder step for a warn count and refresh the cached ladder.
+    
+    Args:
+        guild_id (int): The guild ID
+        warn_count (int): The warn count the step fires at
+        action (str, optional): One of ESCALATION_ACTIONS, or None to remove the step
+        minutes (int, optional): Timeout length, for the timeout action
+        
+    Returns:
+        bool: Whether anything changed
+    """
+    if action is not None and action not in ESCALATION_ACTIONS:
+        raise ValueError(f"Invalid escalation action: {action}")
+    async with bot.db_pool.acquire() as conn:
+        async with conn.transaction():
+            if action is None:
+                result = await conn.execute(
+                    '''DELETE FROM escalation_rules WHERE guild_id = $1 AND warn_count = $2''',
+                    guild_id, warn_count
+                )
+            else:
+                result = await conn.execute('''
+                    INSERT INTO escalation_rules (guild_id, warn_count, action, duration_minutes)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (guild_id, warn_count) DO UPDATE
+                    SET action = EXCLUDED.action, duration_minutes = EXCLUDED.duration_minutes
+                ''', guild_id, warn_count, action, minutes)
+            rows = await conn.fetch(
+                '''SELECT warn_count, action, duration_minutes FROM escalation_rules WHERE guild_id = $1''',
+                guild_id
+            )
+            await conn.execute('''SELECT pg_notify($1, $2)''', CONFIG_NOTIFY_CHANNEL, f"{INSTANCE_ID}:{guild_id}")
+    bot.escalation_ladders[guild_id] = {row['warn_count']: (row['action'], row['duration_minutes']) for row in rows}
+    return not result.endswith(" 0")
+
+def describe_escalation(action, minutes):
+    """Describe a ladder step for embeds and replies, e.g. "60 minute timeout"."""
+    if action == 'timeout':
+        return f"{minutes or 60} minute timeout"
+    return action.capitalize()
+
+async def add_warn(guild, member, reason, moderator_id):
+    """Queue a warn and escalate if the member's new count is on the guild's ladder.
+    
+    The warn is always queued. While the database is unreachable the member's count
+    or the guild's ladder may be unknown, and escalation is skipped for this warn.
+    
+    Args:
+        guild (discord.Guild): The guild
+        member (discord.Member): The warned member
+        reason (str): The reason for the warning
+        moderator_id (int): Who gave the warning; the bot's own ID for automatic warns
+        
+    Returns:
+        bool: Whether the ladder was checked; False if escalation was skipped
+    """
+    if (guild.id, member.id) not in bot.warn_counts:
+        # Load the count before queueing, so concurrent warns each get their own number
+        try:
+            await get_warn_count(guild.id, member.id)
+        except Exception as e:
+            # Queue the warn regardless; it's written once the database is back
+            logger.warning(f"Could not load warn count for {member.id} in guild {guild.id}: {e}")
+    count = warn_writer.add(guild.id, guild.name, member.id, member.display_name, reason, moderator_id)
+    try:
+        if count is None:
+            count = await get_warn_count(guild.id, member.id)
+        ladder = await get_escalation_ladder(guild.id)
+    except Exception as e:
+        logger.warning(f"Skipped escalation for {member.id} in guild {guild.id}, database unavailable: {e}")
+        return False
+    step = ladder.get(count)
+    if step is not None:
+        await escalate(guild, member, count, *step)
+    return True
+
+async def escalate(guild, member, count, action, minutes):
+    """Apply a ladder step to a member and log it to the logs channel.
+    
+    Args:
+        guild (discord.Guild): The guild
+        member (discord.Member): The member to punish
+        count (int): The warn count that triggered the step
+        action (str): One of ESCALATION_ACTIONS
+        minutes (int): Timeout length, for the timeout action
+    """
+    reason = f"Escalation: reached {count} warnings"
+    outcome = describe_escalation(action, minutes)
+    try:
+        bucket = ('members', guild.id)
+        if action == 'timeout':
+            await outbound.run('moderation', guild.id, bucket, lambda: member.timeout(datetime.timedelta(minutes=minutes or 60), reason=reason))
+        elif action == 'kick':
+            await outbound.run('moderation', guild.id, bucket, lambda: member.kick(reason=reason))
+        elif action == 'ban':
+            await outbound.run('moderation', guild.id, bucket, lambda: guild.ban(member, reason=reason, delete_message_seconds=0))
+        logger.info(f"Escalated {member} ({member.id}) in guild {guild.id}: {outcome} at {count} warnings")
+    except (discord.errors.Forbidden, discord.errors.HTTPException) as e:
+        logger.error(f"Could not apply {action} to {member.id} in guild {guild.id}: {e}")
+        outcome = f"Failed ({outcome}): {e}"
+        
+    config = await get_guild_config(guild.id)
+    if config.logs_channel_id:
+        logs_channel = guild.get_channel(config.logs_channel_id)
+        if logs_channel:
+            embed = discord.Embed(
+                title="Warning Escalation",
+                description=f"{member.mention} reached **{count}** warnings",
+                color=discord.Color.dark_red()
+            )
+            embed.add_field(name="Action", value=outcome, inline=False)
+            embed.set_footer(text=f"User ID: {member.id}")
+            embed.timestamp = datetime.datetime.now()
+            log_dispatcher.post(logs_channel, embed)
+
+# --- Schema Migrations ---
+# The schema lives in migrations/ as numbered SQL files, applied in order at startup
+# and recorded in schema_migrations. An advisory lock makes concurrent bot processes
+# take turns, so each migration runs exactly once. Never edit a migration that has
+# shipped; add a new file instead. A file starting with "-- optional" may fail
+# (e.g. for lack of privileges) without stopping startup, and is retried next time.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+# Any constant works, as long as every bot process uses the same one
+MIGRATION_LOCK_ID = 41802025
+
+def load_migrations():
+    """Read the migration files, in the order they apply.
+    
+    Returns:
+        list: (version, name, sql) tuples sorted by version
+    """
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as f:
+            migrations.append((int(match[1]), match[2], f.read()))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Two migrations share a version number in {MIGRATIONS_DIR}")
+    return migrations
+
+async def run_migrations():
+    """Apply every migration that hasn't been applied to this database yet."""
+    migrations = load_migrations()
+    async with bot.db_pool.acquire() as conn:
+        await conn.execute('''SELECT pg_advisory_lock($1)''', MIGRATION_LOCK_ID)
+        try:
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    checksum TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            applied = {
+                row['version']: row['checksum']
+                for row in await conn.fetch('''SELECT version, checksum FROM schema_migrations''')
+            }
+            for version, name, sql in migrations:
+                checksum = hashlib.sha256(sql.encode('utf-8')).hexdigest()
+                if version in applied:
+                    if applied[version] != checksum:
+                        logger.warning(f"Migration {version:04d}_{name} was edited after it was applied; the changes won't run")
+                    continue
+                try:
+                    async with conn.transaction():
+                        await conn.execute(sql)
+                        await conn.execute(
+                            '''INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)''',
+                            version, name, checksum
+                        )
+                except Exception as e:
+                    if not sql.startswith('-- optional'):
+                        logger.error(f"Migration {version:04d}_{name} failed: {e}")
+                        raise
+                    logger.error(f"Skipping optional migration {version:04d}_{name} until next start: {e}")
+                    continue
+                logger.info(f"Applied migration {version:04d}_{name}")
+        finally:
+            await conn.execute('''SELECT pg_advisory_unlock($1)''', MIGRATION_LOCK_ID)
+
+def hot_queries():
+    """The queries the bot runs most often, with placeholder arguments for EXPLAIN.
+    
+    Returns:
+        list: (name, query, args) tuples
+    """
+    now = datetime.datetime.now()
+    return [
+        ("guild_config", GUILD_CONFIG_SELECT, (0,)),
+        ("counting_game", QUERIES['counting_game'], (0,)),
+        ("warn_count", QUERIES['warn_count'], (0, 0)),
+        ("warns_page", QUERIES['warns_page_older'], (0, 0, now, 0, WARNS_PAGE_SIZE + 1)),
+        ("cases_by_moderator", *build_case_query(0, {'moderator_id': 0})),
+        ("cases_by_reason", *build_case_query(0, {'reason': 'spam'})),
+        ("birthdays_today", QUERIES['birthdays_today'], (now.month, now.day)),
+        ("open_ticket", '''
+            SELECT * FROM tickets WHERE guild_id = $1 AND created_by_id = $2 AND status = 'open'
+        ''', (0, 0)),
+        ("close_ticket", '''
+            UPDATE tickets SET status = 'closed', closed_at = CURRENT_TIMESTAMP, closed_by_id = $1, closed_by_username = $2
+            WHERE channel_id = $3
+        ''', (0, '', 0)),
+        ("member_joined_at", QUERIES['member_joined_at'], (0, 0)),
+    ]
+
+async def explain_hot_queries():
+    """Log the plan PostgreSQL picks for each hot query.
+    
+    Plain EXPLAIN, so nothing is executed. A sequential scan is normal while a table
+    is small, but on a large table it means a query is missing its index.
+    
+    Returns:
+        dict: Query name -> plan text
+    """
+    plans = {}
+    async with bot.db_pool.acquire() as conn:
+        for name, query, args in hot_queries():
+            try:
+                rows = await conn.fetch(f"EXPLAIN {query}", *args)
+            except Exception as e:
+                logger.error(f"Could not EXPLAIN {name}: {e}")
+                continue
+            plan = "\n".join(row[0] for row in rows)
+            plans[name] = plan
+            logger.info(f"Plan for {name}:\n{plan}")
+            if "Seq Scan" in plan:
+                logger.warning(f"{name} is planned as a sequential scan")
+    return plans
+
+class CountingGame:
+    """In-memory copy of a guild's row in the counting_game table."""
+    __slots__ = ('guild_id', 'current_count', 'last_user_id', 'max_count', 'last_message_id')
+
+    guild_id: int
+    current_count: int
+    last_user_id: Optional[int]
+    max_count: int
+    last_message_id: Optional[int]
+
+    def __init__(self, guild_id: int, record):
+        self.guild_id = guild_id
+        self.current_count = record['current_count']
+        self.last_user_id = record['last_user_id']
+        self.max_count = record['max_count']
+        self.last_message_id = record['last_message_id']
+
+async def get_counting_game(guild_id):
+    """Get the cached counting game state for a guild, loading it on first use.
+
+    Args:
+        guild_id (int): The guild ID
+
+    Returns:
+        CountingGame: The game state, or None if the guild has no counting game yet
+    """
+    game = bot.counting_games.get(guild_id)
+    if game is not None:
+        return game
+    row = await query_fetchrow('counting_game', guild_id)
+    if row is None:
+        return None
+    return bot.counting_games.setdefault(guild_id, CountingGame(guild_id, row))
+
+WARM_CACHE_QUERY = f'''
+    SELECT g.guild_id, {', '.join(f's.{col}' for col in GuildConfig.__slots__[1:])},
+           c.current_count, c.last_user_id, c.max_count, c.last_message_id,
+           s.guild_id IS NOT NULL AS has_config, c.guild_id IS NOT NULL AS has_game,
+           r.rule_types, r.rule_values
+    FROM unnest($1::bigint[]) AS g(guild_id)
+    LEFT JOIN servers s ON s.guild_id = g.guild_id
+    LEFT JOIN counting_game c ON c.guild_id = g.guild_id
+    LEFT JOIN LATERAL (
+        SELECT array_agg(rule_type) AS rule_types, array_agg(value) AS rule_values
+        FROM filter_rules WHERE filter_rules.guild_id = g.guild_id
+    ) r ON TRUE
+'''
+
+# --- Named Queries ---
+# The statements that run on every message, join, leave or counting turn are
+# registered here by name. Each pooled connection prepares them once (the pool's init
+# hook, or lazily on first use for connections opened before migrations ran) and
+# call sites run them by name through query_fetch and friends, so PostgreSQL parses
+# and plans each one once per connection instead of on every call.
+
+QUERIES = {
+    'guild_config': GUILD_CONFIG_SELECT,
+    'message_context': WARM_CACHE_QUERY,
+    'filter_rules': '''SELECT rule_type, value FROM filter_rules WHERE guild_id = $1''',
+    'counting_game': '''
+        SELECT current_count, last_user_id, max_count, last_message_id FROM counting_game WHERE guild_id = $1
+    ''',
+    'counting_game_create': '''INSERT INTO counting_game (guild_id, current_count, max_count) VALUES ($1, 0, 100)''',
+    'counting_game_advance': '''
+        UPDATE counting_game SET current_count = $2, last_user_id = $3, last_message_id = $4 WHERE guild_id = $1
+    ''',
+    'counting_game_fail': '''
+        UPDATE counting_game SET current_count = 0, last_user_id = NULL, last_message_id = $2 WHERE guild_id = $1
+    ''',
+    'counting_game_finish': '''UPDATE counting_game SET current_count = 0, last_user_id = NULL WHERE guild_id = $1''',
+    'warn_count': '''SELECT count FROM warn_counts WHERE guild_id = $1 AND user_id = $2''',
+    'escalation_ladder': '''SELECT warn_count, action, duration_minutes FROM escalation_rules WHERE guild_id = $1''',
+    'server_upsert': '''
+        INSERT INTO servers (guild_id, guild_name) VALUES ($1, $2)
+        ON CONFLICT (guild_id) DO UPDATE SET guild_name = EXCLUDED.guild_name
+    ''',
+    'member_join': '''
+        INSERT INTO user_joins (guild_id, user_id, username, joined_at)
+        VALUES ($1, $2, $3, CURRENT_TIMESTAMP)
+        ON CONFLICT (guild_id, user_id) DO UPDATE SET
+            username = EXCLUDED.username,
+            joined_at = CURRENT_TIMESTAMP
+    ''',
+    'member_leave': '''
+        INSERT INTO user_leaves (guild_id, guild_name, user_id, username, left_at)
+        VALUES ($1, $2, $3, $4, CURRENT_TIMESTAMP)
+    ''',
+    'member_joined_at': '''SELECT joined_at FROM user_joins WHERE guild_id = $1 AND user_id = $2''',
+    'pending_deletions_done': '''DELETE FROM pending_deletions WHERE message_id = ANY($1::bigint[])''',
+    'guild_warn_total': '''SELECT COALESCE(SUM(count), 0) FROM warn_counts WHERE guild_id = $1''',
+    'member_birthday': '''SELECT birthday FROM birthdays WHERE guild_id = $1 AND user_id = $2''',
+    'birthdays_today': '''
+        SELECT guild_id, user_id, username FROM birthdays
+        WHERE EXTRACT(MONTH FROM birthday) = $1 AND EXTRACT(DAY FROM birthday) = $2
+    ''',
+    'warns_page_newest': '''
+        SELECT id, reason, warned_at FROM warns WHERE guild_id = $1 AND user_id = $2
+        ORDER BY warned_at DESC, id DESC LIMIT $3
+    ''',
+    'warns_page_older': '''
+        SELECT id, reason, warned_at FROM warns WHERE guild_id = $1 AND user_id = $2 AND (warned_at, id) < ($3, $4)
+        ORDER BY warned_at DESC, id DESC LIMIT $5
+    ''',
+    'warns_page_newer': '''
+        SELECT id, reason, warned_at FROM warns WHERE guild_id = $1 AND user_id = $2 AND (warned_at, id) > ($3, $4)
+        ORDER BY warned_at ASC, id ASC LIMIT $5
+    ''',
+}
+
+# Reads that can be served from the read replica (DB_REPLICA_DSN), since a few seconds
+# of lag doesn't matter to them: stats, listings and the daily birthday scan. Anything
+# not listed here, and every write, runs on the primary. Callers that need to see
+# their own recent writes pass primary=True, see WarnWriter.recently_written.
+REPLICA_QUERIES = frozenset({
+    'guild_warn_total',
+    'member_birthday',
+    'birthdays_today',
+    'warns_page_newest',
+    'warns_page_older',
+    'warns_page_newer',
+    # Built per search by build_case_query rather than kept in QUERIES
+    'cases_search',
+})
+
+class FrostConnection(asyncpg.Connection):
+    """Pool connection that keeps its prepared named queries."""
+    __slots__ = ('prepared',)
+
+async def prepare_connection(conn):
+    """Pool init hook: prepare the named queries on a new connection.
+    
+    Connections opened before migrations have run start empty and prepare each
+    query the first time it's used, since the tables may not exist yet.
+    """
+    conn.prepared = {}
+    if bot.schema_ready:
+        for name in QUERIES:
+            await prepared_statement(conn, name)
+
+async def prepare_replica_connection(conn):
+    """Pool init hook for the read replica: prepare only the queries routed to it."""
+    conn.prepared = {}
+    if bot.schema_ready:
+        for name in REPLICA_QUERIES.intersection(QUERIES):
+            await prepared_statement(conn, name)
+
+def read_pool(name):
+    """The pool a read should use: the replica if it's listed in REPLICA_QUERIES and healthy.
+    
+    Args:
+        name (str): The query name
+        
+    Returns:
+        InstrumentedPool: bot.replica_pool or bot.db_pool
+    """
+    if (
+        name in REPLICA_QUERIES
+        and bot.replica_pool is not None
+        and replica_monitor.usable
+        and not replica_breaker.is_open
+    ):
+        return bot.replica_pool
+    return bot.db_pool
+
+async def prepared_statement(conn, name):
+    """Get a connection's prepared statement for a named query, preparing it if needed."""
+    statement = conn.prepared.get(name)
+    if statement is None:
+        statement = conn.prepared[name] = await conn.prepare(QUERIES[name])
+    return statement
+
+async def run_prepared(pool, name, method, args, label):
+    """Run a named query's prepared statement on a connection from `pool`."""
+    async with pool.acquire() as conn:
+        statement = await prepared_statement(conn, name)
+        start = time.perf_counter()
+        try:
+            result = await getattr(statement, 'fetch' if method == 'execute' else method)(*args)
+        except asyncpg.exceptions.FeatureNotSupportedError:
+            # A schema change altered the result columns; prepare it again
+            statement = conn.prepared[name] = await conn.prepare(QUERIES[name])
+            start = time.perf_counter()
+            result = await getattr(statement, 'fetch' if method == 'execute' else method)(*args)
+        except Exception:
+            query_stats.record(label, start, QUERIES[name], args, failed=True)
+            raise
+        query_stats.record(label, start, QUERIES[name], args)
+        # Prepared statements have no execute(); the status tag is kept on the statement
+        return statement.get_statusmsg() if method == 'execute' else result
+
+async def run_query(name, method, args, primary=False):
+    """Run a named query on a pooled connection; see query_fetch and friends.
+    
+    Queries in REPLICA_QUERIES go to the read replica unless `primary` is set, and
+    fall back to the primary if the replica can't be reached.
+    """
+    pool = bot.db_pool if primary else read_pool(name)
+    try:
+        if pool is not bot.db_pool:
+            try:
+                return await run_prepared(pool, name, method, args, f"{name} (replica)")
+            except DatabaseUnavailable:
+                pass
+            except DB_AVAILABILITY_ERRORS as e:
+                logger.warning(f"Read replica failed query {name}, retrying on the primary: {e}")
+        return await run_prepared(bot.db_pool, name, method, args, name)
+    except DatabaseUnavailable:
+        # Already logged once by the circuit breaker
+        raise
+    except Exception as e:
+        logger.error(f"Database error in query {name}: {e}\nArgs: {args}")
+        raise
+
+async def query_fetch(name, *args, primary=False):
+    """Run a named query and return all rows, like db_fetch."""
+    return await run_query(name, 'fetch', args, primary)
+
+async def query_fetchrow(name, *args, primary=False):
+    """Run a named query and return the first row, or None."""
+    return await run_query(name, 'fetchrow', args, primary)
+
+async def query_fetchval(name, *args, primary=False):
+    """Run a named query and return the first column of the first row, or None."""
+    return await run_query(name, 'fetchval', args, primary)
+
+async def query_execute(name, *args):
+    """Run a named query and return its status, like db_execute."""
+    return await run_query(name, 'execute', args)
+
+# --- Deferred Writes ---
+# Writes that don't need to happen right away (join and leave records, counting game
+# progress) go through deferred_writes.write. While the database is down they're
+# queued, coalesced by key so only the latest counting state per guild is kept, and
+# replayed in order once the circuit breaker closes.
+
+class DeferredWrites:
+    """Queue of named writes to replay when the database is back."""
+
+    def __init__(self):
+        # key -> (query name, args), oldest first
+        self.pending = OrderedDict()
+        self.sequence = count()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.deferred = 0
+        self.replayed = 0
+        self.dropped = 0
+
+    async def write(self, name, *args, key=None):
+        """Run a named write now, or queue it if the database is unavailable.
+        
+        Args:
+            name (str): A write in QUERIES
+            *args: The query arguments
+            key (hashable, optional): Queued writes with the same key replace each other
+            
+        Returns:
+            str: The query status, or None if the write was queued
+        """
+        if not db_breaker.is_open and not self.pending:
+            try:
+                return await query_execute(name, *args)
+            except (DatabaseUnavailable, *DB_AVAILABILITY_ERRORS):
+                pass
+        self.defer(name, args, key)
+        return None
+
+    def defer(self, name, args, key=None):
+        if key is None:
+            key = next(self.sequence)
+        else:
+            # Move a replaced write to the back so it still runs after older ones
+            self.pending.pop(key, None)
+        self.pending[key] = (name, args)
+        self.deferred += 1
+        if len(self.pending) > DB_DEFERRED_WRITES_MAX:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.wakeup.set()
+
+    def start(self):
+        if self.task is None:
+            self.task = bot.loop.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.replay()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), DB_BREAKER_COOLDOWN)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.replay()
+
+    async def replay(self):
+        """Write queued writes in order, stopping at the first that fails."""
+        while self.pending and not db_breaker.is_open:
+            key, (name, args) = next(iter(self.pending.items()))
+            try:
+                await query_execute(name, *args)
+            except (DatabaseUnavailable, *DB_AVAILABILITY_ERRORS):
+                return
+            except Exception as e:
+                logger.error(f"Dropping deferred write {name}: {e}")
+                self.dropped += 1
+            else:
+                self.replayed += 1
+            # A newer write for the same key may have replaced this one meanwhile
+            if self.pending.get(key) == (name, args):
+                del self.pending[key]
+
+deferred_writes = DeferredWrites()
+# Flush whatever piled up while the database was down
+db_breaker.on_close = deferred_writes.wakeup.set
+
+# --- Read Replica ---
+# With DB_REPLICA_DSN set, the reads in REPLICA_QUERIES go to a streaming replica.
+# replica_monitor compares the replica's replay position with the primary's every
+# REPLICA_LAG_CHECK_SECONDS and stops routing to it while it is more than
+# REPLICA_MAX_LAG_SECONDS behind; replica_breaker does the same if it stops answering.
+
+REPLICA_LAG_QUERY = '''
+    SELECT pg_is_in_recovery() AS in_recovery,
+           pg_wal_lsn_diff($1::text::pg_lsn, pg_last_wal_replay_lsn()) AS lag_bytes,
+           EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS lag_seconds
+'''
+
+class ReplicaMonitor:
+    """Tracks replication lag and whether the replica may serve reads."""
+
+    def __init__(self):
+        self.usable = False
+        self.lag_seconds = None
+        self.lag_bytes = None
+        self.reason = "not checked yet"
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = bot.loop.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(REPLICA_LAG_CHECK_SECONDS)
+
+    async def check(self):
+        """Measure the replica's lag and decide whether reads may use it."""
+        primary_lsn = None
+        try:
+            async with bot.db_pool.acquire() as conn:
+                primary_lsn = await conn.fetchval('''SELECT pg_current_wal_lsn()::text''')
+        except Exception:
+            # Without the primary's position only the replay timestamp is left to go on
+            pass
+        try:
+            async with bot.replica_pool.acquire() as conn:
+                row = await conn.fetchrow(REPLICA_LAG_QUERY, primary_lsn)
+        except Exception as e:
+            self.update(False, None, None, f"unreachable: {e}")
+            return
+        if not row['in_recovery']:
+            self.update(False, None, None, "not a standby (was it promoted?)")
+            return
+        lag_bytes = max(0, int(row['lag_bytes'])) if row['lag_bytes'] is not None else None
+        if lag_bytes == 0:
+            # Fully replayed; the replay timestamp only says how long the primary has been idle
+            lag_seconds = 0.0
+        elif row['lag_seconds'] is not None:
+            lag_seconds = max(0.0, float(row['lag_seconds']))
+        else:
+            lag_seconds = None
+        if lag_seconds is None:
+            self.update(False, None, lag_bytes, "still waiting for its first replay")
+        elif lag_seconds > REPLICA_MAX_LAG_SECONDS:
+            self.update(False, lag_seconds, lag_bytes, f"{lag_seconds:.1f}s behind")
+        else:
+            self.update(True, lag_seconds, lag_bytes, "ok")
+
+    def update(self, usable, lag_seconds, lag_bytes, reason):
+        if usable and not self.usable:
+            logger.info("Routing reads to the read replica")
+        elif not usable and (self.usable or reason != self.reason):
+            logger.warning(f"Not routing reads to the read replica, it is {reason}")
+        self.usable = usable
+        self.lag_seconds = lag_seconds
+        self.lag_bytes = lag_bytes
+        self.reason = reason
+
+replica_monitor = ReplicaMonitor()
+
+async def warm_config_cache():
+    """Load the servers, counting_game and filter_rules rows for every guild the bot is in.
+
+    Runs from setup_hook, before the gateway connects, so the first events after a
+    restart are served from the cache instead of one lookup per guild. Rows are
+    streamed through a server-side cursor; guilds without a servers row are cached
+    as empty configs.
+    """
+    start = time.perf_counter()
+    try:
+        guild_ids = [guild.id async for guild in bot.fetch_guilds(limit=None)]
+        config_rows = game_rows = filter_rule_rows = 0
+        async with bot.db_pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(WARM_CACHE_QUERY, guild_ids, prefetch=500):
+                    config, rules = cache_guild_record(record)
+                    config_rows += record['has_config']
+                    game_rows += record['has_game']
+                    filter_rule_rows += len(rules)
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"Config cache warmed in {elapsed:.1f} ms: {config_rows} servers rows, {game_rows} counting_game rows and {filter_rule_rows} filter_rules rows for {len(guild_ids)} guilds")
+    except Exception as e:
+        logger.error(f"Config cache warm-up failed, falling back to lazy loading: {e}")
+
+def cache_guild_record(record):
+    """Cache the servers, counting_game and filter_rules data from one WARM_CACHE_QUERY row.
+    
+    Entries that are already cached are kept, since a config command may have written
+    a fresher copy while the query was running.
+    
+    Args:
+        record (asyncpg.Record): A row from WARM_CACHE_QUERY
+        
+    Returns:
+        tuple: (GuildConfig, FilterRules) - The cached config and filter rules
+    """
+    guild_id = record['guild_id']
+    config = bot.guild_configs.setdefault(guild_id, GuildConfig(guild_id, record))
+    if record['has_game']:
+        bot.counting_games.setdefault(guild_id, CountingGame(guild_id, record))
+    rule_rows = zip(record['rule_types'] or (), record['rule_values'] or ())
+    rules = bot.filter_rules.setdefault(guild_id, FilterRules(guild_id, rule_rows))
+    return config, rules
+
+class MessageContext:
+    """The guild settings on_message needs for every message."""
+    __slots__ = ('guild_id', 'counting_channel', 'filter_level', 'logs_channel_id', 'rules', 'flood_limits')
+
+    guild_id: int
+    counting_channel: Optional[int]
+    filter_level: str
+    logs_channel_id: Optional[int]
+    rules: Optional[FilterRules]
+    flood_limits: Optional[tuple]
+
+    def __init__(self, config, rules):
+        self.guild_id = config.guild_id
+        self.counting_channel = config.counting_channel
+        self.filter_level = config.filter_level or 'light'
+        self.logs_channel_id = config.logs_channel_id
+        self.rules = rules
+        self.flood_limits = flood_limits(config)
+
+async def get_message_context(guild_id):
+    """Get the counting channel, filter level, logs channel and filter rules for a guild.
+    
+    Served from the caches when they're warm. Otherwise the servers, counting_game and
+    filter_rules rows are loaded together in one round trip and cached.
+    
+    Args:
+        guild_id (int): The guild ID
+        
+    Returns:
+        MessageContext: The guild's message settings
+    """
+    config = bot.guild_configs.get(guild_id)
+    rules = bot.filter_rules.get(guild_id)
+    if config is None or rules is None:
+        try:
+            record = await query_fetchrow('message_context', [guild_id])
+            config, rules = cache_guild_record(record)
+        except Exception as e:
+            # The circuit breaker already logged the outage; don't log it per message
+            if not isinstance(e, DatabaseUnavailable):
+                logger.error(f"Error loading message context for guild {guild_id}: {e}")
+            # Filter at the default level without custom rules until the database is back
+            config = config or GuildConfig(guild_id)
+    return MessageContext(config, rules)
+
+# --- Flood Detection ---
+# Each (guild, user) pair gets three token buckets (messages, mentions, links) that refill
+# to the guild's limit over its window. A message that can't be paid for is a flood.
+# A bucket that has been idle for a whole window is full again, so idle users are
+# evicted without losing anything, and the tracker never holds more than
+# FLOOD_TRACKER_MAX_USERS entries.
+
+FLOOD_ACTIONS = ('delete', 'timeout')
+FLOOD_MAX_SECONDS = 60
+LINK_RE = re.compile(r'https?://|discord(?:\.gg|(?:app)?\.com/invite)/', re.IGNORECASE)
+
+def flood_limits(config):
+    """Get a guild's flood limits as (messages, mentions, links, seconds, action, duplicates), or None if disabled.
+    
+    duplicates is how many channels one member must post a near-identical message in
+    before it's treated as spam, or 0 if duplicate detection is off.
+    """
+    if config.flood_action not in FLOOD_ACTIONS:
+        return None
+    return (
+        config.flood_messages or 6,
+        config.flood_mentions or 8,
+        config.flood_links or 4,
+        config.flood_seconds or 5,
+        config.flood_action,
+        3 if config.flood_duplicates is None else config.flood_duplicates
+    )
+
+class FloodState:
+    """Token buckets for one member, plus when their current flood episode ends."""
+    __slots__ = ('messages', 'mentions', 'links', 'updated', 'flagged_until')
+
+    def __init__(self, limits, now):
+        self.messages, self.mentions, self.links = limits[0], limits[1], limits[2]
+        self.updated = now
+        self.flagged_until = 0.0
+
+class FloodGuard:
+    """Per-member rate tracking for every guild with flood protection on."""
+
+    def __init__(self, max_users):
+        # (guild_id, user_id) -> FloodState, least recently active first
+        self.states = OrderedDict()
+        self.max_users = max_users
+        self.floods = 0
+        self.evicted = 0
+
+    def check(self, guild_id, user_id, mentions, links, limits, now=None):
+        """Charge a message to its author and report whether it breaks the guild's limits.
+        
+        Args:
+            guild_id (int): The guild ID
+            user_id (int): The author's ID
+            mentions (int): User, role and everyone mentions in the message
+            links (int): Links in the message
+            limits (tuple): The guild's flood_limits
+            now (float, optional): time.monotonic(), for tests and benchmarks
+            
+        Returns:
+            tuple: (str, bool) - The limit that was broken and whether this starts a new
+            flood episode, or None if the message is within limits
+        """
+        if now is None:
+            now = time.monotonic()
+        max_messages, max_mentions, max_links, window = limits[:4]
+        key = (guild_id, user_id)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = FloodState(limits, now)
+        else:
+            self.states.move_to_end(key)
+            refill = (now - state.updated) / window
+            state.messages = min(max_messages, state.messages + refill * max_messages)
+            state.mentions = min(max_mentions, state.mentions + refill * max_mentions)
+            state.links = min(max_links, state.links + refill * max_links)
+            state.updated = now
+        self.evict(now)
+        
+        if state.messages < 1:
+            broken = 'messages'
+        elif mentions and state.mentions < mentions:
+            broken = 'mentions'
+        elif links and state.links < links:
+            broken = 'links'
+        else:
+            state.messages -= 1
+            state.mentions -= mentions
+            state.links -= links
+            return None
+            
+        self.floods += 1
+        new_episode = now >= state.flagged_until
+        state.flagged_until = now + window
+        return broken, new_episode
+
+    def evict(self, now):
+        """Drop members who have been idle long enough for their buckets to refill."""
+        states = self.states
+        while states:
+            key, state = next(iter(states.items()))
+            if len(states) <= self.max_users and now - state.updated < FLOOD_MAX_SECONDS:
+                break
+            del states[key]
+            self.evicted += 1
+
+flood_guard = FloodGuard(FLOOD_TRACKER_MAX_USERS)
+
+def count_mentions(message):
+    """Count the user, role and @everyone/@here mentions in a message."""
+    return len(message.raw_mentions) + len(message.raw_role_mentions) + (1 if message.mention_everyone else 0)
+
+# --- Near-Duplicate Spam Detection ---
+# Compromised accounts post the same scam in every channel within seconds. Each guild
+# keeps a rolling window of MinHash signatures of recent messages. Signatures are split
+# into bands, and messages sharing any band are compared; those whose estimated shingle
+# overlap is at least DUPLICATE_MIN_SIMILARITY are near-duplicates. Similar messages
+# almost always share a band while unrelated ones rarely do, so a lookup only looks at
+# a handful of candidates.
+
+DUPLICATE_MIN_SIMILARITY = 0.7
+MINHASH_BINS = 32
+MINHASH_BAND_SIZE = 4
+MINHASH_SHINGLE = 4
+MINHASH_EMPTY = 1 << 64
+MINHASH_MASK = (1 << 64) - 1
+
+def minhash(text):
+    """Compute a one-permutation MinHash signature of a message's 4-character shingles.
+    
+    Each shingle is hashed once; the low bits pick one of MINHASH_BINS bins and the
+    bin keeps the smallest remaining value seen.
+    
+    Args:
+        text (str): Normalized message text
+        
+    Returns:
+        tuple: The signature, or None if the text is too short to shingle
+    """
+    text = ' '.join(text.split())
+    if len(text) < MINHASH_SHINGLE:
+        return None
+    signature = [MINHASH_EMPTY] * MINHASH_BINS
+    bin_mask = MINHASH_BINS - 1
+    bin_bits = bin_mask.bit_length()
+    for i in range(len(text) - MINHASH_SHINGLE + 1):
+        h = hash(text[i:i + MINHASH_SHINGLE]) & MINHASH_MASK
+        slot = h & bin_mask
+        value = h >> bin_bits
+        if value < signature[slot]:
+            signature[slot] = value
+    return tuple(signature)
+
+def signature_similarity(a, b):
+    """Estimate the shingle overlap (Jaccard similarity) of two messages from their signatures."""
+    same = filled = 0
+    for x, y in zip(a, b):
+        if x != y:
+            filled += 1
+        elif x != MINHASH_EMPTY:
+            filled += 1
+            same += 1
+    return same / filled if filled else 0.0
+
+def band_keys(signature):
+    """Split a signature into band keys.
+    
+    Bands with an empty bin are skipped: short messages leave many bins empty, and
+    bands of mostly-empty bins would collide between unrelated messages.
+    """
+    keys = []
+    for start in range(0, MINHASH_BINS, MINHASH_BAND_SIZE):
+        band = signature[start:start + MINHASH_BAND_SIZE]
+        keys.append(None if MINHASH_EMPTY in band else band)
+    return keys
+
+class FingerprintEntry:
+    """One recent message in a guild's fingerprint index."""
+    __slots__ = ('seen', 'signature', 'keys', 'channel_id', 'user_id', 'message_id', 'flagged')
+
+    def __init__(self, seen, signature, keys, channel_id, user_id, message_id):
+        self.seen = seen
+        self.signature = signature
+        self.keys = keys
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.message_id = message_id
+        self.flagged = False
+
+class GuildFingerprints:
+    """Recent message signatures for one guild, indexed by band."""
+    __slots__ = ('entries', 'bands')
+
+    def __init__(self):
+        # Oldest first, so expired entries are always at the front here and in every band bucket
+        self.entries = deque()
+        self.bands = tuple({} for _ in range(MINHASH_BINS // MINHASH_BAND_SIZE))
+
+    def expire(self, cutoff):
+        entries = self.entries
+        while entries and (entries[0].seen < cutoff or len(entries) > DUPLICATE_MAX_ENTRIES):
+            entry = entries.popleft()
+            for key, band in zip(entry.keys, self.bands):
+                if key is None:
+                    continue
+                bucket = band[key]
+                bucket.popleft()
+                if not bucket:
+                    del band[key]
+
+    def matches(self, signature, keys):
+        checked = set()
+        found = []
+        for key, band in zip(keys, self.bands):
+            if key is None:
+                continue
+            for entry in band.get(key, ()):
+                if entry.message_id in checked:
+                    continue
+                checked.add(entry.message_id)
+                if signature_similarity(signature, entry.signature) >= DUPLICATE_MIN_SIMILARITY:
+                    found.append(entry)
+        return found
+
+    def add(self, entry):
+        self.entries.append(entry)
+        for key, band in zip(entry.keys, self.bands):
+            if key is not None:
+                band.setdefault(key, deque()).append(entry)
+
+class DuplicateDetector:
+    """Flags messages repeated across channels within DUPLICATE_WINDOW_SECONDS.
+    
+    A member posting the same thing in `threshold` channels is a spam wave of their
+    own. Different members posting the same text only count once DUPLICATE_MIN_USERS
+    of them do, so a few people answering the same question or sharing the same link
+    are left alone.
+    """
+
+    def __init__(self):
+        self.guilds = {}
+        self.flagged = 0
+
+    def check(self, message, threshold, now=None):
+        """Record a message and find the recent near-duplicates it completes a spam wave with.
+        
+        Args:
+            message (discord.Message): The message to check
+            threshold (int): How many channels one member must post it in to make it spam
+            now (float, optional): time.monotonic(), for tests and benchmarks
+            
+        Returns:
+            tuple: (list, bool, bool) - Earlier copies to remove, whether this is a newly
+            detected wave, and whether the author should be punished for it; or None if
+            the message isn't spam
+        """
+        if len(message.content) < DUPLICATE_MIN_LENGTH:
+            return None
+        signature = minhash(normalize_for_filter(message.content))
+        if signature is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+            
+        index = self.guilds.get(message.guild.id)
+        if index is None:
+            index = self.guilds[message.guild.id] = GuildFingerprints()
+        index.expire(now - DUPLICATE_WINDOW_SECONDS)
+        keys = band_keys(signature)
+        matches = index.matches(signature, keys)
+        entry = FingerprintEntry(now, signature, keys, message.channel.id, message.author.id, message.id)
+        index.add(entry)
+        
+        own = [match for match in matches if match.user_id == message.author.id]
+        if any(match.flagged for match in own):
+            # The author's wave was already caught; just remove the new copy
+            return self.flag(entry, own, False, False)
+        if len({message.channel.id} | {match.channel_id for match in own}) >= threshold:
+            return self.flag(entry, own, True, True)
+        if len({message.author.id} | {match.user_id for match in matches}) >= DUPLICATE_MIN_USERS:
+            # Many accounts posting one message is a raid, but no single member is to blame
+            return self.flag(entry, matches, not any(match.flagged for match in matches), False)
+        return None
+
+    def flag(self, entry, matches, new_wave, punish):
+        """Mark a message and its unremoved copies among `matches` as spam."""
+        self.flagged += 1
+        copies = [match for match in matches if not match.flagged]
+        for match in copies:
+            match.flagged = True
+        entry.flagged = True
+        return copies, new_wave, punish
+
+    def sweep(self, now=None):
+        """Drop expired entries and empty guild indexes."""
+        cutoff = (time.monotonic() if now is None else now) - DUPLICATE_WINDOW_SECONDS
+        for guild_id in list(self.guilds):
+            index = self.guilds[guild_id]
+            index.expire(cutoff)
+            if not index.entries:
+                del self.guilds[guild_id]
+
+duplicate_detector = DuplicateDetector()
+
+async def sweep_duplicate_index():
+    """Periodically free the fingerprint indexes of guilds that have gone quiet."""
+    while not bot.is_closed():
+        await asyncio.sleep(DUPLICATE_WINDOW_SECONDS)
+        duplicate_detector.sweep()
+
+async def handle_duplicate_spam(message, context, copies, new_wave, punish):
+    """Remove a spam wave's messages and apply the guild's flood action to the author.
+    
+    Args:
+        message (discord.Message): The message that was flagged
+        context (MessageContext): The guild's message settings
+        copies (list): Earlier copies of the message that are still up
+        new_wave (bool): Whether this message is the one that revealed the wave
+        punish (bool): Whether to apply the flood action; only once per author per wave
+    """
+    try:
+        await outbound.run('moderation', message.guild.id, ('delete', message.channel.id), message.delete)
+    except (discord.errors.NotFound, discord.errors.Forbidden):
+        pass
+    # Earlier copies may be in other channels (and, in a raid, from other members); delete them in bulk
+    for copy in copies:
+        message_deletions.schedule_ids(copy.channel_id, copy.message_id, 0)
+        
+    action_taken = "Messages deleted"
+    if punish and context.flood_limits[4] == 'timeout':
+        try:
+            await outbound.run('moderation', message.guild.id, ('members', message.guild.id), lambda: message.author.timeout(
+                datetime.timedelta(seconds=FLOOD_TIMEOUT_SECONDS),
+                reason="Flood protection: duplicate messages across channels"
+            ))
+            action_taken = f"Timed out for {FLOOD_TIMEOUT_SECONDS // 60} minutes"
+        except (discord.errors.Forbidden, discord.errors.HTTPException) as e:
+            logger.error(f"Could not time out {message.author.id} in guild {message.guild.id}: {e}")
+            
+    if new_wave and context.logs_channel_id:
+        logs_channel = bot.get_channel(context.logs_channel_id)
+        if logs_channel:
+            embed = discord.Embed(
+                title="Duplicate Spam Detected",
+                description=f"A message by {message.author.mention} was posted across channels or accounts",
+                color=discord.Color.orange()
+            )
+            embed.add_field(name="Message Content", value=f"`{message.content[:1000]}`", inline=False)
+            embed.add_field(
+                name="Copies Removed",
+                value=f"{len(copies) + 1} in {len({c.channel_id for c in copies} | {message.channel.id})} channels",
+                inline=True
+            )
+            embed.add_field(name="Action", value=action_taken, inline=True)
+            embed.set_footer(text=f"User ID: {message.author.id}")
+            embed.timestamp = datetime.datetime.now()
+            log_dispatcher.post(logs_channel, embed)
+
+async def handle_flood(message, context, broken, new_episode):
+    """Delete a flood message and, once per episode, apply the guild's action and log it.
+    
+    Args:
+        message (discord.Message): The message over the limit
+        context (MessageContext): The guild's message settings
+        broken (str): Which limit was broken ('messages', 'mentions' or 'links')
+        new_episode (bool): Whether this is the first message of a new flood
+    """
+    try:
+        await outbound.run('moderation', message.guild.id, ('delete', message.channel.id), message.delete)
+    except (discord.errors.NotFound, discord.errors.Forbidden):
+        pass
+    if not new_episode:
+        return
+        
+    action = context.flood_limits[4]
+    action_taken = "Messages deleted"
+    if action == 'timeout':
+        try:
+            await outbound.run('moderation', message.guild.id, ('members', message.guild.id), lambda: message.author.timeout(
+                datetime.timedelta(seconds=FLOOD_TIMEOUT_SECONDS),
+                reason=f"Flood protection: too many {broken}"
+            ))
+            action_taken = f"Timed out for {FLOOD_TIMEOUT_SECONDS // 60} minutes"
+        except (discord.errors.Forbidden, discord.errors.HTTPException) as e:
+            logger.error(f"Could not time out {message.author.id} in guild {message.guild.id}: {e}")
+    try:
+        notice = await outbound.run('notice', message.guild.id, ('messages', message.channel.id), lambda: message.channel.send(
+            f"{message.author.mention}, slow down! You're sending too many {broken}."
+        ))
+        message_deletions.schedule(notice, 10)
+    except (discord.errors.Forbidden, discord.errors.HTTPException):
+        pass
+        
+    if context.logs_channel_id:
+        logs_channel = bot.get_channel(context.logs_channel_id)
+        if logs_channel:
+            embed = discord.Embed(
+                title="Flood Detected",
+                description=f"{message.author.mention} sent too many {broken} in {message.channel.mention}",
+                color=discord.Color.orange()
+            )
+            embed.add_field(name="Action", value=action_taken, inline=False)
+            embed.set_footer(text=f"User ID: {message.author.id}")
+            embed.timestamp = datetime.datetime.now()
+            log_dispatcher.post(logs_channel, embed)
+
+# --- Moderation Commands ---
+
+from discord import app_commands
+
+@bot.tree.command(name="filter", description="Set the chat filter level for this server (admin only)")
+@app_commands.describe(level="Filter level: none, light, moderate, or strict")
+@app_commands.choices(level=[
+    app_commands.Choice(name="None (only custom blocked words)", value="none"),
+    app_commands.Choice(name="Light (only blocks egregious text)", value="light"),
+    app_commands.Choice(name="Moderate (no slurs)", value="moderate"),
+    app_commands.Choice(name="Strict (fully family friendly)", value="strict")
+])
+async def filter_command(interaction: discord.Interaction, level: app_commands.Choice[str]):
+    """Admin-only: Set the chat filter level for this server."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    await set_filter_level(interaction.guild.id, level.value, interaction.guild.name)
+    await interaction.response.send_message(f"Chat filter level set to **{level.value}**.", ephemeral=True)
+
+@bot.tree.command(name="filterword", description="Block or allow a word in this server's chat filter (admin only)")
+@app_commands.describe(action="Block the word, allow it, or remove it from the custom list", word="The word or phrase")
+@app_commands.choices(action=[
+    app_commands.Choice(name="Block (filter this word)", value="block"),
+    app_commands.Choice(name="Allow (never filter this word)", value="allow"),
+    app_commands.Choice(name="Remove (back to the default lists)", value="remove")
+])
+async def filterword(interaction: discord.Interaction, action: app_commands.Choice[str], word: str):
+    """Admin-only: Manage this server's custom blocked and allowed words."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    word = word.strip().lower()
+    if not word or len(word) > 100:
+        await interaction.response.send_message("Words must be between 1 and 100 characters.", ephemeral=True)
+        return
+    try:
+        if action.value == "remove":
+            removed = await update_filter_rule(interaction.guild.id, "block", word, remove=True)
+            removed = await update_filter_rule(interaction.guild.id, "allow", word, remove=True) or removed
+            message = f"`{word}` removed from the custom filter list." if removed else f"`{word}` is not on the custom filter list."
+        else:
+            rules = await get_filter_rules(interaction.guild.id)
+            if rules is not None and len(rules) >= MAX_FILTER_RULES:
+                await interaction.response.send_message(f"This server already has the maximum of {MAX_FILTER_RULES} custom filter rules.", ephemeral=True)
+                return
+            # A word can't be both blocked and allowed
+            other = "allow" if action.value == "block" else "block"
+            await update_filter_rule(interaction.guild.id, other, word, remove=True)
+            await update_filter_rule(interaction.guild.id, action.value, word, added_by_id=interaction.user.id)
+            message = f"`{word}` is now {'blocked' if action.value == 'block' else 'allowed'} in this server."
+        print(f"[DB UPDATE] filter_rules: {action.value} '{word}' for guild {interaction.guild.name} ({interaction.guild.id})")
+        await interaction.response.send_message(message, ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"[ERROR] Failed to update filter word: {e}", ephemeral=True)
+
+@bot.tree.command(name="filterexempt", description="Exempt a role or channel from the chat filter (admin only)")
+@app_commands.describe(action="Add or remove the exemption", role="The role to exempt", channel="The channel or category to exempt")
+@app_commands.choices(action=[
+    app_commands.Choice(name="Add exemption", value="add"),
+    app_commands.Choice(name="Remove exemption", value="remove")
+])
+async def filterexempt(interaction: discord.Interaction, action: app_commands.Choice[str], role: discord.Role = None, channel: discord.abc.GuildChannel = None):
+    """Admin-only: Exempt roles or channels from the chat filter."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    if role is None and channel is None:
+        await interaction.response.send_message("Please choose a role, a channel, or both.", ephemeral=True)
+        return
+    remove = action.value == "remove"
+    try:
+        changed = []
+        if role is not None:
+            if await update_filter_rule(interaction.guild.id, "exempt_role", str(role.id), remove=remove, added_by_id=interaction.user.id):
+                changed.append(role.mention)
+        if channel is not None:
+            if await update_filter_rule(interaction.guild.id, "exempt_channel", str(channel.id), remove=remove, added_by_id=interaction.user.id):
+                changed.append(channel.mention)
+        print(f"[DB UPDATE] filter_rules: {action.value} exemption for guild {interaction.guild.name} ({interaction.guild.id})")
+        if not changed:
+            await interaction.response.send_message("Nothing changed.", ephemeral=True)
+        elif remove:
+            await interaction.response.send_message(f"Removed filter exemption for {', '.join(changed)}.", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"{', '.join(changed)} will no longer be filtered.", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"[ERROR] Failed to update filter exemption: {e}", ephemeral=True)
+
+@bot.tree.command(name="filterlist", description="Show this server's custom filter words and exemptions (admin only)")
+async def filterlist(interaction: discord.Interaction):
+    """Admin-only: Show the custom filter rules for this server."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    rules = await get_filter_rules(interaction.guild.id)
+    if rules is None:
+        await interaction.response.send_message("[ERROR] Could not load the filter rules for this server.", ephemeral=True)
+        return
+    filter_level = await get_filter_level(interaction.guild.id)
+    
+    def field_value(items):
+        value = ", ".join(items) if items else "None"
+        return value if len(value) <= 1024 else value[:1020] + " ..."
+    
+    embed = discord.Embed(
+        title="🔍 Chat Filter Rules",
+        description=f"Filter level: **{filter_level}**",
+        color=discord.Color.from_rgb(0, 191, 255)  # Frostline branding blue
+    )
+    embed.add_field(name="Blocked Words", value=field_value(sorted(f"`{w}`" for w in rules.blocked)), inline=False)
+    embed.add_field(name="Allowed Words", value=field_value(sorted(f"`{w}`" for w in rules.allowed)), inline=False)
+    embed.add_field(name="Exempt Roles", value=field_value([f"<@&{r}>" for r in rules.exempt_roles]), inline=False)
+    embed.add_field(name="Exempt Channels", value=field_value([f"<#{c}>" for c in rules.exempt_channels]), inline=False)
+    embed.set_footer(text=f"{len(rules)}/{MAX_FILTER_RULES} custom rules")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="antispam", description="Configure flood protection for this server (admin only)")
+@app_commands.describe(
+    action="What to do when a member floods the chat",
+    messages="Messages allowed per window (default 6, unchanged if left out)",
+    seconds="Window length in seconds (default 5, unchanged if left out)",
+    mentions="Mentions allowed per window (default 8, unchanged if left out)",
+    links="Links allowed per window (default 4, unchanged if left out)",
+    duplicates="Channels a repeated message must reach to count as spam (default 3, 0 is off, unchanged if left out)"
+)
+@app_commands.choices(action=[
+    app_commands.Choice(name="Off", value="off"),
+    app_commands.Choice(name="Delete flood messages", value="delete"),
+    app_commands.Choice(name="Delete and time out the member", value="timeout")
+])
+async def antispam(
+    interaction: discord.Interaction,
+    action: app_commands.Choice[str],
+    messages: Optional[app_commands.Range[int, 2, 50]] = None,
+    seconds: Optional[app_commands.Range[int, 1, FLOOD_MAX_SECONDS]] = None,
+    mentions: Optional[app_commands.Range[int, 1, 50]] = None,
+    links: Optional[app_commands.Range[int, 1, 50]] = None,
+    duplicates: Optional[app_commands.Range[int, 0, 20]] = None
+):
+    """Admin-only: Set the flood protection action and limits for this server."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    try:
+        # Limits left out keep their current value rather than resetting to the default
+        changed = {
+            'flood_messages': messages, 'flood_seconds': seconds, 'flood_mentions': mentions,
+            'flood_links': links, 'flood_duplicates': duplicates
+        }
+        config = await update_guild_config(
+            interaction.guild.id, interaction.guild.name,
+            flood_action=None if action.value == 'off' else action.value,
+            **{column: value for column, value in changed.items() if value is not None}
+        )
+    except Exception as e:
+        logger.error(f"Error setting flood protection for guild {interaction.guild.id}: {e}")
+        await interaction.response.send_message("[ERROR] Could not update flood protection.", ephemeral=True)
+        return
+    print(f"[DB UPDATE] Flood protection for guild {interaction.guild.id} set to {action.value}")
+    
+    limits = flood_limits(config)
+    if limits is None:
+        await interaction.response.send_message("Flood protection is now **off**.", ephemeral=True)
+        return
+    await interaction.response.send_message(
+        f"Flood protection is now **{action.name.lower()}**. Limits per {limits[3]} seconds: "
+        f"{limits[0]} messages, {limits[1]} mentions, {limits[2]} links. "
+        + (f"Messages a member repeats across {limits[5]} channels are removed." if limits[5] else "Duplicate detection is off."),
+        ephemeral=True
+    )
+
+@bot.tree.command(name="shadowreport", description="Compare the shadow filter engine with the live filter (bot owner only)")
+async def shadowreport(interaction: discord.Interaction):
+    """Owner-only: Summarize how the shadow filter engine compares with the live one."""
+    if interaction.user.id != OWNER_ID:
+        await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+        return
+    shadow = bot.filter_shadow
+    if shadow is None:
+        await interaction.response.send_message("Shadow mode is off. Set FILTER_SHADOW_ENGINE to enable it.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+    
+    # Write out what's buffered so the database totals include it
+    await shadow.flush()
+    try:
+        async with bot.db_pool.acquire() as conn:
+            totals = await conn.fetchrow('''
+                SELECT COUNT(*) AS compared,
+                COUNT(*) FILTER (WHERE live_blocked <> shadow_blocked) AS disagreements,
+                COUNT(*) FILTER (WHERE live_blocked AND NOT shadow_blocked) AS shadow_missed,
+                COUNT(*) FILTER (WHERE shadow_blocked AND NOT live_blocked) AS shadow_extra,
+                AVG(live_us) AS live_us, AVG(shadow_us) AS shadow_us
+                FROM filter_shadow_results
+                WHERE engine = $1 AND recorded_at > NOW() - INTERVAL '24 hours'
+            ''', shadow.engine_name)
+            recent = await conn.fetch('''
+                SELECT guild_id, live_word, shadow_word, content FROM filter_shadow_results
+                WHERE engine = $1 AND live_blocked <> shadow_blocked
+                ORDER BY id DESC LIMIT 5
+            ''', shadow.engine_name)
+    except Exception as e:
+        logger.error(f"Error loading shadow filter results: {e}")
+        await interaction.followup.send("[ERROR] Could not load shadow filter results.", ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title="🔍 Filter Shadow Report",
+        description=f"Live engine: **{shadow.live_engine_name}** · Shadow engine: **{shadow.engine_name}** · Sample rate: {FILTER_SHADOW_SAMPLE_RATE:g}",
+        color=discord.Color.from_rgb(0, 191, 255)  # Frostline branding blue
+    )
+    deltas = sorted(shadow.latency_deltas)
+    if deltas:
+        latency = (
+            f"Mean: {sum(deltas) / len(deltas):+.1f}µs\n"
+            f"p50: {deltas[len(deltas) // 2]:+.1f}µs\n"
+            f"p99: {deltas[min(len(deltas) - 1, int(len(deltas) * 0.99))]:+.1f}µs"
+        )
+    else:
+        latency = "No messages compared yet"
+    embed.add_field(
+        name="Since Startup",
+        value=f"Compared: {shadow.compared}\nDisagreements: {shadow.disagreements}\nDropped: {shadow.dropped}",
+        inline=True
+    )
+    embed.add_field(name="Shadow Latency vs Live", value=latency, inline=True)
+    if totals and totals['compared']:
+        embed.add_field(
+            name="Last 24 Hours",
+            value=(
+                f"Compared: {totals['compared']}\n"
+                f"Disagreements: {totals['disagreements']} "
+                f"({totals['shadow_missed']} missed, {totals['shadow_extra']} extra)\n"
+                f"Average: {totals['live_us']:.0f}µs live, {totals['shadow_us']:.0f}µs shadow"
+            ),
+            inline=False
+        )
+    for row in recent:
+        content = (row['content'] or '')[:200]
+        embed.add_field(
+            name=f"Guild {row['guild_id']}: live `{row['live_word']}` / shadow `{row['shadow_word']}`",
+            value=f"```{content}```" if content else "No content",
+            inline=False
+        )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="perfstats", description="Show cache and hot-path statistics (bot owner only)")
+async def perfstats(interaction: discord.Interaction):
+    """Owner-only: Show cache sizes and hit rates for the message hot path."""
+    if interaction.user.id != OWNER_ID:
+        await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+        return
+    
+    lookups = filter_verdicts.hits + filter_verdicts.misses
+    hit_rate = f"{filter_verdicts.hits / lookups:.1%}" if lookups else "n/a"
+    embed = discord.Embed(
+        title="📊 Performance Stats",
+        color=discord.Color.from_rgb(0, 191, 255)  # Frostline branding blue
+    )
+    embed.add_field(
+        name="Filter Verdict Cache",
+        value=(
+            f"Entries: {len(filter_verdicts.entries)}/{filter_verdicts.max_size}\n"
+            f"Hits: {filter_verdicts.hits}\nMisses: {filter_verdicts.misses}\nHit rate: {hit_rate}"
+        ),
+        inline=True
+    )
+    embed.add_field(
+        name="Config Caches",
+        value=(
+            f"Guild configs: {len(bot.guild_configs)}\n"
+            f"Filter rules: {len(bot.filter_rules)}\n"
+            f"Counting games: {len(bot.counting_games)}\n"
+            f"Guild matchers: {len(guild_matchers)}/{FILTER_MATCHER_CACHE_SIZE}"
+        ),
+        inline=True
+    )
+    mean_flush = warn_writer.total_flush_ms / warn_writer.flushes if warn_writer.flushes else 0.0
+    embed.add_field(
+        name="Warn Queue",
+        value=(
+            f"Depth: {len(warn_writer.pending)}\n"
+            f"Written: {warn_writer.written} in {warn_writer.flushes} flushes\n"
+            f"Flush: {warn_writer.last_flush_ms:.1f}ms last, {mean_flush:.1f}ms mean, {warn_writer.max_flush_ms:.1f}ms max\n"
+            f"Failed flushes: {warn_writer.failures}\nDropped: {warn_writer.dropped}"
+        ),
+        inline=True
+    )
+    embed.add_field(
+        name="Flood Detection",
+        value=(
+            f"Tracked members: {len(flood_guard.states)}/{flood_guard.max_users}\n"
+            f"Floods: {flood_guard.floods}\nEvicted: {flood_guard.evicted}\n"
+            f"Fingerprinted guilds: {len(duplicate_detector.guilds)}\n"
+            f"Duplicate messages flagged: {duplicate_detector.flagged}"
+        ),
+        inline=True
+    )
+    embed.add_field(
+        name="Message Deletions",
+        value=(
+            f"Pending: {len(message_deletions.heap)}\n"
+            f"Deleted: {message_deletions.deleted}\n"
+            f"Bulk requests: {message_deletions.bulk_requests}\n"
+            f"Single requests: {message_deletions.single_requests}"
+        ),
+        inline=True
+    )
+    embed.add_field(
+        name="Log Channels",
+        value=(
+            f"Queued: {log_dispatcher.depth} in {len(log_dispatcher.queues)} channels\n"
+            f"Deepest queue: {log_dispatcher.max_depth}\n"
+            f"Sent: {log_dispatcher.embeds} entries in {log_dispatcher.messages} messages\n"
+            f"Failed: {log_dispatcher.failed}\nDropped: {log_dispatcher.dropped}\n"
+            f"Via webhooks: {log_webhooks.sent} messages, {len(log_webhooks.pools)} guilds, "
+            f"{log_webhooks.created} created, {log_webhooks.fallbacks} fallbacks"
+        ),
+        inline=True
+    )
+    lines = [
+        f"In flight: {sum(outbound.in_flight.values())} across {len(outbound.in_flight)} guilds "
+        f"(max {outbound.max_in_flight} each), {len(outbound.buckets)} busy buckets\n"
+    ]
+    for name in OUTBOUND_CLASSES:
+        wait = outbound.wait[name]
+        lines.append(
+            f"`{name}`: {outbound.queued[name]} queued, {wait.count} sent, waited {wait.mean_ms:.1f}ms mean, "
+            f"{wait.percentile(0.99):.1f}ms p99, {wait.max_ms:.1f}ms max\n"
+        )
+    embed.add_field(name="Outbound Requests", value="".join(lines), inline=False)
+    pool = bot.db_pool
+    wait = pool.acquire_wait if pool is not None else LatencyHistogram()
+    lines = [
+        f"Pool: {pool.get_size() - pool.get_idle_size()}/{pool.get_size()} busy\n" if pool is not None else "",
+        f"Acquire wait: {wait.mean_ms:.1f}ms mean, {wait.percentile(0.99):.1f}ms p99, {wait.max_ms:.1f}ms max\n",
+        f"Slow queries (≥{SLOW_QUERY_MS:g}ms): {query_stats.slow}\n",
+        f"Breaker: {db_breaker.state}, {db_breaker.trips} trips, {db_breaker.rejected} rejected\n",
+        f"Deferred writes: {len(deferred_writes.pending)} queued, {deferred_writes.replayed} replayed, {deferred_writes.dropped} dropped\n",
+    ]
+    for name, stats in query_stats.top():
+        lines.append(
+            f"`{name}`: {stats.count} calls, {stats.mean_ms:.1f}ms mean, "
+            f"{stats.percentile(0.99):.1f}ms p99, {stats.errors} errors\n"
+        )
+    embed.add_field(name="Database", value="".join(lines)[:1024], inline=False)
+    replica = bot.replica_pool
+    if replica is not None:
+        lag = f"{replica_monitor.lag_seconds:.1f}s" if replica_monitor.lag_seconds is not None else "unknown"
+        lag_bytes = f"{replica_monitor.lag_bytes:,} bytes" if replica_monitor.lag_bytes is not None else "unknown"
+        replica_wait = replica.acquire_wait
+        embed.add_field(
+            name="Read Replica",
+            value=(
+                f"Serving reads: {'yes' if replica_monitor.usable else 'no'} ({replica_monitor.reason})\n"
+                f"Lag: {lag}, {lag_bytes} (max {REPLICA_MAX_LAG_SECONDS:g}s)\n"
+                f"Pool: {replica.get_size() - replica.get_idle_size()}/{replica.get_size()} busy\n"
+                f"Acquire wait: {replica_wait.mean_ms:.1f}ms mean, {replica_wait.percentile(0.99):.1f}ms p99\n"
+                f"Breaker: {replica_breaker.state}, {replica_breaker.trips} trips, {replica_breaker.rejected} rejected"
+            ),
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# --- Birthday Commands ---
+from discord.app_commands import describe
+
+@bot.tree.command(name="testbirthdays", description="Test birthday announcements for today (admin only)")
+async def testbirthdays(interaction: discord.Interaction):
+    """Admin-only: Immediately run birthday announcement logic for this guild for today."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    import datetime
+    today = datetime.date.today()
+    month = today.month
+    day = today.day
+    try:
+        async with bot.db_pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT * FROM birthdays WHERE guild_id = $1 AND EXTRACT(MONTH FROM birthday) = $2 AND EXTRACT(DAY FROM birthday) = $3
+            ''', interaction.guild.id, month, day)
+        if not rows:
+            await interaction.response.send_message("No birthdays found for today in this server.", ephemeral=True)
+            return
+        config = await get_guild_config(interaction.guild.id)
+        if not config.birthday_channel_id:
+            await interaction.response.send_message("Birthday channel is not set for this server.", ephemeral=True)
+            return
+        channel = interaction.guild.get_channel(config.birthday_channel_id)
+        if not channel:
+            await interaction.response.send_message("Birthday channel not found in this server.", ephemeral=True)
+            return
+        mentions = []
+        for row in rows:
+            member = interaction.guild.get_member(row['user_id'])
+            mentions.append(member.mention if member else row['username'])
+        mention_str = ' '.join(mentions)
+        msg = f"Happy Birthday {mention_str}!\nFrostline wishes you the best birthday wishes!"
+        embed = discord.Embed(
+            title="🎉 Happy Birthday! 🎉",
+            description=msg,
+            color=discord.Color.magenta()
+        )
+        embed.set_footer(text="FrostMod Birthday System")
+    except Exception as e:
+        await interaction.response.send_message(f"[ERROR] {e}", ephemeral=True)
+        return
+    # The announcement may queue behind other greetings, so answer the interaction first
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        await outbound.run('greeting', interaction.guild.id, ('messages', channel.id), lambda: channel.send(embed=embed))
+        await interaction.followup.send("Birthday announcement sent!", ephemeral=True)
+    except Exception as e:
+        await interaction.followup.send(f"[ERROR] {e}", ephemeral=True)
+
+@bot.tree.command(name="delbday", description="Delete a user's birthday (admins can delete any, users can delete their own)")
+@describe(user="The user whose birthday to delete")
+async def delbday(interaction: discord.Interaction, user: discord.Member):
+    """Delete a user's birthday. Users can delete their own, admins (or mod role) can delete any."""
+    # Check if the user is deleting their own birthday or is admin
+    is_self = user.id == interaction.user.id
+    is_admin_user = await is_admin(interaction)
+    if not (is_self or is_admin_user):
+        await interaction.response.send_message("You can only delete your own birthday.", ephemeral=True)
+        return
+    try:
+        async with bot.db_pool.acquire() as conn:
+            result = await conn.execute(
+                '''DELETE FROM birthdays WHERE guild_id = $1 AND user_id = $2''',
+                interaction.guild.id, user.id
+            )
+        if result and result.startswith("DELETE"):
+            print(f"[BIRTHDAY DELETED] {user} ({user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
+            await interaction.response.send_message(f"Birthday for {user.display_name} deleted.", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"No birthday found for {user.display_name}.", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"[ERROR] Could not delete birthday: {e}", ephemeral=True)
+
+@bot.tree.command(name="setbirthday", description="Set your birthday (mm/dd/yyyy)")
+@describe(date="Your birthday in mm/dd/yyyy format")
+async def setbirthday(interaction: discord.Interaction, date: str):
+    """Allow a user to set their birthday."""
+    try:
+        # Parse date
+        birthday = datetime.datetime.strptime(date, "%m/%d/%Y").date()
+        
+        # Validate the date
+        today = datetime.date.today()
+        
+        # Prevent future dates
+        if birthday > today:
+            await interaction.response.send_message("Birthday cannot be in the future!", ephemeral=True)
+            return
+            
+        # Reasonable age check (older than 120 years is unlikely)
+        years_ago = today.replace(year=today.year - 120)
+        if birthday < years_ago:
+            await interaction.response.send_message("Please enter a valid birthday. The date you entered is too far in the past.", ephemeral=True)
+            return
+            
+        # Insert or update birthday
+        async with bot.db_pool.acquire() as conn:
+            await conn.execute('''
+                INSERT INTO birthdays (guild_id, guild_name, user_id, username, birthday)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                    username = EXCLUDED.username,
+                    birthday = EXCLUDED.birthday
+            ''',
+                interaction.guild.id,
+                interaction.guild.name,
                 interaction.user.id,
                 interaction.user.name,
                 birthday
@@ -493,10 +3851,7 @@ async def bdaychannel(interaction: discord.Interaction, channel: discord.TextCha
         await interaction.response.send_message("You must be an administrator to set the birthday channel.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET birthday_channel_id = $1 WHERE guild_id = $2
-            ''', channel.id, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, birthday_channel_id=channel.id)
         print(f"[DB UPDATE] servers: Set birthday_channel_id={channel.id} for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message(f"Birthday announcements will be sent in {channel.mention}.", ephemeral=True)
     except Exception as e:
@@ -511,21 +3866,8 @@ async def ticketchannel(interaction: discord.Interaction, channel: discord.TextC
     if not await is_admin(interaction):
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
-    try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET ticket_channel_id = $1 WHERE guild_id = $2
-            ''', channel.id, interaction.guild.id)
-            
-            # Check if the server exists in the database, if not insert it
-            server_exists = await conn.fetchval('''
-                SELECT COUNT(*) FROM servers WHERE guild_id = $1
-            ''', interaction.guild.id)
-            
-            if server_exists == 0:
-                await conn.execute('''
-                    INSERT INTO servers (guild_id, ticket_channel_id) VALUES ($1, $2)
-                ''', interaction.guild.id, channel.id)
+    try:
+        await update_guild_config(interaction.guild.id, interaction.guild.name, ticket_channel_id=channel.id)
         
         # Create and send the ticket embed with button
         await create_ticket_embed(channel)
@@ -625,9 +3967,7 @@ async def create_new_ticket(interaction):
             
             # Add permissions for admin roles
             admin_role = None
-            mod_role_id = await conn.fetchval('''
-                SELECT mod_role_id FROM servers WHERE guild_id = $1
-            ''', guild.id)
+            mod_role_id = (await get_guild_config(guild.id)).mod_role_id
             
             if mod_role_id:
                 mod_role = guild.get_role(mod_role_id)
@@ -818,8 +4158,7 @@ async def mrole(interaction: discord.Interaction, role: discord.Role):
         await interaction.response.send_message("You must be an administrator or the bot owner to set the mod role.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''UPDATE servers SET mod_role_id = $1 WHERE guild_id = $2''', role.id, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, mod_role_id=role.id)
         print(f"[DB UPDATE] servers: Set mod_role_id={role.id} for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message(f"Mod role set to {role.mention}. Members with this role can now use admin commands.", ephemeral=True)
     except Exception as e:
@@ -832,18 +4171,21 @@ async def warn(interaction: discord.Interaction, user: discord.Member, reason: s
     if not await is_admin(interaction):
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
+    # Escalation may time out, kick or ban first, which can take longer than Discord waits for a reply
+    await interaction.response.defer(thinking=True)
+    replied = False
     try:
-        await db_execute(
-            '''INSERT INTO warns (guild_id, guild_name, user_id, username, reason) VALUES ($1, $2, $3, $4, $5)''',
-            interaction.guild.id, interaction.guild.name, user.id, user.display_name, reason
-        )
+        escalation_checked = await add_warn(interaction.guild, user, reason, interaction.user.id)
         print(f"[DB INSERT] warns: {user} ({user.id}) warned by {interaction.user} ({interaction.user.id}) in guild {interaction.guild.name} ({interaction.guild.id}) for reason: {reason}")
-        await interaction.response.send_message(f"Warned {user.mention} for: {reason}", ephemeral=False)
+        await interaction.followup.send(
+            f"Warned {user.mention} for: {reason}"
+            + ("" if escalation_checked else "\nEscalation was skipped because the database is unavailable.")
+        )
+        replied = True
         # Log to server's logs channel if set
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT logs_channel_id FROM servers WHERE guild_id = $1''', interaction.guild.id)
-        if row and row['logs_channel_id']:
-            log_channel = interaction.guild.get_channel(row['logs_channel_id'])
+        config = await get_guild_config(interaction.guild.id)
+        if config.logs_channel_id:
+            log_channel = interaction.guild.get_channel(config.logs_channel_id)
             if log_channel:
                 embed = discord.Embed(
                     title="User Warned",
@@ -852,9 +4194,17 @@ async def warn(interaction: discord.Interaction, user: discord.Member, reason: s
                 )
                 embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else discord.Embed.Empty)
                 embed.set_thumbnail(url=user.display_avatar.url)
-                await log_channel.send(embed=embed)
+                log_dispatcher.post(log_channel, embed)
     except Exception as e:
-        await interaction.response.send_message(f"[ERROR] Failed to warn user: {e}", ephemeral=True)
+        if replied:
+            logger.error(f"Error logging warn for {user.id} in guild {interaction.guild.id}: {e}")
+            return
+        # Errors stay private: drop the public "thinking" message and answer ephemerally
+        try:
+            await interaction.delete_original_response()
+        except discord.HTTPException:
+            pass
+        await interaction.followup.send(f"[ERROR] Failed to warn user: {e}", ephemeral=True)
 
 @bot.tree.command(name="delwarns", description="Delete all warnings for a user in this server (admin only)")
 @app_commands.describe(user="The user to delete warnings for")
@@ -864,15 +4214,144 @@ async def delwarns(interaction: discord.Interaction, user: discord.Member):
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        result = await db_execute(
-            '''DELETE FROM warns WHERE guild_id = $1 AND user_id = $2''',
-            interaction.guild.id, user.id
-        )
+        result = await delete_warns(interaction.guild.id, user.id)
         print(f"[DB DELETE] warns: All warnings for {user} ({user.id}) in guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message(f"All warnings for {user.mention} have been deleted.", ephemeral=True)
     except Exception as e:
         await interaction.response.send_message(f"[ERROR] Failed to delete warnings: {e}", ephemeral=True)
 
+# --- Warn History Pages ---
+# /warns shows a member's warnings a page at a time. Pages are read with keyset
+# pagination on (guild_id, user_id, warned_at, id), so each click fetches one page from
+# the index no matter how far back it is; the id breaks ties between warnings written
+# in the same batch. The buttons carry the page's cursor in their custom_id, so they
+# keep working across restarts without any per-message state.
+
+WARNS_PAGE_SIZE = 10
+WARNS_EPOCH = datetime.datetime(1970, 1, 1)
+
+def encode_warn_cursor(row):
+    """Turn a warning's (warned_at, id) into a string that fits in a custom_id."""
+    return f"{(row['warned_at'] - WARNS_EPOCH) // datetime.timedelta(microseconds=1)}-{row['id']}"
+
+def decode_warn_cursor(cursor):
+    """Inverse of encode_warn_cursor; returns (warned_at, id)."""
+    micros, warn_id = cursor.split('-')
+    return WARNS_EPOCH + datetime.timedelta(microseconds=int(micros)), int(warn_id)
+
+async def fetch_warns_page(guild_id, user_id, cursor=None, older=True):
+    """Fetch one page of a member's warnings, newest first.
+    
+    Args:
+        guild_id (int): The guild ID
+        user_id (int): The member's ID
+        cursor (tuple, optional): (warned_at, id) of the page boundary; None for the newest page
+        older (bool): Fetch the page older than the cursor, or the one newer than it
+        
+    Returns:
+        tuple: (rows, has_more) where has_more says whether there are more rows past the page
+    """
+    # Read the primary if a warn was just written, so it shows up in the listing
+    primary = warn_writer.recently_written(guild_id)
+    if cursor is None:
+        rows = await query_fetch('warns_page_newest', guild_id, user_id, WARNS_PAGE_SIZE + 1, primary=primary)
+    elif older:
+        rows = await query_fetch('warns_page_older', guild_id, user_id, *cursor, WARNS_PAGE_SIZE + 1, primary=primary)
+    else:
+        rows = await query_fetch('warns_page_newer', guild_id, user_id, *cursor, WARNS_PAGE_SIZE + 1, primary=primary)
+    has_more = len(rows) > WARNS_PAGE_SIZE
+    rows = rows[:WARNS_PAGE_SIZE]
+    if cursor is not None and not older:
+        rows.reverse()
+    return rows, has_more
+
+async def render_warns_page(guild, user_id, page, cursor=None, older=True):
+    """Build the embed and buttons for a page of /warns.
+    
+    Args:
+        guild (discord.Guild): The guild
+        user_id (int): The member's ID
+        page (int): The 1-based page number being shown
+        cursor (tuple, optional): (warned_at, id) boundary of the page being moved from
+        older (bool): Whether the page is older than the cursor
+        
+    Returns:
+        tuple: (embed, view), or (None, None) if the member has no warnings
+    """
+    rows, has_more = await fetch_warns_page(guild.id, user_id, cursor, older)
+    if not rows and cursor is not None:
+        # Warnings were deleted since the last page; start over from the newest
+        page = 1
+        rows, has_more = await fetch_warns_page(guild.id, user_id)
+    if not rows:
+        return None, None
+    if cursor is not None and not older and not has_more:
+        # Moving back ran into the newest warning, so this is the first page again
+        page = 1
+    has_older = has_more if older or cursor is None else True
+    
+    total = await get_warn_count(guild.id, user_id)
+    pages = max(page, -(-total // WARNS_PAGE_SIZE))
+    member = guild.get_member(user_id)
+    embed = discord.Embed(
+        title=f"Warnings for {member.display_name if member else user_id}",
+        description=f"Total warnings: {total}",
+        color=discord.Color.orange()
+    )
+    for row in rows:
+        embed.add_field(
+            name=row['warned_at'].strftime('%Y-%m-%d %H:%M:%S'),
+            value=f"Reason: {row['reason']}",
+            inline=False
+        )
+    embed.set_footer(text=f"Page {page} of {pages}")
+    
+    view = ui.View(timeout=None)
+    view.add_item(WarnsPageButton(user_id, page, encode_warn_cursor(rows[0]), older=False, disabled=page <= 1))
+    view.add_item(WarnsPageButton(user_id, page, encode_warn_cursor(rows[-1]), older=True, disabled=not has_older))
+    return embed, view
+
+class WarnsPageButton(ui.DynamicItem[ui.Button], template=r'warns:(?P<direction>prev|next):(?P<user_id>\d+):(?P<page>\d+):(?P<cursor>\d+-\d+)'):
+    """Prev/Next button for /warns; the custom_id holds the member, page and cursor."""
+
+    def __init__(self, user_id, page, cursor, older, disabled=False):
+        direction = 'next' if older else 'prev'
+        super().__init__(ui.Button(
+            label="Next" if older else "Prev",
+            emoji="▶️" if older else "◀️",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"warns:{direction}:{user_id}:{page}:{cursor}",
+            disabled=disabled
+        ))
+        self.user_id = user_id
+        self.page = page
+        self.cursor = cursor
+        self.older = older
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match['user_id']), int(match['page']), match['cursor'], match['direction'] == 'next')
+
+    async def interaction_check(self, interaction):
+        if not await is_admin(interaction):
+            await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+            return False
+        return True
+
+    async def callback(self, interaction):
+        try:
+            page = self.page + 1 if self.older else max(1, self.page - 1)
+            embed, view = await render_warns_page(
+                interaction.guild, self.user_id, page, decode_warn_cursor(self.cursor), self.older
+            )
+            if embed is None:
+                await interaction.response.edit_message(content="This member has no warnings left.", embed=None, view=None)
+                return
+            await interaction.response.edit_message(embed=embed, view=view)
+        except Exception as e:
+            logger.error(f"Error paging warnings for {self.user_id} in guild {interaction.guild.id}: {e}")
+            await interaction.response.send_message(f"[ERROR] Failed to fetch warnings: {e}", ephemeral=True)
+
 @bot.tree.command(name="warns", description="List all warnings for a user in this server (admin only)")
 @app_commands.describe(user="The user to list warnings for")
 async def warns(interaction: discord.Interaction, user: discord.Member):
@@ -881,28 +4360,315 @@ async def warns(interaction: discord.Interaction, user: discord.Member):
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        rows = await db_fetch(
-            '''SELECT reason, warned_at FROM warns WHERE guild_id = $1 AND user_id = $2 ORDER BY warned_at DESC''',
-            interaction.guild.id, user.id
-        )
-        warns_count = len(rows)
-        if warns_count == 0:
+        await warn_writer.flush()
+        embed, view = await render_warns_page(interaction.guild, user.id, 1)
+        if embed is None:
             await interaction.response.send_message(f"{user.mention} has no warnings in this server.", ephemeral=True)
             return
-        embed = discord.Embed(
-            title=f"Warnings for {user.display_name}",
-            description=f"Total warnings: {warns_count}",
-            color=discord.Color.orange()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"[ERROR] Failed to fetch warnings: {e}", ephemeral=True)
+
+@bot.tree.command(name="escalation", description="Set automatic punishments for warn counts (admin only)")
+@app_commands.describe(
+    action="Set or remove a step, or list the ladder",
+    warns="The warn count the step fires at",
+    punishment="What happens when a member reaches that many warns",
+    minutes="Timeout length in minutes (default 60)"
+)
+@app_commands.choices(
+    action=[
+        app_commands.Choice(name="Set", value="set"),
+        app_commands.Choice(name="Remove", value="remove"),
+        app_commands.Choice(name="List", value="list")
+    ],
+    punishment=[
+        app_commands.Choice(name="Timeout", value="timeout"),
+        app_commands.Choice(name="Kick", value="kick"),
+        app_commands.Choice(name="Ban", value="ban")
+    ]
+)
+async def escalation(
+    interaction: discord.Interaction,
+    action: app_commands.Choice[str],
+    warns: Optional[app_commands.Range[int, 1, 1000]] = None,
+    punishment: Optional[app_commands.Choice[str]] = None,
+    minutes: Optional[app_commands.Range[int, 1, MAX_TIMEOUT_MINUTES]] = None
+):
+    """Admin-only: Manage the server's warn escalation ladder."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    try:
+        if action.value == 'list':
+            ladder = await get_escalation_ladder(interaction.guild.id)
+            if not ladder:
+                await interaction.response.send_message("No escalation steps are set. Use `/escalation set` to add one.", ephemeral=True)
+                return
+            lines = [f"**{count}** warns → {describe_escalation(*ladder[count])}" for count in sorted(ladder)]
+            embed = discord.Embed(title="Warn Escalation", description="\n".join(lines), color=discord.Color.dark_red())
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        if warns is None:
+            await interaction.response.send_message("Please give the warn count for this step.", ephemeral=True)
+            return
+        if action.value == 'remove':
+            if await update_escalation_rule(interaction.guild.id, warns):
+                print(f"[DB DELETE] escalation_rules: {warns} warns in guild {interaction.guild.id}")
+                await interaction.response.send_message(f"Removed the escalation step at **{warns}** warns.", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"There is no escalation step at **{warns}** warns.", ephemeral=True)
+            return
+        if punishment is None:
+            await interaction.response.send_message("Please choose a punishment for this step.", ephemeral=True)
+            return
+        step_minutes = (minutes or 60) if punishment.value == 'timeout' else None
+        await update_escalation_rule(interaction.guild.id, warns, punishment.value, step_minutes)
+        print(f"[DB UPDATE] escalation_rules: {warns} warns -> {punishment.value} in guild {interaction.guild.id}")
+        await interaction.response.send_message(
+            f"Members who reach **{warns}** warns will get: {describe_escalation(punishment.value, step_minutes)}.",
+            ephemeral=True
         )
+    except Exception as e:
+        logger.error(f"Error updating escalation for guild {interaction.guild.id}: {e}")
+        await interaction.response.send_message(f"[ERROR] Failed to update escalation: {e}", ephemeral=True)
+
+# --- Case Search ---
+# /cases searches a guild's whole warn history by member, moderator, reason text and
+# date. Results come back newest first, a page at a time: each page is a keyset query
+# read through a server-side cursor, so only the rows on the page ever leave the
+# database. Pages are keyed on (warned_at, id), since warnings written in one batch
+# can share a timestamp. The view keeps the cursor each page started at so Prev can
+# go back.
+
+CASES_PAGE_SIZE = 10
+# Searches that can't use an index get cut off rather than tying up the database
+CASES_STATEMENT_TIMEOUT = '5s'
+
+def escape_like(text):
+    """Escape LIKE wildcards so user input only matches literally."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def build_case_query(guild_id, filters, cursor=None):
+    """Build the SQL and arguments for one page of a case search.
+    
+    Args:
+        guild_id (int): The guild ID
+        filters (dict): Any of user_id, moderator_id, reason, since and until
+        cursor (tuple, optional): Only return cases older than this (warned_at, id)
+        
+    Returns:
+        tuple: (query, args)
+    """
+    conditions = ['guild_id = $1']
+    args = [guild_id]
+    
+    def condition(template, value):
+        args.append(value)
+        conditions.append(template.format(f'${len(args)}'))
+    
+    if filters.get('user_id') is not None:
+        condition('user_id = {}', filters['user_id'])
+    if filters.get('moderator_id') is not None:
+        condition('moderator_id = {}', filters['moderator_id'])
+    if filters.get('reason'):
+        # Served by the trigram index on reason
+        condition('reason ILIKE {}', f"%{escape_like(filters['reason'])}%")
+    if filters.get('since') is not None:
+        condition('warned_at >= {}', filters['since'])
+    if filters.get('until') is not None:
+        condition('warned_at < {}', filters['until'])
+    if cursor is not None:
+        args.extend(cursor)
+        conditions.append(f'(warned_at, id) < (${len(args) - 1}, ${len(args)})')
+    query = f'''
+        SELECT id, user_id, username, moderator_id, reason, warned_at FROM warns
+        WHERE {' AND '.join(conditions)}
+        ORDER BY warned_at DESC, id DESC
+    '''
+    return query, args
+
+async def search_cases(guild_id, filters, cursor=None):
+    """Fetch one page of cases through a server-side cursor.
+    
+    Args:
+        guild_id (int): The guild ID
+        filters (dict): Any of user_id, moderator_id, reason, since and until
+        cursor (tuple, optional): Only return cases older than this (warned_at, id)
+        
+    Returns:
+        tuple: (rows, has_more)
+    """
+    query, args = build_case_query(guild_id, filters, cursor)
+    
+    async def fetch_page(pool, label):
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(f"SET LOCAL statement_timeout = '{CASES_STATEMENT_TIMEOUT}'")
+                start = time.perf_counter()
+                results = await conn.cursor(query, *args)
+                rows = await results.fetch(CASES_PAGE_SIZE + 1)
+                query_stats.record(label, start, query, args)
+        return rows
+    
+    pool = bot.db_pool if warn_writer.recently_written(guild_id) else read_pool('cases_search')
+    rows = None
+    if pool is not bot.db_pool:
+        # Like run_query, fall back to the primary if the replica can't be reached
+        try:
+            rows = await fetch_page(pool, "cases_search (replica)")
+        except DatabaseUnavailable:
+            pass
+        except DB_AVAILABILITY_ERRORS as e:
+            logger.warning(f"Read replica failed query cases_search, retrying on the primary: {e}")
+    if rows is None:
+        rows = await fetch_page(bot.db_pool, "cases_search")
+    return rows[:CASES_PAGE_SIZE], len(rows) > CASES_PAGE_SIZE
+
+class CaseSearchView(ui.View):
+    """Prev/Next buttons for a /cases search, usable by the moderator who ran it."""
+
+    def __init__(self, guild, author_id, filters, description):
+        super().__init__(timeout=600)
+        self.guild = guild
+        self.author_id = author_id
+        self.filters = filters
+        self.description = description
+        # cursors[i] is where page i + 1 starts; None for the newest page
+        self.cursors = [None]
+        self.has_more = False
+        self.message = None
+
+    async def load_page(self):
+        """Fetch the current page (the last cursor in self.cursors) and build its embed."""
+        rows, self.has_more = await search_cases(self.guild.id, self.filters, self.cursors[-1])
+        page = len(self.cursors)
+        embed = discord.Embed(title="Case Search", description=self.description, color=discord.Color.orange())
         for row in rows:
+            member = self.guild.get_member(row['user_id'])
+            moderator = f"<@{row['moderator_id']}>" if row['moderator_id'] else "Unknown"
+            reason = row['reason'] if len(row['reason']) <= 200 else row['reason'][:197] + "..."
             embed.add_field(
-                name=row['warned_at'].strftime('%Y-%m-%d %H:%M:%S'),
-                value=f"Reason: {row['reason']}",
+                name=f"{row['warned_at'].strftime('%Y-%m-%d %H:%M:%S')} · {member.display_name if member else row['username']}",
+                value=f"**User:** <@{row['user_id']}>\n**Moderator:** {moderator}\n**Reason:** {reason}",
                 inline=False
             )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        if not rows:
+            embed.add_field(name="No cases found", value="Try widening the search.", inline=False)
+        embed.set_footer(text=f"Page {page}")
+        self.previous_page.disabled = page <= 1
+        self.next_page.disabled = not self.has_more
+        self.next_cursor = (rows[-1]['warned_at'], rows[-1]['id']) if rows else None
+        return embed
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Only the moderator who ran this search can page through it.", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+    async def show(self, interaction):
+        try:
+            embed = await self.load_page()
+        except Exception as e:
+            logger.error(f"Error searching cases in guild {self.guild.id}: {e}")
+            await interaction.response.send_message(f"[ERROR] Failed to search cases: {e}", ephemeral=True)
+            return
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @ui.button(label="Prev", emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.show(interaction)
+
+    @ui.button(label="Next", emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        if self.next_cursor is not None:
+            self.cursors.append(self.next_cursor)
+        await self.show(interaction)
+
+def parse_case_date(value):
+    """Parse a YYYY-MM-DD date from /cases, or raise ValueError."""
+    return datetime.datetime.strptime(value.strip(), '%Y-%m-%d')
+
+@bot.tree.command(name="cases", description="Search this server's warnings (admin only)")
+@app_commands.describe(
+    user="Only warnings given to this user",
+    moderator="Only warnings given by this moderator",
+    reason="Text the reason must contain",
+    since="Only warnings on or after this date (YYYY-MM-DD)",
+    until="Only warnings on or before this date (YYYY-MM-DD)"
+)
+async def cases(
+    interaction: discord.Interaction,
+    user: Optional[discord.User] = None,
+    moderator: Optional[discord.User] = None,
+    reason: Optional[app_commands.Range[str, 3, 100]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Admin-only: Search warnings by user, moderator, reason text and date range."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    try:
+        filters = {
+            'user_id': user.id if user else None,
+            'moderator_id': moderator.id if moderator else None,
+            'reason': reason,
+            'since': parse_case_date(since) if since else None,
+            # Include the whole of the last day
+            'until': parse_case_date(until) + datetime.timedelta(days=1) if until else None,
+        }
+    except ValueError:
+        await interaction.response.send_message("Dates must look like 2024-01-31.", ephemeral=True)
+        return
+    
+    searched = []
+    if user:
+        searched.append(f"**User:** {user.mention}")
+    if moderator:
+        searched.append(f"**Moderator:** {moderator.mention}")
+    if reason:
+        searched.append(f"**Reason contains:** {reason}")
+    if since or until:
+        searched.append(f"**Dates:** {since or 'any'} to {until or 'now'}")
+    
+    await interaction.response.defer(ephemeral=True)
+    await warn_writer.flush()
+    view = CaseSearchView(interaction.guild, interaction.user.id, filters, "\n".join(searched) or "All warnings")
+    try:
+        embed = await view.load_page()
     except Exception as e:
-        await interaction.response.send_message(f"[ERROR] Failed to fetch warnings: {e}", ephemeral=True)
+        logger.error(f"Error searching cases in guild {interaction.guild.id}: {e}")
+        await interaction.followup.send(f"[ERROR] Failed to search cases: {e}", ephemeral=True)
+        return
+    view.message = await interaction.followup.send(embed=embed, view=view, ephemeral=True, wait=True)
+
+@bot.tree.command(name="rebuildwarncounts", description="Recount every member's warnings from the warning log (admin only)")
+async def rebuildwarncounts(interaction: discord.Interaction):
+    """Admin-only: Rebuild this server's warn_counts from the warns table."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+    try:
+        members, total = await rebuild_warn_counts(interaction.guild.id)
+        print(f"[DB UPDATE] warn_counts: Rebuilt for guild {interaction.guild.name} ({interaction.guild.id}): {members} members, {total} warns")
+        await interaction.followup.send(f"Warning counts rebuilt: {total} warnings across {members} members.", ephemeral=True)
+    except Exception as e:
+        logger.error(f"Error rebuilding warn counts for guild {interaction.guild.id}: {e}")
+        await interaction.followup.send(f"[ERROR] Failed to rebuild warning counts: {e}", ephemeral=True)
 
 @bot.event
 async def on_member_join(member):
@@ -911,44 +4677,30 @@ async def on_member_join(member):
     
     try:
         # First handle the database operations
-        row = None
+        config = None
         try:
-            async with bot.db_pool.acquire() as conn:
-                # Upsert the guild first
-                await conn.execute('''
-                    INSERT INTO servers (guild_id, guild_name) VALUES ($1, $2)
-                    ON CONFLICT (guild_id) DO UPDATE SET guild_name = EXCLUDED.guild_name
-                ''', member.guild.id, member.guild.name)
-                
-                # Use a simpler approach for datetime
-                # Log the join event to database without using datetime objects directly
-                await conn.execute('''
-                    INSERT INTO user_joins (guild_id, user_id, username, joined_at) 
-                    VALUES ($1, $2, $3, CURRENT_TIMESTAMP)
-                    ON CONFLICT (guild_id, user_id) DO UPDATE SET 
-                        username = EXCLUDED.username,
-                        joined_at = CURRENT_TIMESTAMP
-                ''', member.guild.id, member.id, str(member))
+            # Upsert the guild first
+            await deferred_writes.write('server_upsert', member.guild.id, member.guild.name, key=('server', member.guild.id))
+            
+            # Log the join event, timestamped by PostgreSQL; every join is kept, so it isn't keyed
+            await deferred_writes.write('member_join', member.guild.id, member.id, str(member))
                 
-                # Fetch server configuration
-                row = await conn.fetchrow('''
-                    SELECT welcome_channel_id, welcome_message, join_role_id, logs_channel_id 
-                    FROM servers WHERE guild_id = $1
-                ''', member.guild.id)
+            # Fetch server configuration
+            config = await get_guild_config(member.guild.id)
                 
-                # Make sure member.created_at is timezone-aware for later comparisons
-                member_created_at = member.created_at
-                if member_created_at.tzinfo is None:
-                    member_created_at = member_created_at.replace(tzinfo=datetime.timezone.utc)
+            # Make sure member.created_at is timezone-aware for later comparisons
+            member_created_at = member.created_at
+            if member_created_at.tzinfo is None:
+                member_created_at = member_created_at.replace(tzinfo=datetime.timezone.utc)
         except Exception as e:
             logger.error(f"Error logging member join to database: {e}")
             
-        if not row:
+        if not config:
             return
         
         # Assign join role if set
-        if row['join_role_id']:
-            role = member.guild.get_role(row['join_role_id'])
+        if config.join_role_id:
+            role = member.guild.get_role(config.join_role_id)
             if role:
                 try:
                     await member.add_roles(role, reason="Auto join role")
@@ -957,12 +4709,12 @@ async def on_member_join(member):
                     logger.error(f"Error assigning join role to {member}: {e}")
             
         # Send welcome message if set
-        if row['welcome_channel_id'] and row['welcome_message']:
-            channel = member.guild.get_channel(row['welcome_channel_id'])
+        if config.welcome_channel_id and config.welcome_message:
+            channel = member.guild.get_channel(config.welcome_channel_id)
             if channel:
                     try:
                         # Format welcome message with user mention and member count
-                        welcome_msg = row['welcome_message']
+                        welcome_msg = config.welcome_message
                         welcome_msg = welcome_msg.replace('{user}', member.mention)
                         welcome_msg = welcome_msg.replace('{membercount}', str(member.guild.member_count))
                         welcome_msg = welcome_msg.replace('{servername}', member.guild.name)
@@ -986,14 +4738,14 @@ async def on_member_join(member):
                             
                         embed.set_footer(text=f"Member #{member.guild.member_count}")
                         
-                        await channel.send(embed=embed)
+                        await outbound.run('greeting', channel.guild.id, ('messages', channel.id), lambda: channel.send(embed=embed))
                         logger.info(f"Sent welcome message for {member} in {member.guild.name}")
                     except Exception as e:
                         logger.error(f"Error sending welcome message for {member}: {e}")
             
         # Log to server's logs channel if set
-        if row['logs_channel_id']:
-            log_channel = member.guild.get_channel(row['logs_channel_id'])
+        if config.logs_channel_id:
+            log_channel = member.guild.get_channel(config.logs_channel_id)
             if log_channel:
                     try:
                         # Create member join log embed
@@ -1020,7 +4772,7 @@ async def on_member_join(member):
                         embed.set_thumbnail(url=member.display_avatar.url)
                         embed.set_footer(text=f"Member #{member.guild.member_count}")
                         
-                        await log_channel.send(embed=embed)
+                        log_dispatcher.post(log_channel, embed)
                     except Exception as e:
                         logger.error(f"Error sending join log for {member}: {e}")
                         
@@ -1039,10 +4791,7 @@ async def welcome(interaction: discord.Interaction, channel: discord.TextChannel
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET welcome_channel_id = $1 WHERE guild_id = $2
-            ''', channel.id, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, welcome_channel_id=channel.id)
         print(f"[DB UPDATE] servers: Set welcome_channel_id={channel.id} for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message(f"Welcome channel set to {channel.mention}.", ephemeral=True)
     except Exception as e:
@@ -1056,10 +4805,7 @@ async def wmessage(interaction: discord.Interaction, message: str):
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET welcome_message = $1 WHERE guild_id = $2
-            ''', message, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, welcome_message=message)
         print(f"[DB UPDATE] servers: Set welcome_message for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message("Welcome message updated!", ephemeral=True)
     except Exception as e:
@@ -1073,10 +4819,7 @@ async def leavemessage(interaction: discord.Interaction, message: str):
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET leave_message = $1 WHERE guild_id = $2
-            ''', message, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, leave_message=message)
         print(f"[DB UPDATE] servers: Set leave_message for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message("Leave message updated!", ephemeral=True)
     except Exception as e:
@@ -1090,10 +4833,7 @@ async def lchannel(interaction: discord.Interaction, channel: discord.TextChanne
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET leave_channel_id = $1 WHERE guild_id = $2
-            ''', channel.id, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, leave_channel_id=channel.id)
         print(f"[DB UPDATE] servers: Set leave_channel_id={channel.id} for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message(f"Leave channel set to {channel.mention}.", ephemeral=True)
     except Exception as e:
@@ -1107,10 +4847,7 @@ async def joinrole(interaction: discord.Interaction, role: discord.Role):
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET join_role_id = $1 WHERE guild_id = $2
-            ''', role.id, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, join_role_id=role.id)
         print(f"[DB UPDATE] servers: Set join_role_id={role.id} for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message(f"Join role set to {role.mention}.", ephemeral=True)
     except Exception as e:
@@ -1124,15 +4861,57 @@ async def logschannel(interaction: discord.Interaction, channel: discord.TextCha
         await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
         return
     try:
-        async with bot.db_pool.acquire() as conn:
-            await conn.execute('''
-                UPDATE servers SET logs_channel_id = $1 WHERE guild_id = $2
-            ''', channel.id, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, logs_channel_id=channel.id)
         print(f"[DB UPDATE] servers: Set logs_channel_id={channel.id} for guild {interaction.guild.name} ({interaction.guild.id})")
         await interaction.response.send_message(f"Logging channel set to {channel.mention}.", ephemeral=True)
     except Exception as e:
         await interaction.response.send_message(f"[ERROR] Failed to set logging channel: {e}", ephemeral=True)
 
+@bot.tree.command(name="logwebhooks", description="Send logs through webhooks instead of as the bot (admin only)")
+@app_commands.describe(count=f"Webhooks to rotate between (1-{LOG_WEBHOOK_POOL_MAX}), or 0 to send logs as the bot")
+async def logwebhooks(interaction: discord.Interaction, count: app_commands.Range[int, 0, LOG_WEBHOOK_POOL_MAX]):
+    """Admin-only: Set how many webhooks log batches are rotated between."""
+    if not await is_admin(interaction):
+        await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+    try:
+        config = await update_guild_config(interaction.guild.id, interaction.guild.name, log_webhooks=count or None)
+    except Exception as e:
+        logger.error(f"Error setting log webhooks for guild {interaction.guild.id}: {e}")
+        await interaction.followup.send("[ERROR] Could not update log webhooks.", ephemeral=True)
+        return
+    print(f"[DB UPDATE] servers: Set log_webhooks={count} for guild {interaction.guild.name} ({interaction.guild.id})")
+    
+    log_channel = interaction.guild.get_channel(config.logs_channel_id) if config.logs_channel_id else None
+    if log_channel is None:
+        await interaction.followup.send(
+            f"Log webhooks set to **{count}**. Set a logs channel with `/logschannel` to start logging.", ephemeral=True
+        )
+        return
+    if not count:
+        try:
+            await log_webhooks.remove(log_channel)
+        except discord.errors.HTTPException as e:
+            logger.warning(f"Could not delete log webhooks in channel {log_channel.id}: {e}")
+        await interaction.followup.send(f"Logs in {log_channel.mention} are now sent by the bot.", ephemeral=True)
+        return
+    # Set the pool up now so permission problems show up here rather than in the logs
+    log_webhooks.pools.pop(interaction.guild.id, None)
+    if await log_webhooks.next_webhook(log_channel, count) is None:
+        await interaction.followup.send(
+            f"I couldn't create webhooks in {log_channel.mention}, so logs will still be sent by the bot. "
+            "Give me the **Manage Webhooks** permission there and run this again.",
+            ephemeral=True
+        )
+        return
+    await interaction.followup.send(f"Logs in {log_channel.mention} are now sent through **{count}** webhooks.", ephemeral=True)
+
+@bot.event
+async def on_webhooks_update(channel):
+    """Reload a guild's log webhooks when the webhooks in its logs channel change."""
+    log_webhooks.invalidate(channel)
+
 
 @bot.tree.command(name="avatar", description="Show a user's profile picture.")
 @app_commands.describe(user="The user to get the avatar of (optional)")
@@ -1168,6 +4947,7 @@ Welcome to **FrostMod**! Here are all the commands you can use.
         "💬 **/wmessage** `<message>`\nSet the welcome message. Use `{user}`, `{membercount}`, `{servername}`.\n\n"
         "🎭 **/joinrole** `<role>`\nSet the role automatically assigned to new members.\n\n"
         "📋 **/logschannel** `<channel>`\nSet the channel for event and moderation logs.\n\n"
+        "🪝 **/logwebhooks** `<count>`\nSend logs through webhooks (0 turns it off).\n\n"
         "🎫 **/ticketchannel** `<channel>`\nSet the channel for ticket creation.\n\n"
         "🎉 **/bdaychannel** `<channel>`\nSet the birthday announcement channel.\n\n"
         "🔢 **/countingchannel** `<channel>`\nSet the channel for the counting game."
@@ -1178,8 +4958,15 @@ Welcome to **FrostMod**! Here are all the commands you can use.
         "🛡️ **/warn** `<user>` `<reason>`\nWarn a user and log the reason.\n\n"
         "🛡️ **/warns** `<user>`\nView all warnings for a specific user.\n\n"
         "🛡️ **/delwarns** `<user>`\nDelete all warnings for a specific user.\n\n"
+        "🛡️ **/rebuildwarncounts**\nRecount warnings if totals look wrong.\n\n"
+        "🔎 **/cases** `[user]` `[moderator]` `[reason]`\nSearch the server's warning history.\n\n"
+        "⚖️ **/escalation** `<action>`\nPunish members automatically at set warn counts.\n\n"
         "🧹 **/purge** `<amount>`\nDelete up to 100 messages from the current channel.\n\n"
-        "🧹 **/purgeuser** `<user>` `<amount>`\nDelete up to 100 messages from a specific user."
+        "🧹 **/purgeuser** `<user>` `<amount>`\nDelete up to 100 messages from a specific user.\n\n"
+        "🔍 **/filterword** `<action>` `<word>`\nBlock or allow a word in the chat filter.\n\n"
+        "🔍 **/filterexempt** `<action>` `[role]` `[channel]`\nExempt a role or channel from the filter.\n\n"
+        "🔍 **/filterlist**\nShow the server's custom filter rules.\n\n"
+        "🌊 **/antispam** `<action>`\nConfigure flood protection limits."
     )
 
     # Birthday System Commands
@@ -1282,10 +5069,9 @@ async def purge(interaction: discord.Interaction, amount: int):
         await interaction.followup.send(f"Successfully deleted {deleted_count} messages.", ephemeral=True)
         
         # Log to server's logs channel if set
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT logs_channel_id FROM servers WHERE guild_id = $1''', interaction.guild.id)
-        if row and row['logs_channel_id']:
-            log_channel = interaction.guild.get_channel(row['logs_channel_id'])
+        config = await get_guild_config(interaction.guild.id)
+        if config.logs_channel_id:
+            log_channel = interaction.guild.get_channel(config.logs_channel_id)
             if log_channel:
                 embed = discord.Embed(
                     title="Messages Purged",
@@ -1295,7 +5081,7 @@ async def purge(interaction: discord.Interaction, amount: int):
                 )
                 embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else discord.Embed.Empty)
                 embed.set_thumbnail(url=interaction.user.display_avatar.url)
-                await log_channel.send(embed=embed)
+                log_dispatcher.post(log_channel, embed)
     except discord.Forbidden:
         await interaction.followup.send("I don't have permission to delete messages in this channel.", ephemeral=True)
     except discord.HTTPException as e:
@@ -1334,10 +5120,9 @@ async def purgeuser(interaction: discord.Interaction, user: discord.Member, amou
         await interaction.followup.send(f"Successfully deleted {deleted_count} messages from {user.mention}.", ephemeral=True)
         
         # Log to server's logs channel if set
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT logs_channel_id FROM servers WHERE guild_id = $1''', interaction.guild.id)
-        if row and row['logs_channel_id']:
-            log_channel = interaction.guild.get_channel(row['logs_channel_id'])
+        config = await get_guild_config(interaction.guild.id)
+        if config.logs_channel_id:
+            log_channel = interaction.guild.get_channel(config.logs_channel_id)
             if log_channel:
                 embed = discord.Embed(
                     title="User Messages Purged",
@@ -1347,7 +5132,7 @@ async def purgeuser(interaction: discord.Interaction, user: discord.Member, amou
                 )
                 embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else discord.Embed.Empty)
                 embed.set_thumbnail(url=user.display_avatar.url)
-                await log_channel.send(embed=embed)
+                log_dispatcher.post(log_channel, embed)
     except discord.Forbidden:
         await interaction.followup.send("I don't have permission to delete messages in this channel.", ephemeral=True)
     except discord.HTTPException as e:
@@ -1366,10 +5151,7 @@ async def on_voice_state_update(member, before, after):
         logs_channel_id = None
         
         try:
-            async with bot.db_pool.acquire() as conn:
-                row = await conn.fetchrow('SELECT logs_channel_id FROM servers WHERE guild_id = $1', member.guild.id)
-                if row:
-                    logs_channel_id = row['logs_channel_id']
+            logs_channel_id = (await get_guild_config(member.guild.id)).logs_channel_id
         except Exception as e:
             logger.error(f"Error fetching logs channel for voice state update: {e}")
             
@@ -1419,7 +5201,7 @@ async def on_voice_state_update(member, before, after):
                     # Set footer
                     embed.set_footer(text=f"Voice Activity • {member.guild.name}")
                     
-                    await log_channel.send(embed=embed)
+                    log_dispatcher.post(log_channel, embed)
                 except Exception as e:
                     logger.error(f"Error sending voice channel log for {member}: {e}")
     
@@ -1437,45 +5219,35 @@ async def on_member_remove(member):
         join_duration = None
         
         try:
-            async with bot.db_pool.acquire() as conn:
-                # Use a simpler approach for datetime
-                # Log the leave in database using PostgreSQL's CURRENT_TIMESTAMP
-                await conn.execute('''
-                    INSERT INTO user_leaves (guild_id, guild_name, user_id, username, left_at)
-                    VALUES ($1, $2, $3, $4, CURRENT_TIMESTAMP)
-                ''', member.guild.id, member.guild.name, member.id, str(member))
-                
-                # Get join date if available
-                join_row = await conn.fetchrow('''
-                    SELECT joined_at FROM user_joins 
-                    WHERE guild_id = $1 AND user_id = $2
-                ''', member.guild.id, member.id)
-                
-                if join_row and join_row['joined_at']:
-                    join_date = join_row['joined_at']
-                    # Ensure both datetimes are timezone-aware
-                    now = datetime.datetime.now(datetime.timezone.utc)
-                    join_date_aware = join_date.replace(tzinfo=datetime.timezone.utc) if join_date.tzinfo is None else join_date
-                    join_duration = now - join_date_aware
+            # Log the leave in database using PostgreSQL's CURRENT_TIMESTAMP
+            await deferred_writes.write('member_leave', member.guild.id, member.guild.name, member.id, str(member))
+            
+            # Get join date if available
+            join_row = await query_fetchrow('member_joined_at', member.guild.id, member.id)
+            
+            if join_row and join_row['joined_at']:
+                join_date = join_row['joined_at']
+                # Ensure both datetimes are timezone-aware
+                now = datetime.datetime.now(datetime.timezone.utc)
+                join_date_aware = join_date.replace(tzinfo=datetime.timezone.utc) if join_date.tzinfo is None else join_date
+                join_duration = now - join_date_aware
+        except DatabaseUnavailable:
+            pass
         except Exception as e:
             logger.error(f"Error logging member leave to database: {e}")
         
         # Get server configuration including logs channel, leave message, and leave channel
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''
-                SELECT logs_channel_id, leave_message, leave_channel_id, welcome_channel_id 
-                FROM servers WHERE guild_id = $1
-            ''', member.guild.id)
+        config = await get_guild_config(member.guild.id)
             
         # Send custom leave message if configured
         # First try to use dedicated leave channel, fall back to welcome channel if not set
-        leave_channel_id = row['leave_channel_id'] if row and row['leave_channel_id'] else (row['welcome_channel_id'] if row else None)
-        if row and row['leave_message'] and leave_channel_id:
+        leave_channel_id = config.leave_channel_id or config.welcome_channel_id
+        if config.leave_message and leave_channel_id:
             leave_channel = member.guild.get_channel(leave_channel_id)
             if leave_channel:
                 try:
                     # Format leave message with user mention
-                    leave_msg = row['leave_message']
+                    leave_msg = config.leave_message
                     leave_msg = leave_msg.replace('{user}', str(member))
                     
                     # Create and send leave embed
@@ -1491,14 +5263,14 @@ async def on_member_remove(member):
                     embed.set_thumbnail(url=member.display_avatar.url)
                     embed.set_footer(text=f"Members: {member.guild.member_count}")
                     
-                    await leave_channel.send(embed=embed)
+                    await outbound.run('greeting', leave_channel.guild.id, ('messages', leave_channel.id), lambda: leave_channel.send(embed=embed))
                     logger.info(f"Sent leave message for {member} in {member.guild.name}")
                 except Exception as e:
                     logger.error(f"Error sending custom leave message for {member}: {e}")
         
         # Send detailed leave log to logs channel
-        if row and row['logs_channel_id']:
-            log_channel = member.guild.get_channel(row['logs_channel_id'])
+        if config.logs_channel_id:
+            log_channel = member.guild.get_channel(config.logs_channel_id)
             if log_channel:
                 try:
                     # Create member leave log embed
@@ -1537,7 +5309,7 @@ async def on_member_remove(member):
                     
                     embed.set_thumbnail(url=member.display_avatar.url)
                     
-                    await log_channel.send(embed=embed)
+                    log_dispatcher.post(log_channel, embed)
                 except Exception as e:
                     logger.error(f"Error sending leave message: {e}")
     except Exception as e:
@@ -1552,13 +5324,12 @@ async def on_guild_channel_create(channel):
         
     try:
         # Get the logs channel for this guild
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT logs_channel_id FROM servers WHERE guild_id = $1''', channel.guild.id)
+        config = await get_guild_config(channel.guild.id)
             
-        if not row or not row['logs_channel_id']:
+        if not config.logs_channel_id:
             return
             
-        log_channel = channel.guild.get_channel(row['logs_channel_id'])
+        log_channel = channel.guild.get_channel(config.logs_channel_id)
         if not log_channel:
             return
             
@@ -1598,7 +5369,7 @@ async def on_guild_channel_create(channel):
         embed.set_author(name=channel.guild.name, icon_url=channel.guild.icon.url if channel.guild.icon else discord.Embed.Empty)
         embed.set_footer(text=f"Channel ID: {channel.id}")
         
-        await log_channel.send(embed=embed)
+        log_dispatcher.post(log_channel, embed)
         logger.info(f"Logged channel creation: {channel.name} in {channel.guild.name}")
     except Exception as e:
         logger.error(f"Error logging channel creation for {channel.name} in {channel.guild.name}: {e}")
@@ -1612,13 +5383,12 @@ async def on_guild_channel_delete(channel):
         
     try:
         # Get the logs channel for this guild
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT logs_channel_id FROM servers WHERE guild_id = $1''', channel.guild.id)
+        config = await get_guild_config(channel.guild.id)
             
-        if not row or not row['logs_channel_id']:
+        if not config.logs_channel_id:
             return
             
-        log_channel = channel.guild.get_channel(row['logs_channel_id'])
+        log_channel = channel.guild.get_channel(config.logs_channel_id)
         if not log_channel:
             return
             
@@ -1658,7 +5428,7 @@ async def on_guild_channel_delete(channel):
             
         embed.set_author(name=channel.guild.name, icon_url=channel.guild.icon.url if channel.guild.icon else discord.Embed.Empty)
         
-        await log_channel.send(embed=embed)
+        log_dispatcher.post(log_channel, embed)
         logger.info(f"Logged channel deletion: {channel.name} in {channel.guild.name}")
     except Exception as e:
         logger.error(f"Error logging channel deletion for {channel.name} in {channel.guild.name}: {e}")
@@ -1686,13 +5456,12 @@ async def on_user_update(before, after):
             
         try:
             # Check if this guild has a logs channel set
-            async with bot.db_pool.acquire() as conn:
-                row = await conn.fetchrow('''SELECT logs_channel_id FROM servers WHERE guild_id = $1''', guild.id)
+            config = await get_guild_config(guild.id)
             
-            if not row or not row['logs_channel_id']:
+            if not config.logs_channel_id:
                 continue
                 
-            log_channel = guild.get_channel(row['logs_channel_id'])
+            log_channel = guild.get_channel(config.logs_channel_id)
             if not log_channel:
                 continue
                 
@@ -1745,7 +5514,7 @@ async def on_user_update(before, after):
             embed.set_footer(text=f"Changed: {', '.join(changes)}")
             
             # Send the embed to the logs channel
-            await log_channel.send(embed=embed)
+            log_dispatcher.post(log_channel, embed)
             logger.info(f"Logged user update for {after} in {guild.name}")
             
         except Exception as e:
@@ -1764,36 +5533,53 @@ async def on_message(message):
         if not message.guild:
             return
             
-        # Check if this is a counting channel message
-        try:
-            counting_channel_id = await db_fetch(
-                '''SELECT counting_channel FROM servers WHERE guild_id = $1''',
-                message.guild.id
+        # Everything below reads from one context, cached or loaded in a single query
+        context = await get_message_context(message.guild.id)
+        filter_level, rules = context.filter_level, context.rules
+        
+        # Flood protection runs first, so a raid is cut off before anything else happens
+        if (context.flood_limits and not is_filter_exempt(message, rules)
+                and not getattr(message.author, 'guild_permissions', discord.Permissions.none()).manage_messages):
+            flood = flood_guard.check(
+                message.guild.id, message.author.id,
+                count_mentions(message), len(LINK_RE.findall(message.content)),
+                context.flood_limits
             )
+            if flood:
+                await handle_flood(message, context, *flood)
+                return
             
-            if counting_channel_id and counting_channel_id[0]['counting_channel'] and \
-            message.channel.id == counting_channel_id[0]['counting_channel']:
-                # This is a message in the counting channel
-                await handle_counting_message(message)
-                return  # Skip other checks for messages in counting channel
-        except Exception as e:
-            logger.error(f"Error checking counting channel: {e}")
+            # Then near-duplicates of messages the author just posted in other channels, or raids
+            if context.flood_limits[5]:
+                wave = duplicate_detector.check(message, context.flood_limits[5])
+                if wave:
+                    await handle_duplicate_spam(message, context, *wave)
+                    return
+        
+        # Check if this is a counting channel message
+        if context.counting_channel and message.channel.id == context.counting_channel:
+            # This is a message in the counting channel
+            await handle_counting_message(message)
+            return  # Skip other checks for messages in counting channel
             
         # Check if the message needs to be filtered
-        filter_level = await get_filter_level(message.guild.id)
-        is_filtered, filtered_word = check_message_for_filter(message.content, filter_level)
+        if is_filter_exempt(message, rules):
+            is_filtered, filtered_word = False, None
+        elif bot.filter_shadow is not None and bot.filter_shadow.sampled():
+            is_filtered, filtered_word = bot.filter_shadow.observe(message, filter_level, rules)
+        else:
+            is_filtered, filtered_word = filter_verdicts.check(message.content, filter_level, rules)
         
         if is_filtered:
             # Delete the filtered message
             try:
-                await message.delete()
+                await outbound.run('moderation', message.guild.id, ('delete', message.channel.id), message.delete)
                 # Send a warning message
-                warning = await message.channel.send(
+                warning = await outbound.run('notice', message.guild.id, ('messages', message.channel.id), lambda: message.channel.send(
                     f"{message.author.mention}, your message was removed for containing filtered content.\n" +
-                    f"The word `{filtered_word}` is not allowed in this server.")
+                    f"The word `{filtered_word}` is not allowed in this server."))
                 # Delete the warning after 5 seconds
-                await asyncio.sleep(5)
-                await warning.delete()
+                message_deletions.schedule(warning, 5)
             except discord.errors.NotFound:
                 # Message already deleted
                 pass
@@ -1803,13 +5589,8 @@ async def on_message(message):
                 
             # Log the filtered message to the logs channel if set
             try:
-                logs_channel_id = await db_fetch(
-                    '''SELECT logs_channel_id FROM servers WHERE guild_id = $1''',
-                    message.guild.id
-                )
-                
-                if logs_channel_id and logs_channel_id[0]['logs_channel_id']:
-                    logs_channel = bot.get_channel(logs_channel_id[0]['logs_channel_id'])
+                if context.logs_channel_id:
+                    logs_channel = bot.get_channel(context.logs_channel_id)
                     if logs_channel:
                         embed = discord.Embed(
                             title="Message Filtered",
@@ -1821,27 +5602,29 @@ async def on_message(message):
                         embed.set_footer(text=f"User ID: {message.author.id}")
                         embed.timestamp = datetime.datetime.now()
                         
-                        await logs_channel.send(embed=embed)
+                        log_dispatcher.post(logs_channel, embed)
                         
                 # Auto-warn the user for filtered content
                 try:
-                    # Add warning to database
-                    await db_execute(
-                        '''INSERT INTO warns (guild_id, guild_name, user_id, username, reason) 
-                        VALUES ($1, $2, $3, $4, $5)''',
-                        message.guild.id,
-                        message.guild.name,
-                        message.author.id,
-                        message.author.name,
-                        f"Automatic warning: Used filtered word '{filtered_word}'"
+                    # Queue the warning for the next batched insert, escalating if needed
+                    await add_warn(
+                        message.guild,
+                        message.author,
+                        f"Automatic warning: Used filtered word '{filtered_word}'",
+                        bot.user.id
                     )
                     
                     # Try to notify user via DM
                     try:
-                        await message.author.send(f"You have been automatically warned in **{message.guild.name}** for using a banned word.")
+                        await outbound.run('notice', message.guild.id, ('dm', message.author.id), lambda: message.author.send(
+                            f"You have been automatically warned in **{message.guild.name}** for using a banned word."
+                        ))
                     except Exception:
                         # If DM fails, send in channel
-                        await message.channel.send(f"{message.author.mention}, you have been automatically warned for using a banned word.", delete_after=10)
+                        notice = await outbound.run('notice', message.guild.id, ('messages', message.channel.id), lambda: message.channel.send(
+                            f"{message.author.mention}, you have been automatically warned for using a banned word."
+                        ))
+                        message_deletions.schedule(notice, 10)
                 except Exception as e:
                     logger.error(f"Could not auto-warn user: {e}")
                     
@@ -2151,6 +5934,10 @@ Use the navigation below to view commands by category:
 > :pencil: Designate where server activity logs will be sent.
 > Tracks moderation actions, channel changes, and more.
 
+**`/logwebhooks`** `<count>`
+> :hook: Send logs through webhooks FrostMod manages in the logs channel.
+> Keeps busy logs from slowing the bot's own messages; 0 turns it off.
+
 **`/joinrole`** `<role>`
 > :label: Set an automatic role assigned to new members upon joining.
 > Streamlines the onboarding process for new users.
@@ -2255,23 +6042,7 @@ Use the navigation below to view commands by category:
         help_message = await channel.send(embed=utility_fun_embed)
         
         # Update the database to store the help channel ID
-        async with bot.db_pool.acquire() as conn:
-            # Check if the server exists, if not, create it
-            count = await conn.fetchval('''
-                SELECT COUNT(*) FROM servers WHERE guild_id = $1
-            ''', interaction.guild.id)
-            
-            if count == 0:
-                # Server doesn't exist in database, insert it
-                await conn.execute('''
-                    INSERT INTO servers (guild_id, guild_name, help_channel_id) 
-                    VALUES ($1, $2, $3)
-                ''', interaction.guild.id, interaction.guild.name, channel.id)
-            else:
-                # Server exists, update help_channel_id
-                await conn.execute('''
-                    UPDATE servers SET help_channel_id = $1, guild_name = $2 WHERE guild_id = $3
-                ''', channel.id, interaction.guild.name, interaction.guild.id)
+        await update_guild_config(interaction.guild.id, interaction.guild.name, help_channel_id=channel.id)
         
         # Use followup instead of response.send_message since we've already responded
         await interaction.followup.send(f"Help center has been successfully set up in {channel.mention}. All command information is now available there.", ephemeral=True)
@@ -2293,11 +6064,10 @@ async def is_moderator(interaction):
         if interaction.user.guild_permissions.administrator or interaction.user.id == OWNER_ID:
             return True
             
-        async with bot.db_pool.acquire() as conn:
-            row = await conn.fetchrow('''SELECT mod_role_id FROM servers WHERE guild_id = $1''', interaction.guild.id)
+        config = await get_guild_config(interaction.guild.id)
             
-        if row and row['mod_role_id']:
-            mod_role = interaction.guild.get_role(row['mod_role_id'])
+        if config.mod_role_id:
+            mod_role = interaction.guild.get_role(config.mod_role_id)
             if mod_role and mod_role in interaction.user.roles:
                 return True
                 
@@ -2394,82 +6164,66 @@ async def serverinfo(interaction: discord.Interaction):
     
     # Get database stats if available
     try:
-        async with bot.db_pool.acquire() as conn:
-            # Get warning count
-            warn_count = await conn.fetchval(
-                '''SELECT COUNT(*) FROM warns WHERE guild_id = $1''',
-                guild.id
-            )
+        # Get warning count
+        warn_count = await get_guild_warn_total(guild.id)
+        
+        # Get FrostMod configuration info
+        config = await get_guild_config(guild.id)
+        
+        if config:
+            frostmod_config = []
             
-            # Get FrostMod configuration info
-            config = await conn.fetchrow(
-                '''SELECT 
-                    welcome_channel_id, 
-                    leave_channel_id, 
-                    logs_channel_id, 
-                    join_role_id, 
-                    ticket_channel_id, 
-                    birthday_channel_id,
-                    filter_level,
-                    mod_role_id
-                FROM servers WHERE guild_id = $1''',
-                guild.id
-            )
+            if config.welcome_channel_id:
+                channel = guild.get_channel(config.welcome_channel_id)
+                if channel:
+                    frostmod_config.append(f"Welcome Channel: {channel.mention}")
+                    
+            if config.leave_channel_id:
+                channel = guild.get_channel(config.leave_channel_id)
+                if channel:
+                    frostmod_config.append(f"Leave Channel: {channel.mention}")
+                    
+            if config.logs_channel_id:
+                channel = guild.get_channel(config.logs_channel_id)
+                if channel:
+                    frostmod_config.append(f"Logs Channel: {channel.mention}")
+                    
+            if config.ticket_channel_id:
+                channel = guild.get_channel(config.ticket_channel_id)
+                if channel:
+                    frostmod_config.append(f"Ticket Channel: {channel.mention}")
+                    
+            if config.birthday_channel_id:
+                channel = guild.get_channel(config.birthday_channel_id)
+                if channel:
+                    frostmod_config.append(f"Birthday Channel: {channel.mention}")
             
-            if config:
-                frostmod_config = []
-                
-                if config['welcome_channel_id']:
-                    channel = guild.get_channel(config['welcome_channel_id'])
-                    if channel:
-                        frostmod_config.append(f"Welcome Channel: {channel.mention}")
-                        
-                if config['leave_channel_id']:
-                    channel = guild.get_channel(config['leave_channel_id'])
-                    if channel:
-                        frostmod_config.append(f"Leave Channel: {channel.mention}")
-                        
-                if config['logs_channel_id']:
-                    channel = guild.get_channel(config['logs_channel_id'])
-                    if channel:
-                        frostmod_config.append(f"Logs Channel: {channel.mention}")
-                        
-                if config['ticket_channel_id']:
-                    channel = guild.get_channel(config['ticket_channel_id'])
-                    if channel:
-                        frostmod_config.append(f"Ticket Channel: {channel.mention}")
-                        
-                if config['birthday_channel_id']:
-                    channel = guild.get_channel(config['birthday_channel_id'])
-                    if channel:
-                        frostmod_config.append(f"Birthday Channel: {channel.mention}")
-                
-                if config['join_role_id']:
-                    role = guild.get_role(config['join_role_id'])
-                    if role:
-                        frostmod_config.append(f"Join Role: {role.mention}")
-                        
-                if config['mod_role_id']:
-                    role = guild.get_role(config['mod_role_id'])
-                    if role:
-                        frostmod_config.append(f"Mod Role: {role.mention}")
-                        
-                if config['filter_level']:
-                    frostmod_config.append(f"Filter Level: {config['filter_level'].capitalize()}")
-                
-                if frostmod_config:
-                    embed.add_field(
-                        name="⚙️ FrostMod Configuration", 
-                        value="\n".join(frostmod_config), 
-                        inline=False
-                    )
-                
-                if warn_count:
-                    embed.add_field(
-                        name="⚠️ Moderation Stats", 
-                        value=f"Total Warnings: {warn_count}", 
-                        inline=False
-                    )
+            if config.join_role_id:
+                role = guild.get_role(config.join_role_id)
+                if role:
+                    frostmod_config.append(f"Join Role: {role.mention}")
+                    
+            if config.mod_role_id:
+                role = guild.get_role(config.mod_role_id)
+                if role:
+                    frostmod_config.append(f"Mod Role: {role.mention}")
+                    
+            if config.filter_level:
+                frostmod_config.append(f"Filter Level: {config.filter_level.capitalize()}")
+            
+            if frostmod_config:
+                embed.add_field(
+                    name="⚙️ FrostMod Configuration", 
+                    value="\n".join(frostmod_config), 
+                    inline=False
+                )
+            
+            if warn_count:
+                embed.add_field(
+                    name="⚠️ Moderation Stats", 
+                    value=f"Total Warnings: {warn_count}", 
+                    inline=False
+                )
     except Exception as e:
         logger.error(f"Error fetching database stats for serverinfo: {e}")
     
@@ -2590,26 +6344,18 @@ async def userinfo(interaction: discord.Interaction, user: discord.Member = None
     
     # Get database info if available
     try:
-        async with bot.db_pool.acquire() as conn:
-            # Get warning count for this user
-            warn_count = await conn.fetchval(
-                '''SELECT COUNT(*) FROM warns WHERE guild_id = $1 AND user_id = $2''',
-                interaction.guild.id, user.id
-            )
-            
-            # Get birthday if set
-            birthday = await conn.fetchval(
-                '''SELECT birthday FROM birthdays WHERE guild_id = $1 AND user_id = $2''',
-                interaction.guild.id, user.id
-            )
-            
-            # Add warning count if any
-            if warn_count and warn_count > 0:
-                embed.add_field(name="⚠️ Warnings", value=str(warn_count), inline=True)
-            
-            # Add birthday if set
-            if birthday:
-                embed.add_field(name="🎂 Birthday", value=birthday, inline=True)
+        # Get warning count for this user
+        warn_count = await get_warn_count(interaction.guild.id, user.id)
+        # Get birthday if set
+        birthday = await query_fetchval('member_birthday', interaction.guild.id, user.id)
+        
+        # Add warning count if any
+        if warn_count and warn_count > 0:
+            embed.add_field(name="⚠️ Warnings", value=str(warn_count), inline=True)
+        
+        # Add birthday if set
+        if birthday:
+            embed.add_field(name="🎂 Birthday", value=birthday, inline=True)
     except Exception as e:
         logger.error(f"Error fetching database info for userinfo: {e}")
     
@@ -2628,51 +6374,42 @@ async def handle_counting_message(message):
             count = int(message.content.strip())
         except ValueError:
             # Not a valid number, delete the message
-            await message.delete()
-            warning = await message.channel.send(
-                f"{message.author.mention}, only numbers are allowed in the counting channel.")
-            await asyncio.sleep(5)
-            await warning.delete()
+            await outbound.run('game', message.guild.id, ('delete', message.channel.id), message.delete)
+            warning = await outbound.run('game', message.guild.id, ('messages', message.channel.id), lambda: message.channel.send(
+                f"{message.author.mention}, only numbers are allowed in the counting channel."))
+            message_deletions.schedule(warning, 5)
             return
             
-        # Get current count status from database
-        logger.info(f"Fetching count status for guild {message.guild.id} ({message.guild.name})")
-        game_data = await db_fetch(
-            '''SELECT current_count, last_user_id, max_count, last_message_id 
-               FROM counting_game WHERE guild_id = $1''',
-            message.guild.id
-        )
+        # Get current count status (cached after the first load)
+        game = await get_counting_game(message.guild.id)
         
         # If no game data found, initialize it
-        if not game_data:
+        if not game:
             logger.info(f"Initializing new counting game for guild {message.guild.id} ({message.guild.name})")
             # Start a new game at count 0
-            await db_execute(
-                '''INSERT INTO counting_game(guild_id, current_count, max_count) 
-                   VALUES($1, 0, 100)''',
-                message.guild.id
-            )
-            game_data = [{"current_count": 0, "last_user_id": None, "max_count": 100, "last_message_id": None}]
+            await deferred_writes.write('counting_game_create', message.guild.id)
+            game = CountingGame(message.guild.id, {"current_count": 0, "last_user_id": None, "max_count": 100, "last_message_id": None})
+            bot.counting_games[message.guild.id] = game
             logger.info(f"Created new counting game entry in database for guild {message.guild.id}")
         
-        current_count = game_data[0]["current_count"]
-        last_user_id = game_data[0]["last_user_id"]
-        max_count = game_data[0]["max_count"]
+        current_count = game.current_count
+        last_user_id = game.last_user_id
+        max_count = game.max_count
         
         # Check if the same user is counting twice in a row
         if last_user_id and last_user_id == message.author.id:
-            await message.delete()
-            warning = await message.channel.send(
-                f"{message.author.mention}, you can't count twice in a row! Wait for someone else to continue.")
-            await asyncio.sleep(5)
-            await warning.delete()
+            await outbound.run('game', message.guild.id, ('delete', message.channel.id), message.delete)
+            warning = await outbound.run('game', message.guild.id, ('messages', message.channel.id), lambda: message.channel.send(
+                f"{message.author.mention}, you can't count twice in a row! Wait for someone else to continue."))
+            message_deletions.schedule(warning, 5)
             return
             
         # Check if the count is the next number in sequence
         expected_count = current_count + 1
         if count != expected_count:
             # Wrong number, reset the game
-            await message.add_reaction('❌')
+            game.current_count, game.last_user_id, game.last_message_id = 0, None, message.id
+            await outbound.run('game', message.guild.id, ('reactions', message.channel.id), lambda: message.add_reaction('❌'))
             
             # Create reset embed
             embed = discord.Embed(
@@ -2687,27 +6424,23 @@ async def handle_counting_message(message):
             
             # Reset the game
             logger.info(f"Resetting count for guild {message.guild.id} ({message.guild.name}) - wrong number entered by {message.author.name} ({message.author.id})")
-            await db_execute(
-                '''UPDATE counting_game 
-                   SET current_count = 0, last_user_id = NULL, last_message_id = $2 
-                   WHERE guild_id = $1''',
-                message.guild.id, message.id
-            )
+            await deferred_writes.write('counting_game_fail', message.guild.id, message.id, key=('counting', message.guild.id))
             logger.info(f"Count reset to 0 in database for guild {message.guild.id}")
             
-            await message.channel.send(embed=embed)
+            await outbound.run('game', message.guild.id, ('messages', message.channel.id), lambda: message.channel.send(embed=embed))
             return
             
-        # Correct number!
-        await message.add_reaction('✅')
+        # Correct number! Update the cached state before awaiting so the next message sees it
+        game.current_count, game.last_user_id, game.last_message_id = count, message.author.id, message.id
+        if count >= max_count:
+            game.current_count, game.last_user_id = 0, None
+        await outbound.run('game', message.guild.id, ('reactions', message.channel.id), lambda: message.add_reaction('✅'))
         
         # Update the count in the database
         logger.info(f"Updating count to {count} for guild {message.guild.id} ({message.guild.name}), user: {message.author.name} ({message.author.id})")
-        await db_execute(
-            '''UPDATE counting_game 
-               SET current_count = $2, last_user_id = $3, last_message_id = $4 
-               WHERE guild_id = $1''',
-            message.guild.id, count, message.author.id, message.id
+        await deferred_writes.write(
+            'counting_game_advance', message.guild.id, count, message.author.id, message.id,
+            key=('counting', message.guild.id)
         )
         logger.info(f"Count successfully updated to {count} in database")
         
@@ -2726,15 +6459,10 @@ async def handle_counting_message(message):
             
             # Reset the game for next round
             logger.info(f"Victory achieved for guild {message.guild.id} ({message.guild.name})! Resetting count for new game.")
-            await db_execute(
-                '''UPDATE counting_game 
-                   SET current_count = 0, last_user_id = NULL 
-                   WHERE guild_id = $1''',
-                message.guild.id
-            )
+            await deferred_writes.write('counting_game_finish', message.guild.id)
             logger.info(f"Count reset to 0 after victory in database for guild {message.guild.id}")
             
-            await message.channel.send(embed=embed)
+            await outbound.run('game', message.guild.id, ('messages', message.channel.id), lambda: message.channel.send(embed=embed))
             
     except Exception as e:
         logger.error(f"Error in counting game: {e}")
@@ -2752,11 +6480,9 @@ async def countingchannel(interaction: discord.Interaction, channel: discord.Tex
     try:
         # Update the counting channel in the database
         logger.info(f"Setting counting channel to {channel.id} ({channel.name}) for guild {interaction.guild.id} ({interaction.guild.name})")
-        await db_execute(
-            '''UPDATE servers SET counting_channel = $2 WHERE guild_id = $1''',
-            interaction.guild.id, channel.id
-        )
+        await update_guild_config(interaction.guild.id, interaction.guild.name, counting_channel=channel.id)
         logger.info(f"Counting channel updated in database for guild {interaction.guild.id}")
+        bot.counting_games.pop(interaction.guild.id, None)
         
         # Initialize or reset the counting game for this guild
         game_exists = await db_fetch(
@@ -2836,12 +6562,9 @@ async def maxcount(interaction: discord.Interaction, maximum: int):
         
     try:
         # Check if counting is set up for this guild
-        counting_channel = await db_fetch(
-            '''SELECT counting_channel FROM servers WHERE guild_id = $1''',
-            interaction.guild.id
-        )
+        counting_channel = (await get_guild_config(interaction.guild.id)).counting_channel
         
-        if not counting_channel or not counting_channel[0]['counting_channel']:
+        if not counting_channel:
             await interaction.response.send_message(
                 "Please set up a counting channel first using /countingchannel.", 
                 ephemeral=True
@@ -2869,6 +6592,7 @@ async def maxcount(interaction: discord.Interaction, maximum: int):
                 interaction.guild.id, maximum
             )
             logger.info(f"Updated max_count to {maximum} in database")
+        bot.counting_games.pop(interaction.guild.id, None)
         
         # Create confirmation embed
         embed = discord.Embed(
@@ -2882,8 +6606,7 @@ async def maxcount(interaction: discord.Interaction, maximum: int):
         await interaction.response.send_message(embed=embed, ephemeral=False)
         
         # Update the counting channel with the new max
-        channel_id = counting_channel[0]['counting_channel']
-        channel = bot.get_channel(channel_id)
+        channel = bot.get_channel(counting_channel)
         
         if channel:
             # Get current game state
@@ -2921,12 +6644,9 @@ async def updatecount(interaction: discord.Interaction, count: int):
         
     try:
         # Check if counting is set up for this guild
-        counting_channel = await db_fetch(
-            '''SELECT counting_channel FROM servers WHERE guild_id = $1''',
-            interaction.guild.id
-        )
+        counting_channel = (await get_guild_config(interaction.guild.id)).counting_channel
         
-        if not counting_channel or not counting_channel[0]['counting_channel']:
+        if not counting_channel:
             await interaction.response.send_message(
                 "Please set up a counting channel first using /countingchannel.", 
                 ephemeral=True
@@ -2961,6 +6681,7 @@ async def updatecount(interaction: discord.Interaction, count: int):
             )
             max_count = game_data[0]['max_count']
             logger.info(f"Updated current_count to {count} in database")
+        bot.counting_games.pop(interaction.guild.id, None)
         
         # Create confirmation embed
         embed = discord.Embed(
@@ -2975,8 +6696,7 @@ async def updatecount(interaction: discord.Interaction, count: int):
         await interaction.response.send_message(embed=embed, ephemeral=False)
         
         # Update the counting channel with the new count
-        channel_id = counting_channel[0]['counting_channel']
-        channel = bot.get_channel(channel_id)
+        channel = bot.get_channel(counting_channel)
         
         if channel:
             update_embed = discord.Embed(
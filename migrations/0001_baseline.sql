@@ -0,0 +1,90 @@
+-- Tables the bot has always used. IF NOT EXISTS lets databases created before
+-- migrations existed adopt this version without changes.
+
+CREATE TABLE IF NOT EXISTS servers (
+    guild_id BIGINT PRIMARY KEY,
+    guild_name TEXT,
+    welcome_channel_id BIGINT,
+    welcome_message TEXT,
+    leave_channel_id BIGINT,
+    leave_message TEXT,
+    join_role_id BIGINT,
+    logs_channel_id BIGINT,
+    ticket_channel_id BIGINT,
+    birthday_channel_id BIGINT,
+    help_channel_id BIGINT,
+    filter_level TEXT,
+    mod_role_id BIGINT,
+    counting_channel BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS warns (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    guild_name TEXT,
+    user_id BIGINT NOT NULL,
+    username TEXT,
+    reason TEXT,
+    warned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS birthdays (
+    guild_id BIGINT NOT NULL,
+    guild_name TEXT,
+    user_id BIGINT NOT NULL,
+    username TEXT,
+    birthday DATE NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    guild_name TEXT,
+    created_by_id BIGINT NOT NULL,
+    created_by_username TEXT,
+    channel_id BIGINT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    closed_at TIMESTAMP,
+    closed_by_id BIGINT,
+    closed_by_username TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ticket_transcripts (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    guild_name TEXT,
+    channel_id BIGINT NOT NULL,
+    created_by_id BIGINT,
+    created_by_username TEXT,
+    closed_by_id BIGINT,
+    closed_by_username TEXT,
+    transcript_content TEXT,
+    closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_joins (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    username TEXT,
+    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_leaves (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    guild_name TEXT,
+    user_id BIGINT NOT NULL,
+    username TEXT,
+    left_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS counting_game (
+    guild_id BIGINT PRIMARY KEY,
+    current_count INTEGER NOT NULL DEFAULT 0,
+    last_user_id BIGINT,
+    max_count INTEGER NOT NULL DEFAULT 100,
+    last_message_id BIGINT
+);
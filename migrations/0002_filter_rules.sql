@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS filter_rules (
+    guild_id BIGINT NOT NULL,
+    rule_type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    added_by_id BIGINT,
+    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (guild_id, rule_type, value)
+);
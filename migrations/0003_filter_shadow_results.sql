@@ -0,0 +1,16 @@
+CREATE TABLE IF NOT EXISTS filter_shadow_results (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    engine TEXT NOT NULL,
+    filter_level TEXT NOT NULL,
+    live_blocked BOOLEAN NOT NULL,
+    live_word TEXT,
+    shadow_blocked BOOLEAN NOT NULL,
+    shadow_word TEXT,
+    live_us INTEGER NOT NULL,
+    shadow_us INTEGER NOT NULL,
+    content TEXT,
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
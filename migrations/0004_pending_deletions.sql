@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS pending_deletions (
+    channel_id BIGINT NOT NULL,
+    message_id BIGINT PRIMARY KEY,
+    delete_at TIMESTAMPTZ NOT NULL
+);
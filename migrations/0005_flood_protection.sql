@@ -0,0 +1,7 @@
+ALTER TABLE servers
+    ADD COLUMN IF NOT EXISTS flood_action TEXT,
+    ADD COLUMN IF NOT EXISTS flood_messages INTEGER,
+    ADD COLUMN IF NOT EXISTS flood_seconds INTEGER,
+    ADD COLUMN IF NOT EXISTS flood_mentions INTEGER,
+    ADD COLUMN IF NOT EXISTS flood_links INTEGER,
+    ADD COLUMN IF NOT EXISTS flood_duplicates INTEGER;
@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS escalation_rules (
+    guild_id BIGINT NOT NULL,
+    warn_count INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    duration_minutes INTEGER,
+    PRIMARY KEY (guild_id, warn_count)
+);
@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS warn_counts (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+-- Backfill from existing warns the first time; a no-op once warn_counts has rows
+INSERT INTO warn_counts (guild_id, user_id, count)
+SELECT guild_id, user_id, COUNT(*) FROM warns
+WHERE NOT EXISTS (SELECT 1 FROM warn_counts)
+GROUP BY guild_id, user_id;
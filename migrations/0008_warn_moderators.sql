@@ -0,0 +1,5 @@
+ALTER TABLE warns ADD COLUMN IF NOT EXISTS moderator_id BIGINT;
+
+-- /cases searches by date and by moderator
+CREATE INDEX IF NOT EXISTS idx_warns_guild_warned_at ON warns (guild_id, warned_at DESC);
+CREATE INDEX IF NOT EXISTS idx_warns_guild_moderator_warned_at ON warns (guild_id, moderator_id, warned_at DESC);
@@ -0,0 +1,16 @@
+-- Indexes for the queries the bot runs most; the plans are logged at startup
+-- (see hot_queries() in bot.py).
+
+-- Daily birthday check and /birthdays: WHERE EXTRACT(MONTH ...) = $1 AND EXTRACT(DAY ...) = $2
+CREATE INDEX IF NOT EXISTS idx_birthdays_month_day
+    ON birthdays ((EXTRACT(MONTH FROM birthday)), (EXTRACT(DAY FROM birthday)));
+
+-- Open Ticket button: does this member already have an open ticket?
+CREATE INDEX IF NOT EXISTS idx_tickets_open_by_member
+    ON tickets (guild_id, created_by_id) WHERE status = 'open';
+
+-- Closing a ticket looks it up by its channel
+CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets (channel_id);
+
+-- /warns pages; databases that already have it from earlier startups skip this
+CREATE INDEX IF NOT EXISTS idx_warns_guild_user_warned_at ON warns (guild_id, user_id, warned_at DESC);
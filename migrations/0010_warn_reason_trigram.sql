@@ -0,0 +1,4 @@
+-- optional: pg_trgm needs a role allowed to create extensions. Without the index
+-- /cases reason searches still work, just with a scan of the guild's warns.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_warns_reason_trgm ON warns USING GIN (reason gin_trgm_ops);
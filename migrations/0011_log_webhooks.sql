@@ -0,0 +1,2 @@
+-- Number of webhooks used to send log embeds, see LogWebhooks; NULL or 0 sends as the bot
+ALTER TABLE servers ADD COLUMN IF NOT EXISTS log_webhooks SMALLINT;
@@ -0,0 +1,3 @@
+-- /warns pages on (warned_at, id) so warnings written in the same batch aren't skipped
+CREATE INDEX IF NOT EXISTS idx_warns_guild_user_warned_at_id ON warns (guild_id, user_id, warned_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_warns_guild_user_warned_at;
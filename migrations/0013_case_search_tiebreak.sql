@@ -0,0 +1,5 @@
+-- /cases pages on (warned_at, id) so warnings written in the same batch aren't skipped
+CREATE INDEX IF NOT EXISTS idx_warns_guild_warned_at_id ON warns (guild_id, warned_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_warns_guild_moderator_warned_at_id ON warns (guild_id, moderator_id, warned_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_warns_guild_warned_at;
+DROP INDEX IF EXISTS idx_warns_guild_moderator_warned_at;